@@ -5,16 +5,21 @@ A program to check available dates for visa appointments.
 import logging
 from time import sleep
 from core.appointment_finder import IDataAppointmentFinder
+from core.change_detector import SlotChangeDetector
+from core.dispatcher import NotificationDispatcher
+from core.exceptions import IDataCircuitOpenError, IDataRateLimitError
+from core.log_config import configure_logging
 from core.notifier import WhatsappNotifier
+from core.polling import AdaptivePollingPolicy
+from core.session_manager import IDataSessionManager
+from core.startup import StartupTimer
+
+# Measure the start-up phases, the imports are done.
+startup = StartupTimer()
+startup.mark("imports")
 
 # Configure the logger.
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="[%(asctime)s] -- [%(levelname)s] -- %(name)s (%(funcName)s): %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-    filename="idata_available_date_searcher_service.log",
-    filemode="a"
-)
+configure_logging("idata_available_date_searcher_service.log")
 
 # Constants
 PHONE_NUMBER_1 = "+90xxxxx"
@@ -29,28 +34,65 @@ if __name__ == "__main__":
     whatsapp.add_phone_api_key(PHONE_NUMBER_1, "API_KEY")
     whatsapp.add_phone_api_key(PHONE_NUMBER_2, "API_KEY")
 
+    # Send the messages in the background, without blocking the polling.
+    dispatcher = NotificationDispatcher(whatsapp)
+
     try:
-        # Create an appointment finder instance.
-        appointments = IDataAppointmentFinder()
+        # Create an appointment finder instance, reusing the cached tokens.
+        appointments = IDataAppointmentFinder(IDataSessionManager(
+            token_cache="idata_available_date_searcher_tokens.json"
+        ))
 
         # Add offices to check.
         appointments.add_office("Altunizade", 8)
         appointments.add_office("Gayrettepe", 1)
 
+        # Remember the notified dates, so they are sent only once.
+        detector = SlotChangeDetector(path="idata_available_date_searcher_state.json")
+
+        # Poll every minute, faster after a finding and slower on errors.
+        polling = AdaptivePollingPolicy(base_interval=60, jitter=5, burst_interval=20)
+        startup.mark("setup")
+
         while True:
-            # Find the next available date.
-            for office in ["Altunizade", "Gayrettepe"]:
-                free_dates = appointments.find_available_dates(office, search_before="18-11-2023")
-
-                # If there is a next available date, send a Whatsapp message.
-                if free_dates:
-                    logger.info("[{office}] Next available date: %s", free_dates)
-                    message = f"{office} There is a free slot, be fast! {free_dates}"
-                    whatsapp.send_message(PHONE_NUMBER_1, message)
-                    whatsapp.send_message(PHONE_NUMBER_2, message)
-
-            logger.info("Sleeping for 30 seconds.")
-            sleep(60)
+            try:
+                found_any = False
+
+                # Find the next available date.
+                for office in ["Altunizade", "Gayrettepe"]:
+                    free_dates = appointments.find_available_dates(
+                        office, search_before="18-11-2023"
+                    )
+
+                    found_any = found_any or bool(free_dates)
+
+                    # If there is a new available date, send a Whatsapp message.
+                    changes = detector.update(office, "date", {date: [date] for date in free_dates})
+                    new_dates = [change.date for change in changes if change.appeared]
+                    if new_dates:
+                        logger.info("[%s] Next available date: %s", office, new_dates)
+                        message = f"{office} There is a free slot, be fast! {new_dates}"
+                        dispatcher.notify(message)
+                polling.record_success(found_any)
+            except (IDataRateLimitError, IDataCircuitOpenError) as e:
+                logger.warning("Rate limited: %s", e)
+                polling.record_failure(rate_limited=True)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error("Polling cycle failed: %s", e)
+                polling.record_failure()
+
+            # Report the start-up once the first cycle is done.
+            if "first cycle" not in startup.phases:
+                startup.mark("first cycle")
+                startup.report()
+
+            # Log the session counters.
+            logger.debug("Session stats: %s", appointments.session_manager.stats())
+            logger.debug("Limiter state: %s", appointments.session_manager.limiter_state())
+
+            interval = polling.next_interval()
+            logger.info("Sleeping for %.1f seconds.", interval)
+            sleep(interval)
     except Exception as e:
         logger.error("An error occured: %s", e)
         whatsapp.send_message(PHONE_NUMBER_1, f"An error occured on iDataAvailableDateSearcher script: {e}")
@@ -0,0 +1,75 @@
+"""
+A micro-benchmark of the date utilities against their previous versions.
+
+The previous versions parsed every date with strptime on every call and
+built the date ranges from scratch every cycle.
+
+Usage: python -m benchmarks.bench_dates
+"""
+
+import timeit
+from datetime import date, datetime, timedelta
+
+from core.dates import DateSet, to_ordinal
+from core.utils import IDataUtilities
+
+
+def legacy_remove_dates_before(dates: list[str], allow_before: str) -> list[str]:
+    """The strptime based remove_dates_before."""
+    allow_before_date = datetime.strptime(allow_before, "%d-%m-%Y").date()
+    return [
+        date_string
+        for date_string in dates
+        if datetime.strptime(date_string, "%d-%m-%Y").date() < allow_before_date
+    ]
+
+
+def legacy_get_dates_between(from_date: str, until_date: str) -> list[str]:
+    """The get_dates_between building and formatting every date."""
+    day, month, year = from_date.split("-")
+    start_date = date(int(year), int(month), int(day))
+    day, month, year = until_date.split("-")
+    end_date = date(int(year), int(month), int(day))
+    dates = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+    return [date_object.strftime("%d-%m-%Y") for date_object in dates]
+
+
+def main() -> None:
+    """Print the time per call of the previous and the current versions."""
+    start, end, cutoff = "01-11-2023", "30-01-2024", "01-01-2024"
+    dates = legacy_get_dates_between(start, end)
+    weekends = DateSet.from_strings(dates).on_weekdays
+
+    cases = {
+        "get_dates_between": (
+            lambda: legacy_get_dates_between(start, end),
+            lambda: IDataUtilities.get_dates_between(start, end),
+        ),
+        "remove_dates_before": (
+            lambda: legacy_remove_dates_before(dates, cutoff),
+            lambda: IDataUtilities.remove_dates_before(dates, cutoff),
+        ),
+        "weekend_filter": (
+            lambda: [d for d in dates if datetime.strptime(d, "%d-%m-%Y").weekday() >= 5],
+            lambda: weekends((5, 6)),
+        ),
+        "within_range": (
+            lambda: [d for d in dates
+                     if datetime.strptime(start, "%d-%m-%Y")
+                     <= datetime.strptime(d, "%d-%m-%Y")
+                     <= datetime.strptime(cutoff, "%d-%m-%Y")],
+            lambda: DateSet.from_strings(dates).within(to_ordinal(start), to_ordinal(cutoff)),
+        ),
+    }
+
+    print(f"{'case':<22}{'legacy (us)':>14}{'current (us)':>14}{'speedup':>10}")
+    number = 200
+    for name, (legacy, current) in cases.items():
+        legacy_time = min(timeit.repeat(legacy, number=number, repeat=3)) / number * 1e6
+        current_time = min(timeit.repeat(current, number=number, repeat=3)) / number * 1e6
+        print(f"{name:<22}{legacy_time:>14.1f}{current_time:>14.1f}"
+              f"{legacy_time / current_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
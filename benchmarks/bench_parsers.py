@@ -0,0 +1,63 @@
+"""
+A benchmark comparing the fast and the BeautifulSoup parser backends.
+
+It prints the parse time of each one per response size, the tests in
+tests/test_parsers.py check that both return the same values. Recorded
+responses can be given as arguments, otherwise synthetic ones shaped
+like the getdate, senddate and appointment form pages are used.
+
+Usage: python -m benchmarks.bench_parsers [response.html ...]
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+from benchmarks.synthetic import (
+    synthetic_appointment_form,
+    synthetic_getdate,
+    synthetic_senddate
+)
+from core.parsers import FastResponseParser, SoupResponseParser
+
+# The classes and the meta tag the utilities and the requester look for.
+CLASS_NAMES = ("form-control", "noPrime", "yesPrime", "yesVip", "getdatebtnhour")
+META_NAMES = ("csrf-token",)
+
+
+def load_responses(paths: list[str]) -> dict[str, str]:
+    """Returns the responses to benchmark, keyed by their names."""
+    if paths:
+        return {path: Path(path).read_text(encoding="utf-8") for path in paths}
+    return {
+        "getdate-1": synthetic_getdate(["17-11-2023"]),
+        "getdate-30": synthetic_getdate([f"{day:02d}-11-2023" for day in range(1, 31)]),
+        "senddate-0": synthetic_senddate(0),
+        "senddate-12": synthetic_senddate(12),
+        "senddate-96": synthetic_senddate(96),
+        "form-100": synthetic_appointment_form(100),
+        "form-1000": synthetic_appointment_form(1000),
+    }
+
+
+def benchmark(responses: dict[str, str], number: int = 5, repeat: int = 3) -> None:
+    """Print the parse time of both backends for every response."""
+    print(f"{'response':<20}{'bytes':>10}{'soup (us)':>14}{'fast (us)':>14}{'speedup':>10}")
+    for name, html_code in responses.items():
+        timings = {}
+        for backend in (SoupResponseParser, FastResponseParser):
+            def parse_all(backend=backend):
+                for class_name in CLASS_NAMES:
+                    backend.find_texts_by_class(html_code, class_name)
+                for meta_name in META_NAMES:
+                    backend.find_meta_content(html_code, meta_name)
+            best = min(timeit.repeat(parse_all, number=number, repeat=repeat))
+            timings[backend] = best / number * 1e6
+        soup_time = timings[SoupResponseParser]
+        fast_time = timings[FastResponseParser]
+        print(f"{name:<20}{len(html_code):>10}{soup_time:>14.1f}"
+              f"{fast_time:>14.1f}{soup_time / fast_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    benchmark(load_responses(sys.argv[1:]))
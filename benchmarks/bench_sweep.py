@@ -0,0 +1,156 @@
+"""
+An offline benchmark of the appointment finder against the replay server.
+
+It measures the latency of one sweep, the requests sent per sweep and the
+CPU time spent parsing, for the sequential, the concurrent and the
+getdate/senddate pipeline sweeps. The first sweep parses every response,
+the next ones find the unchanged responses in the parse cache. Without a
+fixtures directory, synthetic fixtures are written to a temporary
+directory. With --gate-ttl, the calendar status is checked first, and
+--closed writes a closed calendar, to measure the requests of a quiet cycle.
+
+Usage: python -m benchmarks.bench_sweep [--fixtures DIR] [--latency 0.2]
+           [--error-rate 0.0] [--days 30] [--concurrency 5]
+           [--gate-ttl 20] [--closed]
+"""
+
+import argparse
+import asyncio
+import tempfile
+import threading
+import time
+from functools import wraps
+
+from benchmarks.synthetic import calendar_dates, write_synthetic_fixtures
+from core.appointment_finder import IDataAppointmentFinder
+from core.calendar_gate import CalendarStatusGate
+from core.rate_limiter import TokenBucket
+from core.replay_server import ReplayServer
+from core.session_manager import IDataSessionManager
+from core.utils import IDataUtilities
+
+OFFICE_NAME = "Altunizade"
+OFFICE_ID = 8
+
+
+class ParseTimer:
+    """Accumulates the CPU time of the utilities' parse functions."""
+
+    def __init__(self):
+        self.seconds: float = 0.0
+        self._lock = threading.Lock()
+        self._originals = {}
+
+    def __enter__(self):
+        for name in ("parse_available_dates", "parse_available_hours"):
+            original = getattr(IDataUtilities, name)
+            self._originals[name] = original
+            setattr(IDataUtilities, name, staticmethod(self._timed(original)))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for name, original in self._originals.items():
+            setattr(IDataUtilities, name, staticmethod(original))
+
+    def _timed(self, function):
+        @wraps(function)
+        def timed(*args, **kwargs):
+            started = time.thread_time()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.seconds += time.thread_time() - started
+        return timed
+
+
+def sequential_sweep(finder: IDataAppointmentFinder, dates: list[str]) -> None:
+    """Check the dates one after the other."""
+    for date_to_check in dates:
+        finder.check_for_specific_date(OFFICE_NAME, date_to_check, "free")
+
+
+def concurrent_sweep(finder: IDataAppointmentFinder, dates: list[str], concurrency: int) -> None:
+    """Check the dates concurrently."""
+    async def sweep():
+        async for _ in finder.sweep_dates(OFFICE_NAME, dates, "free", concurrency):
+            pass
+    asyncio.run(sweep())
+
+
+def pipeline_sweep(finder: IDataAppointmentFinder, dates: list[str], concurrency: int) -> None:
+    """Check only the open dates, found by getdate."""
+    finder.find_free_time_slots(OFFICE_NAME, dates[-1], "free", concurrency)
+
+
+def run_benchmark(server: ReplayServer,
+                  dates: list[str],
+                  concurrency: int,
+                  gate_ttl: float | None = None) -> None:
+    """Run every sweep once with a warm session and print the results."""
+    # Do not throttle the local server, the sweeps are measured unlimited.
+    session_manager = IDataSessionManager(
+        base_url=server.base_url, pool_maxsize=concurrency, rate_limiter=TokenBucket(1e6)
+    )
+    gate = None if gate_ttl is None else CalendarStatusGate(gate_ttl)
+    finder = IDataAppointmentFinder(session_manager, calendar_gate=gate)
+    finder.add_office(OFFICE_NAME, OFFICE_ID)
+
+    # Receive the tokens before measuring.
+    session_manager.requester.refresh_tokens()
+
+    sweeps = {
+        "sequential": lambda: sequential_sweep(finder, dates),
+        "concurrent": lambda: concurrent_sweep(finder, dates, concurrency),
+        "pipeline": lambda: pipeline_sweep(finder, dates, concurrency),
+    }
+
+    print(f"{'sweep':<12}{'latency (s)':>14}{'requests':>10}{'parse cpu (ms)':>16}{'errors':>8}")
+    for name, sweep in sweeps.items():
+        requests_before = server.total_requests
+        errors = 0
+        with ParseTimer() as parse_timer:
+            started = time.perf_counter()
+            try:
+                sweep()
+            except Exception:  # pylint: disable=broad-except
+                errors += 1
+            latency = time.perf_counter() - started
+        requests_sent = server.total_requests - requests_before
+        print(f"{name:<12}{latency:>14.3f}{requests_sent:>10}"
+              f"{parse_timer.seconds * 1000:>16.2f}{errors:>8}")
+
+    print(f"Session stats: {session_manager.stats()}")
+    print(f"Parse cache stats: {finder.parse_cache.stats()}")
+    if gate is not None:
+        print(f"Calendar gate stats: {gate.stats()}")
+    session_manager.close()
+
+
+def main() -> None:
+    """Parse the arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fixtures", help="Directory of the recorded responses.")
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--gate-ttl", type=float, help="Check the calendar status first.")
+    parser.add_argument("--closed", action="store_true", help="Write a closed calendar.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        directory = args.fixtures or temporary_directory
+        if args.fixtures:
+            dates = calendar_dates(args.days)
+        else:
+            dates = write_synthetic_fixtures(
+                directory, OFFICE_ID, args.days, calendar_open=not args.closed
+            )
+
+        with ReplayServer(directory, latency=args.latency, error_rate=args.error_rate) as server:
+            run_benchmark(server, dates, args.concurrency, args.gate_ttl)
+
+
+if __name__ == "__main__":
+    main()
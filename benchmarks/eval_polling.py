@@ -0,0 +1,103 @@
+"""
+An offline evaluation of the predictive polling against fixed intervals.
+
+The releases of the first days train the release model, the releases of
+the remaining days are replayed against every policy. The report shows
+the polls per day, the detected releases and the detection latency.
+
+Usage: python -m benchmarks.eval_polling [--history idata_history.bin --office-id 8]
+"""
+
+import argparse
+import bisect
+import statistics
+from collections.abc import Callable
+from datetime import datetime, timedelta
+
+from benchmarks.synthetic import synthetic_releases
+from core.history import AvailabilityHistory
+from core.polling import BudgetPollingPolicy, ReleaseModel
+
+
+def poll_times(interval_at: Callable[[float], float], start: float, end: float) -> list[float]:
+    """Returns the times of the polls from start until end."""
+    times, now = [], start
+    while now < end:
+        times.append(now)
+        now += interval_at(now)
+    return times
+
+
+def evaluate(polls: list[float], releases: list[tuple[float, float]]) -> dict[str, float]:
+    """Returns the detection statistics of the polls for the releases. A
+    release is detected by the first poll while the slot is open.
+    """
+    latencies = []
+    for appeared, vanished in releases:
+        index = bisect.bisect_left(polls, appeared)
+        if index < len(polls) and polls[index] < vanished:
+            latencies.append(polls[index] - appeared)
+
+    days = (polls[-1] - polls[0]) / 86400 if len(polls) > 1 else 1.0
+    return {
+        "polls_per_day": len(polls) / days,
+        "detected": len(latencies) / len(releases) if releases else 0.0,
+        "mean": statistics.fmean(latencies) if latencies else float("nan"),
+        "p50": statistics.median(latencies) if latencies else float("nan"),
+        "p90": statistics.quantiles(latencies, n=10)[-1] if len(latencies) > 1 else float("nan"),
+    }
+
+
+def history_releases(path: str, office_id: int, slot_type: str | None) -> list[tuple[float, float]]:
+    """Returns the (appeared, vanished) times of the office in the history."""
+    with AvailabilityHistory(path) as history:
+        return [
+            (record.observed_at, record.vanished_at or float("inf"))
+            for record in history.query(office_id=office_id, slot_type=slot_type)
+        ]
+
+
+def main() -> None:
+    """Train the model, replay the releases and print the report."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--history", help="Availability history file, synthetic if not given.")
+    parser.add_argument("--office-id", type=int, default=8, help="Office of the history.")
+    parser.add_argument("--slot-type", help="Slot type of the history, e.g. free.")
+    parser.add_argument("--days", type=int, default=56, help="Days of synthetic releases.")
+    parser.add_argument("--train-days", type=int, default=28, help="Days to train the model.")
+    args = parser.parse_args()
+
+    if args.history:
+        releases = history_releases(args.history, args.office_id, args.slot_type)
+        if not releases:
+            parser.error("No releases of the office in the history.")
+        first_day = datetime.fromtimestamp(releases[0][0]).replace(hour=0, minute=0, second=0)
+    else:
+        first_day = datetime(2023, 10, 2)
+        releases = synthetic_releases(first_day, args.days)
+
+    split = (first_day + timedelta(days=args.train_days)).timestamp()
+    training = [release for release in releases if release[0] < split]
+    testing = [release for release in releases if release[0] >= split]
+    end = max(split + 86400, testing[-1][0] + 3600 if testing else 0)
+
+    model = ReleaseModel()
+    for appeared, _ in training:
+        model.add_release(args.office_id, appeared)
+
+    policies = {"fixed 30s": lambda now: 30.0, "fixed 60s": lambda now: 60.0}
+    for daily_polls in (1440, 720):
+        policy = BudgetPollingPolicy(model, daily_polls, args.office_id, min_interval=10.0)
+        policies[f"predictive {daily_polls}/day"] = policy.interval_at
+
+    print(f"{len(training)} training and {len(testing)} replayed releases.")
+    print(f"{'policy':<22}{'polls/day':>11}{'detected':>10}{'mean (s)':>10}"
+          f"{'p50 (s)':>9}{'p90 (s)':>9}")
+    for name, interval_at in policies.items():
+        result = evaluate(poll_times(interval_at, split, end), testing)
+        print(f"{name:<22}{result['polls_per_day']:>11.0f}{result['detected']:>10.1%}"
+              f"{result['mean']:>10.1f}{result['p50']:>9.1f}{result['p90']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Synthetic iDATA responses and slot releases for the offline benchmarks.
+
+They are shaped like the appointment form, getdate and senddate pages,
+and can be written as fixtures for the replay server.
+"""
+
+import json
+import os
+import random
+from datetime import date, datetime, timedelta
+
+
+def synthetic_getdate(dates: list[str]) -> str:
+    """Returns a getdate like response with the given open dates."""
+    options = "".join(
+        f'<div class="col-md-3"><label class="form-control"> {date} </label></div>\n'
+        for date in dates
+    )
+    return f'<div class="row">{options}</div>'
+
+
+def synthetic_senddate(hours: int) -> str:
+    """Returns a senddate like response with the given number of hours."""
+    slot_classes = ("noPrime", "yesPrime", "yesVip")
+    buttons = "".join(
+        f'<button class="btn getdatebtnhour {slot_classes[hour % 3]}" type="button">'
+        f'<span>{8 + hour // 4:02d}</span>:<span>{hour % 4 * 15:02d}</span>'
+        f'<!-- slot --><br></button>\n'
+        for hour in range(hours)
+    )
+    return f'<div class="hours">{buttons}<p>Saat se&ccedil;iniz &amp; devam</div>'
+
+
+def synthetic_calendar_status(is_open: bool) -> str:
+    """Returns a calendar status like response."""
+    return json.dumps({"status": is_open})
+
+
+def synthetic_appointment_form(filler: int) -> str:
+    """Returns an appointment form like page with some filler markup."""
+    rows = "".join(
+        f'<tr><td class="cell">{row}</td><td><a href="#{row}">link</a></td></tr>\n'
+        for row in range(filler)
+    )
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8">'
+        '<script>var a = "<div class=\'noPrime\'>x</div>";</script>'
+        f'<style>.x {{}}</style></head><body><table>{rows}</table>'
+        '<meta name="csrf-token" content="Zm9vYmFyYmF6">'
+        '</body></html>'
+    )
+
+
+def calendar_dates(days: int) -> list[str]:
+    """Returns the dates from today for the given number of days."""
+    return [
+        (date.today() + timedelta(days=offset)).strftime("%d-%m-%Y")
+        for offset in range(days)
+    ]
+
+
+def write_synthetic_fixtures(directory: str,
+                             office_id: int = 8,
+                             days: int = 30,
+                             open_every: int = 7,
+                             hours: int = 12,
+                             calendar_open: bool = True) -> list[str]:
+    """Write the fixtures of a calendar from today for the given number of
+    days, where every open_every-th date is open with the given number of
+    hours. A closed calendar has no open dates. Returns all the dates of
+    the calendar.
+    """
+    os.makedirs(directory, exist_ok=True)
+    dates = calendar_dates(days)
+    open_dates = dates[::open_every] if calendar_open else []
+
+    fixtures = {
+        "appointment-form": synthetic_appointment_form(100),
+        "getdate": synthetic_getdate(open_dates),
+        "senddate": synthetic_senddate(0),
+        "getcalendarstatus": synthetic_calendar_status(calendar_open),
+    }
+    for open_date in open_dates:
+        fixtures[f"senddate-{office_id}-{open_date}"] = synthetic_senddate(hours)
+
+    for name, body in fixtures.items():
+        with open(os.path.join(directory, f"{name}.html"), "w", encoding="utf-8") as fixture:
+            fixture.write(body)
+    return dates
+
+
+# The (weekday, hour) windows in which the synthetic slots are released.
+RELEASE_WINDOWS = ((0, 9), (0, 14), (2, 9), (3, 16), (4, 9))
+
+
+def synthetic_releases(start: datetime,
+                       days: int,
+                       batches: int = 3,
+                       mean_lifetime: float = 180.0,
+                       noise_per_day: float = 0.5,
+                       seed: int = 0) -> list[tuple[float, float]]:
+    """Returns the (appeared, vanished) Unix times of slots released in
+    batches within RELEASE_WINDOWS, plus a few at random times. The slots
+    are taken after an exponentially distributed lifetime.
+    """
+    generator = random.Random(seed)
+    releases = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        release_times = [
+            day.replace(hour=hour, minute=generator.randrange(60), second=generator.randrange(60))
+            for weekday, hour in RELEASE_WINDOWS if weekday == day.weekday()
+            for _ in range(batches)
+        ]
+        if generator.random() < noise_per_day:
+            release_times.append(day + timedelta(seconds=generator.randrange(86400)))
+        for released_at in release_times:
+            appeared = released_at.timestamp()
+            releases.append((appeared, appeared + 20 + generator.expovariate(1 / mean_lifetime)))
+    return sorted(releases)
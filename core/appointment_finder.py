@@ -3,20 +3,93 @@ This module provides functionality to find appointments.
 """
 
 import logging
+import time
+from collections.abc import AsyncIterator, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
 
-from core.idata_requester import IDataRequester
+from core.calendar_gate import CalendarStatusGate
+from core.coordination import WorkCoordinator
+from core.dates import to_ordinal
+from core.history import NO_TIME, SLOT_TYPE_CODES, AvailabilityHistory, SlotKeyMixin, to_minute
+from core.metrics import REGISTRY
+from core.parse_cache import ParseCache, fingerprint
+from core.session_manager import IDataSessionManager
 from core.utils import IDataUtilities
 
 # Create a logger instance.
 logger = logging.getLogger("IDataAppointmentFinder")
 
+# The metrics of the searches, labelled by the office.
+SWEEP_SECONDS = REGISTRY.histogram(
+    "idata_sweep_seconds", "Duration of the searches of an office.", ("office", "search")
+)
+DATES_CHECKED_TOTAL = REGISTRY.counter(
+    "idata_dates_checked_total", "Dates checked with a senddate request.", ("office",)
+)
+SLOTS_FOUND_TOTAL = REGISTRY.counter(
+    "idata_slots_found_total", "Time slots found on the checked dates.", ("office", "slot_type")
+)
+
+# The slot type code of the records of the open dates.
+DATE_SLOT_TYPE = SLOT_TYPE_CODES["date"]
+
+
+class IDataQuery(NamedTuple):
+    """The parameters of the getdate and senddate requests of an office."""
+    office_name: str
+    exit_id: int
+    consular_id: int
+    service_type_id: int
+    calendar_type: int
+    total_person: int
+
+
+class _SlotRecordFields(NamedTuple):
+    """The fields of a slot record."""
+    office_id: int
+    day: int
+    minute: int
+    slot_type: int
+    observed_at: float
+    text: str
+
+
+class SlotRecord(SlotKeyMixin, _SlotRecordFields):
+    """An open date (minute is NO_TIME) or an open time slot of an office,
+    as observed at a Unix time, with the text the parser extracted. The
+    minute of a slot whose text has no time is NO_TIME too. The first four
+    fields are the key of the slot in the availability history.
+    """
+    __slots__ = ()
+
 
 class IDataAppointmentFinder:
     """This class functions as a wrapper for requests and provides the 
     functionality of searching and finding free slots.
     """
 
-    def __init__(self):
+    def __init__(self,
+                 session_manager: IDataSessionManager | None = None,
+                 history: AvailabilityHistory | None = None,
+                 parse_cache: ParseCache | None = None,
+                 calendar_gate: CalendarStatusGate | None = None,
+                 coordinator: WorkCoordinator | None = None):
+        # Shared session to reuse the connection and tokens between calls.
+        self.session_manager = session_manager or IDataSessionManager()
+
+        # The unchanged responses are not parsed again.
+        self.parse_cache: ParseCache = parse_cache or ParseCache()
+
+        # The calendar status is checked before the dates, if a gate is given.
+        self.calendar_gate: CalendarStatusGate | None = calendar_gate
+
+        # The dates are shared with the other workers, if a coordinator is given.
+        self.coordinator: WorkCoordinator | None = coordinator
+
+        # The open dates and slots are recorded in the history, if given.
+        self.history: AvailabilityHistory | None = history
+
         # Internal dictionary to store the exit point names and their IDs.
         self._exit_ids: dict[str, int] = {}
 
@@ -25,6 +98,7 @@ class IDataAppointmentFinder:
         self.service_type_id: int = 1
         self.calendar_type: int = 2
         self.total_person: int = 1
+        self.visa_country_id: int = 1
         self.personal_id: str = \
             "eyJpdiI6ImUzRlYwV0JYbFRFaTdoR2luYkJ4eUE9PSIsInZh" \
             "bHVlIjoicVdUUHpOOWJZclR0OEYxVFJEYkhaZz09IiwibWFj" \
@@ -35,44 +109,206 @@ class IDataAppointmentFinder:
         """Add an office name and its ID to check in functions."""
         self._exit_ids[office_name] = office_id
 
-    def find_available_dates(self, office_name: str, search_before: str) -> list[str]:
-        """Find the next available date."""
+    def query_for(self, office_name: str, **overrides) -> IDataQuery:
+        """Returns the query of the office with the default values, unless
+        they are overridden, e.g. query_for("Altunizade", total_person=2).
+        """
         # Check if the office name is valid.
         if office_name not in self._exit_ids:
             raise ValueError(f"Invalid office name: {office_name}")
-        exit_id = self._exit_ids[office_name]
-
-        with IDataRequester() as requester:
-            # Get the available dates.
-            response: str = requester.post_getdate(
-                self.consular_id,
-                exit_id, self.service_type_id,
-                self.calendar_type,
-                self.total_person
+
+        return IDataQuery(
+            office_name,
+            self._exit_ids[office_name],
+            self.consular_id,
+            self.service_type_id,
+            self.calendar_type,
+            self.total_person
+        )._replace(**overrides)
+
+    def calendar_open(self, query: IDataQuery, requests_sent: list[str] | None = None) -> bool:
+        """Returns False only if the calendar gate found the calendar of
+        the query closed, True without a gate. The status request is
+        added to requests_sent, if one is sent and the list is given.
+        """
+        if self.calendar_gate is None:
+            return True
+
+        def fetch_status() -> str:
+            if requests_sent is not None:
+                requests_sent.append("getcalenderstatus")
+            return self.session_manager.requester.post_getcalenderstatus(
+                query.exit_id, query.service_type_id, self.visa_country_id
             )
+        return self.calendar_gate.is_open((query.exit_id, query.service_type_id), fetch_status)
+
+    def claim_dates(self, office_name: str, dates: Iterable[str]) -> list[str]:
+        """Returns the dates of the office this worker checks in this
+        cycle, all of them without a coordinator.
+        """
+        if self.coordinator is None:
+            return list(dates)
+        units = {_date_unit(office_name, date): date for date in dates}
+        return [units[unit] for unit in self.coordinator.claim(units)]
+
+    def count_own_dates(self, office_name: str, dates: Iterable[str]) -> int:
+        """Returns how many of the dates of the office belong to this
+        worker, all of them without a coordinator.
+        """
+        if self.coordinator is None:
+            return len(list(dates))
+        return sum(
+            self.coordinator.owner_of(_date_unit(office_name, date)) == self.coordinator.worker_id
+            for date in dates
+        )
+
+    def claim_offices(self, office_names: Iterable[str]) -> list[str]:
+        """Returns the offices whose dates this worker searches in this
+        cycle, all of them without a coordinator.
+        """
+        if self.coordinator is None:
+            return list(office_names)
+        units = {f"{office_name}/getdate": office_name for office_name in office_names}
+        return [units[unit] for unit in self.coordinator.claim(units)]
+
+    def get_open_dates(self, office_name: str) -> list[str]:
+        """Returns all the dates the calendar of the office shows as open."""
+        return self.get_open_dates_for(self.query_for(office_name))
+
+    def get_open_dates_for(self, query: IDataQuery) -> list[str]:
+        """Returns all the dates the calendar shows as open for the query."""
+        return [date for _, date in self._fetch_open_days(query)]
 
-            # Parse the available dates.
-            available_dates = IDataUtilities.parse_available_dates(response)
-            logger.debug("Available dates: %s", available_dates)
+    def _fetch_open_days(self,
+                         query: IDataQuery,
+                         requests_sent: list[str] | None = None,
+                         observed_at: float | None = None
+                         ) -> tuple[tuple[int, str], ...]:
+        """Returns the (day ordinal, date text) of the open dates of the
+        query. The requests sent are added to requests_sent, if given.
+        The open dates of the default query of an office are recorded in
+        the history.
+        """
+        observed_at = time.time() if observed_at is None else observed_at
 
-            # Check if there are any available dates.
-            if not available_dates:
-                logger.info("%s: No available dates.", office_name)
-                return []
+        # A closed calendar has no open dates, getdate is not asked.
+        if not self.calendar_open(query, requests_sent):
+            logger.debug("%s: Calendar is closed.", query.office_name)
+            self._observe_open_days(query, (), observed_at)
+            return ()
 
-            # Remove dates before the given date.
-            dates_before = IDataUtilities.remove_dates_before(
-                available_dates,
-                allow_before=search_before
+        # Get the available dates.
+        response: str = self.session_manager.requester.post_getdate(
+            query.consular_id,
+            query.exit_id,
+            query.service_type_id,
+            query.calendar_type,
+            query.total_person
+        )
+        if requests_sent is not None:
+            requests_sent.append("getdate")
+
+        # Parse the available dates, unless the response is unchanged.
+        open_days = self.parse_cache.get_or_parse(
+            "getdate", query, fingerprint(response),
+            lambda: tuple(
+                (to_ordinal(date), date) for date in IDataUtilities.parse_available_dates(response)
             )
-            logger.debug("Dates before: %s", dates_before)
+        )
+        logger.debug("%s: %d open dates.", query.office_name, len(open_days))
+        self._observe_open_days(query, open_days, observed_at)
+        return open_days
+
+    def _observe_open_days(self,
+                           query: IDataQuery,
+                           open_days: tuple[tuple[int, str], ...],
+                           observed_at: float) -> None:
+        """Record the open dates in the history, if the query is the
+        default query of its office. The dates of the other person counts
+        and service types would close and reopen the dates of the office.
+        """
+        if self.history is None or query.office_name not in self._exit_ids \
+                or query != self.query_for(query.office_name):
+            return
+        self.history.observe(
+            query.exit_id, "date",
+            ((query.exit_id, day, NO_TIME, DATE_SLOT_TYPE) for day, _ in open_days),
+            at=observed_at
+        )
+
+    def iter_open_dates(self,
+                        office_name: str,
+                        search_before: str | None = None
+                        ) -> Iterator[SlotRecord]:
+        """Yield the open dates of the office as records, only the ones
+        before the given date if one is given. All the open dates are
+        recorded in the history.
+        """
+        query = self.query_for(office_name)
+        observed_at = time.time()
+        with SWEEP_SECONDS.time(office=office_name, search="available_dates"):
+            open_days = self._fetch_open_days(query, observed_at=observed_at)
+
+        # Remove dates before the given date.
+        before_day = None if search_before is None else to_ordinal(search_before)
+        for day, date in open_days:
+            if before_day is None or day < before_day:
+                yield SlotRecord(query.exit_id, day, NO_TIME, DATE_SLOT_TYPE, observed_at, date)
+
+    def find_available_dates(self, office_name: str, search_before: str) -> list[str]:
+        """Find the next available date."""
+        dates_before = [record.text for record in self.iter_open_dates(office_name, search_before)]
+        if not dates_before:
+            logger.info("%s: No available dates.", office_name)
+            return []
+
+        logger.info("[FOUND AVAILABLE DATE] %s: %s", office_name, dates_before)
+        return dates_before
+
+    def iter_slots(self,
+                   office_name: str,
+                   dates: Iterable[str],
+                   time_slot_type: str
+                   ) -> Iterator[SlotRecord]:
+        """Check the given dates one after the other and yield the open
+        time slots as records, as soon as the response of a date is parsed.
+        """
+        for date_to_check in dates:
+            yield from self._slot_records(office_name, date_to_check, time_slot_type)
 
-            if not dates_before:
-                logger.info("%s: No available dates.", office_name)
-                return []
+    async def aiter_slots(self,
+                          office_name: str,
+                          dates: Iterable[str],
+                          time_slot_type: str,
+                          concurrency: int = 5
+                          ) -> AsyncIterator[SlotRecord]:
+        """Check the given dates concurrently and yield the open time slots
+        as records, in the order the responses arrive.
+        """
+        async for _, records in self._sweep(office_name, dates, time_slot_type, concurrency):
+            for record in records:
+                yield record
 
-            logger.info("[FOUND AVAILABLE DATE] %s: %s", office_name, dates_before)
-            return dates_before
+    def _slot_records(self,
+                      office_name: str,
+                      date_to_check: str,
+                      time_slot_type: str
+                      ) -> tuple[SlotRecord, ...]:
+        """Check a date of the office, record its time slots in the
+        history and returns them as records.
+        """
+        query = self.query_for(office_name)
+        observed_at = time.time()
+        day = to_ordinal(date_to_check)
+        slot_type = SLOT_TYPE_CODES.get(time_slot_type, SLOT_TYPE_CODES["any"])
+        records = tuple(
+            SlotRecord(query.exit_id, day, minute, slot_type, observed_at, hour)
+            for minute, hour in self._fetch_open_hours(query, date_to_check, time_slot_type)
+        )
+        if self.history is not None:
+            self.history.observe(query.exit_id, time_slot_type,
+                                 (record[:4] for record in records), day=day, at=observed_at)
+        return records
 
     def check_for_specific_date(self,
                                 office_name: str,
@@ -80,30 +316,184 @@ class IDataAppointmentFinder:
                                 time_slot_type: str
                                 ) -> list[str]:
         """Check if a specific date is available."""
-        # Check if the office name is valid.
+        return [
+            record.text
+            for record in self.iter_slots(office_name, [date_to_check], time_slot_type)
+        ]
+
+    def check_date_for(self,
+                       query: IDataQuery,
+                       date_to_check: str,
+                       time_slot_type: str
+                       ) -> list[str]:
+        """Check if a specific date is available for the query."""
+        return [
+            hour for _, hour in self._fetch_open_hours(query, date_to_check, time_slot_type)
+        ]
+
+    def _fetch_open_hours(self,
+                          query: IDataQuery,
+                          date_to_check: str,
+                          time_slot_type: str
+                          ) -> tuple[tuple[int, str], ...]:
+        """Returns the (minute of the day, slot text) of the open time
+        slots of the date.
+        """
+        # A closed calendar has no free time slots, senddate is not asked.
+        if not self.calendar_open(query):
+            logger.info("%s: No free time slots on %s.", query.office_name, date_to_check)
+            return ()
+
+        # Check if the given date is available.
+        response: str = self.session_manager.requester.post_senddate(
+            date_to_check,
+            query.total_person,
+            query.consular_id,
+            query.exit_id,
+            query.calendar_type,
+            query.service_type_id,
+            self.personal_id
+        )
+
+        # Parse the response, unless it is unchanged.
+        open_hours = self.parse_cache.get_or_parse(
+            "senddate", (query, date_to_check, time_slot_type), fingerprint(response),
+            lambda: self._parse_hours(response, time_slot_type)
+        )
+        DATES_CHECKED_TOTAL.inc(office=query.office_name)
+
+        if not open_hours:
+            logger.info("%s: No free time slots on %s.", query.office_name, date_to_check)
+            return ()
+
+        SLOTS_FOUND_TOTAL.inc(len(open_hours), office=query.office_name,
+                              slot_type=time_slot_type)
+        logger.info("[FOUND TIME SLOT] %s on %s: %s", query.office_name, date_to_check,
+                    [hour for _, hour in open_hours])
+        return open_hours
+
+    @staticmethod
+    def _parse_hours(response: str, time_slot_type: str) -> tuple[tuple[int, str], ...]:
+        """Returns the (minute of the day, slot text) of the slots in the
+        senddate response, the minute is NO_TIME if the text has no time.
+        """
+        open_hours = tuple(
+            (to_minute(hour), hour)
+            for hour in IDataUtilities.parse_available_hours(response, time_slot_type)
+        )
+        unreadable = [hour for minute, hour in open_hours if minute == NO_TIME]
+        if unreadable:
+            logger.warning("Slot times without a time: %s", unreadable)
+        return open_hours
+
+    async def sweep_dates(self,
+                          office_name: str,
+                          dates: Iterable[str],
+                          time_slot_type: str,
+                          concurrency: int = 5
+                          ) -> AsyncIterator[tuple[str, list[str]]]:
+        """Check the given dates concurrently and yield (date, hours)
+        tuples in the order the responses arrive.
+        """
+        async for date_to_check, records in self._sweep(
+            office_name, dates, time_slot_type, concurrency
+        ):
+            yield date_to_check, [record.text for record in records]
+
+    async def _sweep(self,
+                     office_name: str,
+                     dates: Iterable[str],
+                     time_slot_type: str,
+                     concurrency: int
+                     ) -> AsyncIterator[tuple[str, tuple[SlotRecord, ...]]]:
+        """Check the given dates concurrently and yield (date, records)
+        tuples in the order the responses arrive.
+        """
+        # Check if the office name is valid before sending anything.
         if office_name not in self._exit_ids:
             raise ValueError(f"Invalid office name: {office_name}")
-        exit_id = self._exit_ids[office_name]
 
-        with IDataRequester() as requester:
-            # Check if the given date is available.
-            response: str = requester.post_senddate(
+        # The blocking requests run in a pool sized to the concurrency limit.
+        import asyncio  # pylint: disable=import-outside-toplevel
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+
+        async def check(date_to_check: str) -> tuple[str, tuple[SlotRecord, ...]]:
+            records = await loop.run_in_executor(
+                executor,
+                self._slot_records,
+                office_name,
                 date_to_check,
-                self.total_person,
-                self.consular_id,
-                exit_id,
-                self.calendar_type,
-                self.service_type_id,
-                self.personal_id
+                time_slot_type
             )
+            return date_to_check, records
+
+        tasks = [asyncio.ensure_future(check(date_to_check)) for date_to_check in dates]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            # Cancel the remaining requests if the caller stops early.
+            for task in tasks:
+                task.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def sweep_open_dates(self,
+                               office_name: str,
+                               until_date: str,
+                               time_slot_type: str,
+                               concurrency: int = 5
+                               ) -> AsyncIterator[tuple[str, list[str]]]:
+        """Check only the dates that getdate reports as open, from today
+        until the given date, and yield (date, hours) tuples as they arrive.
+        """
+        # The cheap getdate request prunes the expensive senddate requests.
+        import asyncio  # pylint: disable=import-outside-toplevel
+        requests_sent: list[str] = []
+        open_days = await asyncio.to_thread(
+            self._fetch_open_days, self.query_for(office_name), requests_sent
+        )
+        open_dates = {date for _, date in open_days}
+        calendar_dates = IDataUtilities.get_dates_between("today", until_date)
+        dates_to_check = self.claim_dates(
+            office_name, [date for date in calendar_dates if date in open_dates]
+        )
+        # Without the pruning, this worker would check its own share of
+        # the dates, the dates of the other workers are not saved.
+        saved = self.count_own_dates(office_name, calendar_dates) \
+            - len(dates_to_check) - len(requests_sent)
+        logger.info("%s: Checking %d of %d dates, %d requests saved.",
+                    office_name, len(dates_to_check), len(calendar_dates), max(0, saved))
+
+        async for result in self.sweep_dates(
+            office_name, dates_to_check, time_slot_type, concurrency
+        ):
+            yield result
+
+    def find_free_time_slots(self,
+                             office_name: str,
+                             until_date: str,
+                             time_slot_type: str,
+                             concurrency: int = 5
+                             ) -> dict[str, list[str]]:
+        """Returns the dates with free time slots until the given date,
+        using the getdate and senddate pipeline.
+        """
+        # The event loop is imported on the first sweep, for a fast start-up.
+        import asyncio  # pylint: disable=import-outside-toplevel
 
-            # Parse the response.
-            available_hours = IDataUtilities.parse_available_hours(response, time_slot_type)
+        async def collect() -> dict[str, list[str]]:
+            found = {}
+            async for date_check, available_hours in self.sweep_open_dates(
+                office_name, until_date, time_slot_type, concurrency
+            ):
+                if available_hours:
+                    found[date_check] = available_hours
+            return found
+        with SWEEP_SECONDS.time(office=office_name, search="free_time_slots"):
+            return asyncio.run(collect())
 
-            if not available_hours:
-                logger.info("%s: No free time slots on %s.", office_name, date_to_check)
-                return []
 
-            logger.info("[FOUND TIME SLOT] %s on %s: %s",
-                        office_name, date_to_check, available_hours)
-            return available_hours
+def _date_unit(office_name: str, date: str) -> str:
+    """Returns the work unit of a date of an office."""
+    return f"{office_name}/{date}"
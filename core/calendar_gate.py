@@ -0,0 +1,94 @@
+"""
+This module provides a gate which checks the calendar status before the
+getdate and senddate requests.
+"""
+
+import logging
+import threading
+import time
+from collections.abc import Callable, Hashable
+
+from core.exceptions import IDataHTTPError, IDataRateLimitError
+from core.metrics import REGISTRY
+from core.utils import IDataUtilities
+
+# Create a logger instance.
+logger = logging.getLogger("IDataCalendarGate")
+
+# The decisions of the gate, per decision and source ("cache" or "request").
+GATE_DECISIONS_TOTAL = REGISTRY.counter(
+    "idata_calendar_gate_total", "Decisions of the calendar status gate.", ("decision", "source")
+)
+
+
+class CalendarStatusGate:
+    """This class asks the small calendar status endpoint whether the
+    calendar of an office is open, and remembers the answer for ttl
+    seconds. The finder sends the heavier getdate and senddate requests
+    only while the calendar is open. An answer which cannot be read, or
+    an error of the status endpoint, counts as open, so the gate never
+    hides an opening, it only saves the requests of the closed calendars.
+    """
+
+    def __init__(self, ttl: float = 20.0):
+        self.ttl: float = ttl
+        self.status_requests: int = 0
+        self.skipped: int = 0
+        # key -> (calendar is open, checked at)
+        self._decisions: dict[Hashable, tuple[bool, float]] = {}
+        self._lock = threading.Lock()
+
+    def is_open(self, key: Hashable, fetch_status: Callable[[], str]) -> bool:
+        """Returns True if the calendar of the key (e.g. the office and the
+        service type) is open. fetch_status() sends the status request, it
+        is only called when the last decision is older than the TTL.
+        """
+        now = time.monotonic()
+        with self._lock:
+            decision = self._decisions.get(key)
+            if decision is not None and now - decision[1] < self.ttl:
+                if not decision[0]:
+                    self.skipped += 1
+                GATE_DECISIONS_TOTAL.inc(decision=_label(decision[0]), source="cache")
+                return decision[0]
+            self.status_requests += 1
+
+        try:
+            status = IDataUtilities.parse_calendar_status(fetch_status())
+        except IDataRateLimitError:
+            raise
+        except IDataHTTPError as error:
+            # The heavier requests decide until the TTL, if the status cannot be asked.
+            logger.warning("Calendar status of %s failed, checking the dates: %s", key, error)
+            GATE_DECISIONS_TOTAL.inc(decision="unknown", source="request")
+            with self._lock:
+                self._decisions[key] = (True, now)
+            return True
+
+        is_open = status is not False
+        GATE_DECISIONS_TOTAL.inc(decision="unknown" if status is None else _label(is_open),
+                                 source="request")
+        with self._lock:
+            self._decisions[key] = (is_open, now)
+            if not is_open:
+                self.skipped += 1
+        logger.debug("Calendar status of %s: %s.", key, status)
+        return is_open
+
+    def forget(self, key: Hashable | None = None) -> None:
+        """Forget the decision of the key, or all of them."""
+        with self._lock:
+            if key is None:
+                self._decisions.clear()
+            else:
+                self._decisions.pop(key, None)
+
+    def stats(self) -> dict[str, int]:
+        """Returns the status requests sent and the skipped checks."""
+        with self._lock:
+            return {"status_requests": self.status_requests, "skipped": self.skipped}
+
+
+def _label(is_open: bool) -> str:
+    """Returns the metric label of a decision."""
+    return "open" if is_open else "closed"
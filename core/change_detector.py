@@ -0,0 +1,144 @@
+"""
+This module provides a cache to detect the changes between poll results.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterable
+from typing import NamedTuple
+
+# Create a logger instance.
+logger = logging.getLogger("SlotChangeDetector")
+
+
+class SlotChange(NamedTuple):
+    """The slots which appeared or vanished on a date of an office."""
+    office: str
+    date: str
+    slot_type: str
+    appeared: tuple[str, ...]
+    vanished: tuple[str, ...]
+
+
+class SlotChangeDetector:
+    """This class remembers the last seen slots per (office, date, slot
+    type) and reports only the differences. Entries not seen for longer
+    than the TTL are forgotten. If a path is given, the state is kept on
+    disk to survive restarts. It can be shared by the jobs of several
+    threads.
+    """
+
+    def __init__(self, ttl: float = 3600.0, path: str | None = None):
+        self.ttl: float = ttl
+        self.path: str | None = path
+        # (office, date, slot type) -> (slots, last seen timestamp)
+        self._entries: dict[tuple[str, str, str], tuple[frozenset[str], float]] = {}
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    def update(self,
+               office: str,
+               slot_type: str,
+               observed: dict[str, list[str]],
+               scope: Iterable[str] | None = None
+               ) -> list[SlotChange]:
+        """Compare the observed {date: slots} with the cache and return the
+        changes. Known dates in the scope (all the known dates of the office
+        and slot type if no scope is given) which are not observed are
+        treated as vanished.
+        """
+        with self._lock:
+            return self._update(office, slot_type, observed, scope)
+
+    def _update(self,
+                office: str,
+                slot_type: str,
+                observed: dict[str, list[str]],
+                scope: Iterable[str] | None
+                ) -> list[SlotChange]:
+        """Compare the observed slots with the cache, under the lock."""
+        now = time.time()
+        self._evict(now)
+
+        # Find the dates whose slots were known but not observed now.
+        scope_dates = None if scope is None else set(scope)
+        missing = [
+            key for key in self._entries
+            if key[0] == office and key[2] == slot_type and key[1] not in observed
+            and (scope_dates is None or key[1] in scope_dates)
+        ]
+
+        changes = []
+        for date, slots in observed.items():
+            key = (office, date, slot_type)
+            previous, _ = self._entries.get(key, (frozenset(), now))
+            current = frozenset(slots)
+            if current:
+                self._entries[key] = (current, now)
+            else:
+                self._entries.pop(key, None)
+            if current != previous:
+                changes.append(SlotChange(
+                    office, date, slot_type,
+                    tuple(sorted(current - previous)),
+                    tuple(sorted(previous - current))
+                ))
+
+        for key in missing:
+            previous, _ = self._entries.pop(key)
+            changes.append(SlotChange(office, key[1], slot_type, (), tuple(sorted(previous))))
+
+        if changes:
+            logger.debug("%s: %d changes detected.", office, len(changes))
+            if self.path:
+                # The changes are reported even if the state cannot be saved.
+                try:
+                    self._save()
+                except OSError as error:
+                    logger.warning("Failed to save the state file %s: %s", self.path, error)
+        return changes
+
+    def _evict(self, now: float) -> None:
+        """Forget the entries which are not seen within the TTL."""
+        expired = [key for key, (_, seen_at) in self._entries.items() if now - seen_at > self.ttl]
+        for key in expired:
+            del self._entries[key]
+
+    def _load(self) -> None:
+        """Load the entries from the state file, if there is one."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as state_file:
+                entries = json.load(state_file)
+        except (OSError, ValueError) as error:
+            logger.warning("Failed to load the state file %s: %s", self.path, error)
+            return
+        # An invalid state file counts as empty.
+        loaded = {}
+        try:
+            for office, date, slot_type, slots, seen_at in entries:
+                if not isinstance(slots, list):
+                    raise TypeError(f"the slots of {office} on {date} are not a list")
+                loaded[(office, date, slot_type)] = (frozenset(slots), float(seen_at))
+        except (TypeError, ValueError) as error:
+            logger.warning("Invalid state file %s: %s", self.path, error)
+            return
+        self._entries.update(loaded)
+        self._evict(time.time())
+        logger.debug("Loaded %d entries from %s.", len(self._entries), self.path)
+
+    def _save(self) -> None:
+        """Write the entries to the state file atomically."""
+        entries = [
+            [office, date, slot_type, sorted(slots), seen_at]
+            for (office, date, slot_type), (slots, seen_at) in self._entries.items()
+        ]
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as state_file:
+            json.dump(entries, state_file)
+        os.replace(temporary_path, self.path)
@@ -0,0 +1,244 @@
+"""
+This module provides the coordination of the workers of several hosts,
+which share the work units through time-bounded leases.
+"""
+
+import abc
+import hashlib
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable
+
+from core.metrics import REGISTRY
+
+# Create a logger instance.
+logger = logging.getLogger("IDataCoordination")
+
+# The work units claimed and skipped by this worker, and the live workers.
+UNITS_TOTAL = REGISTRY.counter(
+    "idata_coordination_units_total", "Work units seen by the worker.", ("result",)
+)
+LIVE_WORKERS = REGISTRY.histogram(
+    "idata_coordination_live_workers", "Live workers seen in a claim.",
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16, 32)
+)
+
+
+class LeaseBackend(abc.ABC):
+    """Base class of the lease stores shared by the workers. The times are
+    Unix times, so the clocks of the hosts must agree to well within the
+    lease TTL.
+    """
+
+    @abc.abstractmethod
+    def heartbeat(self, worker_id: str, ttl: float) -> list[str]:
+        """Mark the worker live for ttl seconds, returns the live workers."""
+
+    @abc.abstractmethod
+    def acquire(self, worker_id: str, units: Iterable[str], ttl: float) -> set[str]:
+        """Take or renew the leases of the units which are free, expired or
+        held by a dead worker, and returns the given units the worker holds.
+        """
+
+    @abc.abstractmethod
+    def release(self, worker_id: str, units: Iterable[str] | None = None) -> None:
+        """Release the leases of the units held by the worker, or all of them."""
+
+    @abc.abstractmethod
+    def leave(self, worker_id: str) -> None:
+        """Release the leases of the worker and remove it from the live workers."""
+
+    def close(self) -> None:
+        """Close the store."""
+
+
+class SQLiteLeaseBackend(LeaseBackend):
+    """This class keeps the workers and the leases in a SQLite database,
+    for the workers of one host or of hosts sharing a reliable file system.
+    Every change is one immediate transaction, so the leases are taken
+    atomically even by several processes.
+    """
+
+    def __init__(self, path: str, timeout: float = 10.0):
+        self.path: str = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, timeout=timeout, isolation_level=None, check_same_thread=False
+        )
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS workers ("
+                "worker_id TEXT PRIMARY KEY, expires_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                "unit TEXT PRIMARY KEY, worker_id TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS leases_worker ON leases (worker_id)"
+            )
+
+    def _transaction(self, statements) -> list:
+        """Run the (sql, parameters, many) statements in one immediate
+        transaction, and returns the rows of the last one.
+        """
+        with self._lock:
+            cursor = self._connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, parameters, many in statements:
+                    if many:
+                        cursor.executemany(sql, parameters)
+                    else:
+                        cursor.execute(sql, parameters)
+                rows = cursor.fetchall()
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            return rows
+
+    def heartbeat(self, worker_id: str, ttl: float) -> list[str]:
+        now = time.time()
+        rows = self._transaction([
+            ("INSERT INTO workers (worker_id, expires_at) VALUES (?, ?) "
+             "ON CONFLICT (worker_id) DO UPDATE SET expires_at = excluded.expires_at",
+             (worker_id, now + ttl), False),
+            ("DELETE FROM workers WHERE expires_at <= ?", (now,), False),
+            ("SELECT worker_id FROM workers ORDER BY worker_id", (), False),
+        ])
+        return [row[0] for row in rows]
+
+    def acquire(self, worker_id: str, units: Iterable[str], ttl: float) -> set[str]:
+        now = time.time()
+        units = list(units)
+        rows = self._transaction([
+            ("INSERT INTO leases (unit, worker_id, expires_at) VALUES (:unit, :worker, :expires) "
+             "ON CONFLICT (unit) DO UPDATE "
+             "SET worker_id = excluded.worker_id, expires_at = excluded.expires_at "
+             "WHERE leases.worker_id = excluded.worker_id OR leases.expires_at <= :now "
+             "OR leases.worker_id NOT IN (SELECT worker_id FROM workers WHERE expires_at > :now)",
+             [{"unit": unit, "worker": worker_id, "expires": now + ttl, "now": now}
+              for unit in units], True),
+            ("SELECT unit FROM leases WHERE worker_id = ? AND expires_at > ?",
+             (worker_id, now), False),
+        ])
+        return {row[0] for row in rows} & set(units)
+
+    def release(self, worker_id: str, units: Iterable[str] | None = None) -> None:
+        if units is None:
+            self._transaction([("DELETE FROM leases WHERE worker_id = ?", (worker_id,), False)])
+            return
+        self._transaction([
+            ("DELETE FROM leases WHERE unit = ? AND worker_id = ?",
+             [(unit, worker_id) for unit in units], True),
+        ])
+
+    def leave(self, worker_id: str) -> None:
+        self._transaction([
+            ("DELETE FROM leases WHERE worker_id = ?", (worker_id,), False),
+            ("DELETE FROM workers WHERE worker_id = ?", (worker_id,), False),
+        ])
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def _weight(worker_id: str, unit: str) -> int:
+    """Returns the rendezvous hashing weight of the worker for the unit."""
+    digest = hashlib.blake2b(f"{worker_id}\0{unit}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class WorkCoordinator:
+    """This class splits the work units (e.g. "Altunizade/17-11-2023")
+    between the live workers. Every unit belongs to the live worker with
+    the highest rendezvous hash, so a joining or leaving worker moves only
+    its share of the units. The owner polls a unit only while it holds its
+    lease, so two workers never poll the same unit, and the units of a
+    dead worker go to the others once its heartbeat expires. A background
+    thread keeps the heartbeat of the worker while it runs.
+    """
+
+    def __init__(self,
+                 backend: LeaseBackend,
+                 worker_id: str | None = None,
+                 lease_ttl: float = 60.0):
+        self.backend: LeaseBackend = backend
+        self.worker_id: str = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_ttl: float = lease_ttl
+        self.live_workers: list[str] = []
+        self._held: set[str] = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._heartbeat_thread: threading.Thread | None = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self) -> None:
+        """Join the workers and keep the heartbeat in the background."""
+        self.live_workers = self.backend.heartbeat(self.worker_id, self.lease_ttl)
+        self._stop_event.clear()
+        self._heartbeat_thread = threading.Thread(
+            target=self._keep_heartbeat, name="CoordinatorHeartbeat", daemon=True
+        )
+        self._heartbeat_thread.start()
+        logger.info("Worker %s joined, %d live workers.", self.worker_id, len(self.live_workers))
+
+    def stop(self) -> None:
+        """Leave the workers, the units go to the others at once."""
+        self._stop_event.set()
+        if self._heartbeat_thread is not None:
+            self._heartbeat_thread.join()
+            self._heartbeat_thread = None
+        self.backend.leave(self.worker_id)
+        logger.info("Worker %s left.", self.worker_id)
+
+    def _keep_heartbeat(self) -> None:
+        """Renew the heartbeat three times per TTL."""
+        while not self._stop_event.wait(self.lease_ttl / 3):
+            try:
+                self.live_workers = self.backend.heartbeat(self.worker_id, self.lease_ttl)
+            except Exception as error:  # pylint: disable=broad-except
+                logger.warning("Heartbeat of %s failed: %s", self.worker_id, error)
+
+    def owner_of(self, unit: str) -> str | None:
+        """Returns the live worker the unit belongs to."""
+        if not self.live_workers:
+            return None
+        return max(self.live_workers, key=lambda worker_id: _weight(worker_id, unit))
+
+    def claim(self, units: Iterable[str]) -> list[str]:
+        """Returns the units this worker polls in this cycle, in the given
+        order: the ones which belong to it and whose lease it holds. The
+        leases of the units which moved to another worker are released.
+        """
+        units = list(units)
+        self.live_workers = self.backend.heartbeat(self.worker_id, self.lease_ttl)
+        LIVE_WORKERS.observe(len(self.live_workers))
+        mine = [unit for unit in units if self.owner_of(unit) == self.worker_id]
+
+        with self._lock:
+            moved = self._held.intersection(units).difference(mine)
+            if moved:
+                self.backend.release(self.worker_id, moved)
+            held = self.backend.acquire(self.worker_id, mine, self.lease_ttl)
+            self._held = (self._held - moved - set(units)) | held
+
+        claimed = [unit for unit in mine if unit in held]
+        UNITS_TOTAL.inc(len(claimed), result="claimed")
+        UNITS_TOTAL.inc(len(units) - len(claimed), result="skipped")
+        logger.debug("%s: Claimed %d of %d units, %d live workers.",
+                     self.worker_id, len(claimed), len(units), len(self.live_workers))
+        return claimed
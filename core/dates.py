@@ -0,0 +1,123 @@
+"""
+This module provides compact date handling for the "dd-mm-yyyy" strings.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Iterator
+from datetime import date
+from functools import lru_cache
+
+# The date format used by the iDATA website.
+DATE_FORMAT = "%d-%m-%Y"
+
+
+@lru_cache(maxsize=4096)
+def to_ordinal(date_string: str) -> int:
+    """Returns the proleptic Gregorian ordinal of a "dd-mm-yyyy" date."""
+    day, month, year = date_string.split("-")
+    return date(int(year), int(month), int(day)).toordinal()
+
+
+@lru_cache(maxsize=4096)
+def from_ordinal(ordinal: int) -> str:
+    """Returns the "dd-mm-yyyy" string of an ordinal."""
+    return date.fromordinal(ordinal).strftime(DATE_FORMAT)
+
+
+def today_ordinal() -> int:
+    """Returns the ordinal of today."""
+    return date.today().toordinal()
+
+
+@lru_cache(maxsize=64)
+def date_range(start_ordinal: int, end_ordinal: int) -> tuple[str, ...]:
+    """Returns the "dd-mm-yyyy" strings from start to end, both included."""
+    return tuple(from_ordinal(ordinal) for ordinal in range(start_ordinal, end_ordinal + 1))
+
+
+class DateSet:
+    """This class keeps a sorted set of dates as ordinals in an array, and
+    provides bulk filtering and set operations on them.
+    """
+    __slots__ = ("ordinals",)
+
+    def __init__(self, ordinals: Iterable[int] = ()):
+        self.ordinals: array = array("l", sorted(set(ordinals)))
+
+    @classmethod
+    def from_strings(cls, date_strings: Iterable[str]) -> "DateSet":
+        """Create the set from "dd-mm-yyyy" strings."""
+        return cls(to_ordinal(date_string) for date_string in date_strings)
+
+    @classmethod
+    def from_range(cls, start_ordinal: int, end_ordinal: int) -> "DateSet":
+        """Create the set of the dates from start to end, both included."""
+        date_set = cls()
+        date_set.ordinals = array("l", range(start_ordinal, end_ordinal + 1))
+        return date_set
+
+    @classmethod
+    def _from_sorted(cls, ordinals: Iterable[int]) -> "DateSet":
+        """Create the set from already sorted and unique ordinals."""
+        date_set = cls()
+        date_set.ordinals = array("l", ordinals)
+        return date_set
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.ordinals)
+
+    def __contains__(self, ordinal: int) -> bool:
+        index = bisect_left(self.ordinals, ordinal)
+        return index < len(self.ordinals) and self.ordinals[index] == ordinal
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, DateSet) and self.ordinals == other.ordinals
+
+    def __repr__(self) -> str:
+        return f"DateSet({self.to_strings()})"
+
+    def to_strings(self) -> list[str]:
+        """Returns the dates as "dd-mm-yyyy" strings."""
+        return [from_ordinal(ordinal) for ordinal in self.ordinals]
+
+    def before(self, ordinal: int) -> "DateSet":
+        """Returns the dates before the ordinal, excluded."""
+        return self._from_sorted(self.ordinals[:bisect_left(self.ordinals, ordinal)])
+
+    def after(self, ordinal: int) -> "DateSet":
+        """Returns the dates after the ordinal, excluded."""
+        return self._from_sorted(self.ordinals[bisect_right(self.ordinals, ordinal):])
+
+    def within(self, start_ordinal: int, end_ordinal: int) -> "DateSet":
+        """Returns the dates from start to end, both included."""
+        start = bisect_left(self.ordinals, start_ordinal)
+        end = bisect_right(self.ordinals, end_ordinal)
+        return self._from_sorted(self.ordinals[start:end])
+
+    def on_weekdays(self, weekdays: Iterable[int]) -> "DateSet":
+        """Returns the dates on the given weekdays, Monday is 0."""
+        mask = 0
+        for weekday in weekdays:
+            mask |= 1 << weekday
+        # The ordinal 1 (01-01-0001) is a Monday.
+        return self._from_sorted(
+            ordinal for ordinal in self.ordinals if mask >> ((ordinal - 1) % 7) & 1
+        )
+
+    def excluding(self, other: "DateSet | Iterable[int]") -> "DateSet":
+        """Returns the dates which are not in the other dates."""
+        excluded = set(other)
+        return self._from_sorted(ordinal for ordinal in self.ordinals if ordinal not in excluded)
+
+    def intersection(self, other: "DateSet | Iterable[int]") -> "DateSet":
+        """Returns the dates which are also in the other dates."""
+        included = set(other)
+        return self._from_sorted(ordinal for ordinal in self.ordinals if ordinal in included)
+
+    def union(self, other: "DateSet | Iterable[int]") -> "DateSet":
+        """Returns the dates which are in any of the sets."""
+        return DateSet(set(self.ordinals).union(other))
@@ -0,0 +1,140 @@
+"""
+This module provides a background dispatcher for the notifications.
+"""
+
+import logging
+import queue
+import threading
+import time
+
+from core.exceptions import IDataNotificationError
+from core.metrics import REGISTRY
+from core.notifier import WhatsappNotifier
+
+# Create a logger instance.
+logger = logging.getLogger("NotificationDispatcher")
+
+# The time from queueing a message until it is delivered.
+NOTIFICATION_LAG_SECONDS = REGISTRY.histogram(
+    "idata_notification_lag_seconds", "Time from queueing a message until it is sent."
+)
+
+
+class NotificationDispatcher:
+    """This class sends the notifications from a background thread, so
+    the polling loop never waits on them. The messages queued within the
+    coalescing window are joined into one message per recipient. Every
+    recipient has its own queue and sender thread, so a failing recipient
+    whose sends are retried with an exponential backoff only delays its
+    own messages.
+    """
+
+    def __init__(self,
+                 notifier: WhatsappNotifier,
+                 phone_numbers: list[str] | None = None,
+                 window: float = 2.0,
+                 max_retries: int = 3,
+                 backoff: float = 2.0):
+        self.notifier: WhatsappNotifier = notifier
+        self.phone_numbers: list[str] = phone_numbers or notifier.phone_numbers
+        self.window: float = window
+        self.max_retries: int = max_retries
+        self.backoff: float = backoff
+
+        # The messages are queued with the time they are queued at.
+        self._queue: queue.Queue[tuple[float, str] | None] = queue.Queue()
+        # The coalesced messages of every recipient.
+        self._recipient_queues: dict[str, queue.Queue[tuple[float, str] | None]] = {
+            phone_number: queue.Queue() for phone_number in self.phone_numbers
+        }
+        # The retries are not waited for once the dispatcher stops.
+        self._stop_event = threading.Event()
+        self._senders = [
+            threading.Thread(target=self._send_loop, args=(phone_number,),
+                             name=f"NotificationSender-{index}", daemon=True)
+            for index, phone_number in enumerate(self.phone_numbers)
+        ]
+        for sender in self._senders:
+            sender.start()
+        self._thread = threading.Thread(
+            target=self._run, name="NotificationDispatcher", daemon=True
+        )
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def notify(self, message: str) -> None:
+        """Queue the message to all the recipients without waiting."""
+        self._queue.put((time.monotonic(), message))
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Send the queued messages and stop the dispatcher. The failed
+        sends are retried without waiting for the backoff.
+        """
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._stop_event.set()
+        for sender in self._senders:
+            sender.join(timeout)
+
+    def _run(self) -> None:
+        """Collect the messages of a window and send them together."""
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            queued_at, message = item
+            messages = [message]
+
+            # Coalesce the messages arriving within the window.
+            deadline = time.monotonic() + self.window
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                messages.append(item[1])
+
+            combined = "\n".join(messages)
+            logger.debug("Dispatching %d messages to %d recipients.",
+                         len(messages), len(self.phone_numbers))
+            for recipient_queue in self._recipient_queues.values():
+                recipient_queue.put((queued_at, combined))
+
+        # The senders stop once their queued messages are sent.
+        for recipient_queue in self._recipient_queues.values():
+            recipient_queue.put(None)
+
+    def _send_loop(self, phone_number: str) -> None:
+        """Send the messages of a recipient in order."""
+        recipient_queue = self._recipient_queues[phone_number]
+        while (item := recipient_queue.get()) is not None:
+            queued_at, message = item
+            self._send_with_retry(phone_number, message, queued_at)
+
+    def _send_with_retry(self, phone_number: str, message: str, queued_at: float) -> bool:
+        """Send the message, retry with a backoff if it fails."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                if self.notifier.send_message(phone_number, message):
+                    NOTIFICATION_LAG_SECONDS.observe(time.monotonic() - queued_at)
+                    return True
+            except IDataNotificationError as error:
+                logger.error("Cannot send message to %s: %s", phone_number, error)
+                return False
+            except Exception as error:  # pylint: disable=broad-except
+                logger.error("Failed to send message to %s: %s", phone_number, error)
+
+            if attempt < self.max_retries:
+                self._stop_event.wait(self.backoff * 2 ** attempt)
+
+        logger.error("Giving up sending message to %s.", phone_number)
+        return False
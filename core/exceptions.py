@@ -0,0 +1,37 @@
+"""
+This module collects the exceptions raised by the core package.
+"""
+
+
+class IDataError(Exception):
+    """Base class of all the errors raised by the core package."""
+
+
+class IDataHTTPError(IDataError):
+    """Raised when the iDATA website answers with an error status code."""
+
+    def __init__(self, url: str, status_code: int):
+        super().__init__(f"{url} answered with status code {status_code}")
+        self.url: str = url
+        self.status_code: int = status_code
+
+
+class IDataRateLimitError(IDataHTTPError):
+    """Raised when the iDATA website throttles the requests."""
+
+
+class IDataNotificationError(IDataError):
+    """Raised when a notification cannot be sent."""
+
+
+class IDataCircuitOpenError(IDataError):
+    """Raised when the requests to a host are paused after many failures."""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"Circuit of {host} is open, retry in {retry_in:.1f} seconds")
+        self.host: str = host
+        self.retry_in: float = retry_in
+
+
+class IDataTokenError(IDataError):
+    """Raised when the CSRF tokens cannot be received from the website."""
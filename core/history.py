@@ -0,0 +1,323 @@
+"""
+This module provides an append-only on-disk history of the availability.
+"""
+
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from datetime import date
+from typing import NamedTuple
+
+from core.dates import from_ordinal
+
+# Create a logger instance.
+logger = logging.getLogger("AvailabilityHistory")
+
+# The file starts with this header, followed by the fixed size records.
+HEADER = b"IDHIST01"
+
+# office id, day ordinal, minute of the day, slot type, observed at, vanished at.
+RECORD = struct.Struct("<HiHBxdd")
+
+# The offset of the vanished at field in a record.
+VANISHED_AT_OFFSET = RECORD.size - 8
+
+# The minute of the day of the records of a whole date, e.g. from getdate.
+NO_TIME = 0xFFFF
+
+# The codes of the slot types, the unknown types are stored as "any".
+SLOT_TYPES = ("date", "free", "prime", "vip", "any")
+SLOT_TYPE_CODES = {slot_type: code for code, slot_type in enumerate(SLOT_TYPES)}
+
+# Read the file in chunks of this many records when scanning it.
+_SCAN_CHUNK = 4096
+
+
+class SlotKeyMixin:
+    """The properties of the records whose first four fields are the key
+    of a slot: the office id, the day ordinal, the minute of the day and
+    the slot type code.
+    """
+    __slots__ = ()
+    day: int
+    minute: int
+    slot_type: int
+
+    @property
+    def date(self) -> str:
+        """Returns the date as a "dd-mm-yyyy" string."""
+        return from_ordinal(self.day)
+
+    @property
+    def time(self) -> str | None:
+        """Returns the slot time as a "HH:MM" string, None for a date or
+        a slot whose time could not be read.
+        """
+        if self.minute == NO_TIME:
+            return None
+        return from_minute(self.minute)
+
+    @property
+    def slot_type_name(self) -> str:
+        """Returns the name of the slot type."""
+        return SLOT_TYPES[self.slot_type]
+
+
+class _HistoryRecordFields(NamedTuple):
+    """The fields of a record of the history file."""
+    office_id: int
+    day: int
+    minute: int
+    slot_type: int
+    observed_at: float
+    vanished_at: float
+
+
+class HistoryRecord(SlotKeyMixin, _HistoryRecordFields):
+    """A slot (or a whole date) which was open from observed_at until
+    vanished_at, or which is still open if vanished_at is 0.
+    """
+    __slots__ = ()
+
+
+# The start time of a slot text, e.g. "09:00", "9.30" or "09:00 - 09:15".
+_SLOT_TIME = re.compile(r"\s*(\d{1,2})[:.](\d{2})")
+
+
+def to_minute(slot_time: str) -> int:
+    """Returns the minute of the day of the start time of a slot text,
+    NO_TIME if it has no time.
+    """
+    match = _SLOT_TIME.match(slot_time)
+    if match is None:
+        return NO_TIME
+    hour, minute = int(match.group(1)), int(match.group(2))
+    if hour > 23 or minute > 59:
+        return NO_TIME
+    return hour * 60 + minute
+
+
+def from_minute(minute: int) -> str:
+    """Returns the "HH:MM" slot time of a minute of the day."""
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+class AvailabilityHistory:
+    """This class keeps the history of the open slots in a file of fixed
+    size records. A record is appended when a slot appears and its
+    vanished at field is updated in place when it disappears, so the file
+    is sorted by the observed at time. The range queries search the time
+    range in the memory-mapped file and only read the records within it,
+    so the history is never loaded into memory. Only the open slots are
+    kept in memory, to detect the vanished ones.
+    """
+
+    def __init__(self, path: str):
+        self.path: str = path
+        self._lock = threading.RLock()
+        self._file = None
+        self._mmap: mmap.mmap | None = None
+        self._mapped_size: int = 0
+        self._last_observed_at: float = 0.0
+        # (office id, day, minute, slot type) -> index of the open record
+        self._open: dict[tuple[int, int, int, int], int] = {}
+        self._open_file()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._record_count()
+
+    def close(self) -> None:
+        """Close the file and its memory map."""
+        with self._lock:
+            self._unmap()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _open_file(self) -> None:
+        """Open or create the file, and find the open slots in it."""
+        # Not in append mode, as pwrite appends instead of updating there.
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            with open(self.path, "wb") as new_file:
+                new_file.write(HEADER)
+        self._file = open(self.path, "r+b")  # pylint: disable=consider-using-with
+        if self._file.read(len(HEADER)) != HEADER:
+            self._file.close()
+            raise ValueError(f"{self.path} is not an availability history file")
+
+        # Drop a partially written last record.
+        size = os.fstat(self._file.fileno()).st_size
+        if (size - len(HEADER)) % RECORD.size:
+            logger.warning("Truncating a partial record in %s.", self.path)
+            self._file.truncate(size - (size - len(HEADER)) % RECORD.size)
+
+        self._open.clear()
+        for index, record in enumerate(self._scan(0, self._record_count())):
+            if not record.vanished_at:
+                self._open[record[:4]] = index
+            self._last_observed_at = record.observed_at
+        logger.debug("Opened %s with %d records, %d open.",
+                     self.path, self._record_count(), len(self._open))
+
+    def _record_count(self) -> int:
+        """Returns the number of the records in the file."""
+        return (os.fstat(self._file.fileno()).st_size - len(HEADER)) // RECORD.size
+
+    def _unmap(self) -> None:
+        """Close the memory map."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+            self._mapped_size = 0
+
+    def _mapped(self) -> mmap.mmap | None:
+        """Returns the memory map of the file, remapped if it has grown."""
+        size = len(HEADER) + self._record_count() * RECORD.size
+        if size == len(HEADER):
+            return None
+        if self._mmap is None or self._mapped_size != size:
+            self._unmap()
+            self._mmap = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)
+            self._mapped_size = size
+        return self._mmap
+
+    def _read(self, index: int) -> HistoryRecord:
+        """Returns the record at the index."""
+        return HistoryRecord(*RECORD.unpack_from(self._mapped(), len(HEADER) + index * RECORD.size))
+
+    def _scan(self, start: int, stop: int) -> Iterator[HistoryRecord]:
+        """Yield the records from start to stop, reading them in chunks.
+        The lock is held only while a chunk is copied from the map.
+        """
+        for chunk_start in range(start, stop, _SCAN_CHUNK):
+            chunk_stop = min(stop, chunk_start + _SCAN_CHUNK)
+            with self._lock:
+                chunk = self._mapped()[len(HEADER) + chunk_start * RECORD.size:
+                                       len(HEADER) + chunk_stop * RECORD.size]
+            for fields in RECORD.iter_unpack(chunk):
+                yield HistoryRecord(*fields)
+
+    def _bisect(self, observed_at: float) -> int:
+        """Returns the index of the first record observed at or after the time."""
+        low, high = 0, self._record_count()
+        while low < high:
+            middle = (low + high) // 2
+            if self._read(middle).observed_at < observed_at:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def observe(self,
+                office_id: int,
+                slot_type: str,
+                keys: Iterable[tuple[int, int, int, int]],
+                day: int | None = None,
+                at: float | None = None) -> None:
+        """Record the open (office id, day, minute, slot type) keys, e.g.
+        the first four fields of the slot records of the finder. The open
+        slots of the office and the slot type (and the day, if given) not
+        in the keys are recorded as vanished, with the time slots of the
+        vanished dates. The slots of the past days are closed as well.
+        """
+        code = SLOT_TYPE_CODES.get(slot_type, SLOT_TYPE_CODES["any"])
+        with self._lock:
+            # Keep the file sorted by time, even if the clock goes back.
+            now = max(time.time() if at is None else at, self._last_observed_at)
+            today = date.fromtimestamp(now).toordinal()
+            observed = {key for key in keys if key[1] >= today}
+            known = {
+                key for key in self._open
+                if key[0] == office_id and key[3] == code and (day is None or key[1] == day)
+            }
+            vanished = known - observed
+            if code == SLOT_TYPE_CODES["date"] and vanished:
+                # The time slots of a vanished date vanish with it.
+                days = {key[:2] for key in vanished}
+                vanished.update(key for key in self._open if key[:2] in days)
+            vanished.update(key for key in self._open if key[1] < today)
+            self._apply(observed - known, vanished, now)
+
+    def _apply(self, appeared: set, vanished: set, now: float) -> None:
+        """Append the appeared slots and close the vanished ones."""
+        if appeared:
+            index = self._record_count()
+            self._file.seek(0, os.SEEK_END)
+            self._file.write(b"".join(RECORD.pack(*key, now, 0.0) for key in sorted(appeared)))
+            self._file.flush()
+            for offset, key in enumerate(sorted(appeared)):
+                self._open[key] = index + offset
+            self._last_observed_at = now
+
+        for key in vanished:
+            index = self._open.pop(key)
+            os.pwrite(self._file.fileno(), struct.pack("<d", now),
+                      len(HEADER) + index * RECORD.size + VANISHED_AT_OFFSET)
+
+    def query(self,
+              start: float | None = None,
+              end: float | None = None,
+              office_id: int | None = None,
+              slot_type: str | None = None,
+              first_day: int | None = None,
+              last_day: int | None = None) -> Iterator[HistoryRecord]:
+        """Yield the records observed from start until end (Unix times),
+        filtered by the office, the slot type and the day ordinals.
+        """
+        code = None if slot_type is None else SLOT_TYPE_CODES.get(slot_type, SLOT_TYPE_CODES["any"])
+        with self._lock:
+            first = 0 if start is None else self._bisect(start)
+            last = self._record_count() if end is None else self._bisect(end)
+
+        for record in self._scan(first, last):
+            if office_id is not None and record.office_id != office_id:
+                continue
+            if code is not None and record.slot_type != code:
+                continue
+            if first_day is not None and record.day < first_day:
+                continue
+            if last_day is not None and record.day > last_day:
+                continue
+            yield record
+
+    def open_slots(self, office_id: int | None = None) -> list[HistoryRecord]:
+        """Returns the slots which are open now."""
+        with self._lock:
+            return [
+                self._read(index) for key, index in sorted(self._open.items(), key=lambda i: i[1])
+                if office_id is None or key[0] == office_id
+            ]
+
+    def compact(self, retention: float, now: float | None = None) -> int:
+        """Rewrite the file without the slots which vanished more than
+        retention seconds ago, and returns the number of dropped records.
+        """
+        cutoff = (time.time() if now is None else now) - retention
+        temporary_path = f"{self.path}.tmp"
+        with self._lock:
+            total = self._record_count()
+            kept = 0
+            with open(temporary_path, "wb") as compacted:
+                compacted.write(HEADER)
+                for record in self._scan(0, total):
+                    if record.vanished_at and record.vanished_at < cutoff:
+                        continue
+                    compacted.write(RECORD.pack(*record))
+                    kept += 1
+            self.close()
+            os.replace(temporary_path, self.path)
+            self._open_file()
+        logger.info("Compacted %s, dropped %d of %d records.", self.path, total - kept, total)
+        return total - kept
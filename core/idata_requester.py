@@ -1,16 +1,41 @@
 """
 This module is a requester for iDATA website.
 """
+import json
 import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
 
-from bs4 import BeautifulSoup
-import requests
+from core.exceptions import (
+    IDataCircuitOpenError, IDataHTTPError, IDataRateLimitError, IDataTokenError
+)
+from core.metrics import REGISTRY
+from core.rate_limiter import CircuitBreaker, HostGuards, TokenBucket
+from core.transport import HTTPTransport
+from core.utils import IDataUtilities
 
+# The requests package is imported by the transport on the first use.
+if TYPE_CHECKING:
+    import requests
 
 
 # Create a logger instance.
 logger = logging.getLogger("IDataRequester")
 
+# The metrics of the requests, labelled by the last part of the URL path.
+REQUEST_SECONDS = REGISTRY.histogram(
+    "idata_request_seconds", "Latency of the requests to the website.", ("endpoint",)
+)
+REQUESTS_TOTAL = REGISTRY.counter(
+    "idata_requests_total", "Requests sent to the website.", ("endpoint", "status")
+)
+TOKEN_FETCHES_TOTAL = REGISTRY.counter(
+    "idata_token_fetches_total", "Token handshakes with the website."
+)
+
 
 class IDataRequester:
     """This class encapsulates all the requests to the iDATA website."""
@@ -20,12 +45,55 @@ class IDataRequester:
     URL_GET_DATE = "https://deu-schengen.idata.com.tr/tr/getdate"
     URL_SEND_DATE = "https://deu-schengen.idata.com.tr/tr/senddate"
 
-    def __init__(self):
-        self.session = requests.Session()
-        self._xsrf_token, self._x_csrf_token = self.receive_tokens()
+    # Status codes returned by the website when the CSRF tokens are not valid.
+    TOKEN_EXPIRED_STATUS_CODES = (403, 419)
+
+    # Status codes returned by the website when it throttles the requests.
+    RATE_LIMIT_STATUS_CODES = (429, 503)
+
+    def __init__(self,
+                 token_max_age: float = 600.0,
+                 pool_maxsize: int = 10,
+                 transport: HTTPTransport | None = None,
+                 rate_limiter: TokenBucket | None = None,
+                 token_cache: str | None = None,
+                 failure_threshold: int | None = None,
+                 cool_down: float | None = None):
+        # The transport pools the keep-alive connections per host.
+        self.transport = transport or HTTPTransport(pool_maxsize=pool_maxsize)
+        self.session = self.transport.session
+
+        # Every request to the host takes a token from the bucket shared by
+        # all the requesters, threads and tasks, unless one is given.
+        self.host: str = urlsplit(self.transport.resolve(self.URL_APPOINTMENT_FORM)).netloc
+        self.rate_limiter: TokenBucket = rate_limiter or HostGuards.limiter_for(self.host)
+
+        # Stop sending requests to the host after consecutive failures.
+        self.circuit_breaker: CircuitBreaker = HostGuards.breaker_for(self.host)
+        if failure_threshold is not None or cool_down is not None:
+            HostGuards.configure(
+                self.host, failure_threshold=failure_threshold, cool_down=cool_down
+            )
+
+        # Counters to compare the handshake overhead against the API calls.
+        self.token_fetches: int = 0
+        self.api_posts: int = 0
+
+        # Tokens are refreshed after this many seconds or when rejected.
+        # They are received before the first request, not at start-up.
+        self.token_max_age: float = token_max_age
+        self._tokens_lock = threading.Lock()
+        self._tokens_received_at: float = float("-inf")
+        self._xsrf_token: str = ""
+        self._x_csrf_token: str = ""
+
+        # The tokens are kept in the cache file to be reused after a restart.
+        self.token_cache: str | None = token_cache
+        if token_cache:
+            self.load_tokens()
 
     def __del__(self):
-        self.session.close()
+        self.transport.close()
 
     def __enter__(self):
         return self
@@ -33,39 +101,125 @@ class IDataRequester:
     def __exit__(self, exc_type, exc_value, traceback):
         self.__del__()
 
+    def refresh_tokens(self, force: bool = True, rejected: float | None = None) -> None:
+        """Receive new tokens and store them for the next requests. If
+        force is not set, the tokens are kept if another thread has
+        refreshed them meanwhile: if they are not expired, or if rejected
+        (the time the rejected tokens were received) is given and they
+        are not these tokens anymore.
+        """
+        with self._tokens_lock:
+            if not force:
+                if rejected is not None and self._tokens_received_at != rejected:
+                    return
+                if rejected is None and not self.tokens_expired():
+                    return
+            self._xsrf_token, self._x_csrf_token = self.receive_tokens()
+            self._tokens_received_at = time.monotonic()
+            if self.token_cache:
+                self.save_tokens()
+
+    def load_tokens(self) -> bool:
+        """Load the tokens and the cookies from the cache file, if they
+        were received from the same host within the maximum age.
+        """
+        try:
+            with open(self.token_cache, "r", encoding="utf-8") as cache_file:
+                cache = json.load(cache_file)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as error:
+            logger.warning("Failed to load the token cache %s: %s", self.token_cache, error)
+            return False
+
+        try:
+            age = time.time() - cache.get("received_at", 0)
+            if cache.get("host") != self.host or not 0 <= age < self.token_max_age:
+                logger.debug("The cached tokens are not valid anymore.")
+                return False
+            x_csrf_token = cache["x_csrf_token"]
+            cookies = [
+                (cookie["name"], cookie["value"], cookie["domain"], cookie["path"])
+                for cookie in cache["cookies"]
+            ]
+        except (KeyError, TypeError, AttributeError) as error:
+            logger.warning("Invalid token cache %s: %r", self.token_cache, error)
+            return False
+
+        for name, value, domain, path in cookies:
+            self.session.cookies.set(name, value, domain=domain, path=path)
+        self._xsrf_token = self.session.cookies.get("XSRF-TOKEN", "")
+        self._x_csrf_token = x_csrf_token
+        self._tokens_received_at = time.monotonic() - age
+        logger.info("Reusing the cached tokens received %.0f seconds ago.", age)
+        return True
+
+    def save_tokens(self) -> None:
+        """Write the tokens and the cookies to the cache file atomically,
+        readable only by the user.
+        """
+        cache = {
+            "host": self.host,
+            "received_at": time.time() - (time.monotonic() - self._tokens_received_at),
+            "x_csrf_token": self._x_csrf_token,
+            "cookies": [
+                {"name": cookie.name, "value": cookie.value,
+                 "domain": cookie.domain, "path": cookie.path}
+                for cookie in self.session.cookies
+            ],
+        }
+        temporary_path = f"{self.token_cache}.tmp"
+        try:
+            descriptor = os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with open(descriptor, "w", encoding="utf-8") as cache_file:
+                json.dump(cache, cache_file)
+            os.replace(temporary_path, self.token_cache)
+        except OSError as error:
+            logger.warning("Failed to save the token cache %s: %s", self.token_cache, error)
+
+    def tokens_expired(self) -> bool:
+        """Returns True if the tokens are older than the allowed age."""
+        return time.monotonic() - self._tokens_received_at > self.token_max_age
+
     def receive_tokens(self) -> tuple[str, str]:
         """Send a GET request to the homepage."""
-        response = self.session.get(self.URL_APPOINTMENT_FORM, timeout=10)
+        self.token_fetches += 1
+        TOKEN_FETCHES_TOTAL.inc()
+        # A handshake does not reset the failures of the API requests, it
+        # only closes a half-open circuit.
+        response = self._send(
+            self.transport.get, self.URL_APPOINTMENT_FORM,
+            expected_status=200, resets_failures=False, timeout=10
+        )
 
         # Check if the request was successful.
+        if response.status_code in self.RATE_LIMIT_STATUS_CODES:
+            raise IDataRateLimitError(self.URL_APPOINTMENT_FORM, response.status_code)
         if response.status_code != 200:
             logger.error("GET request to homepage failed.")
             logger.error("Status code: %s", response.status_code)
-            exit()
+            raise IDataTokenError(f"The homepage answered with status code {response.status_code}")
         logger.debug("GET request to homepage successful.")
 
         # Extract the XSRF-TOKEN cookie.
         _xsrf_token = self.session.cookies.get('XSRF-TOKEN')
-        logger.debug("XSRF-TOKEN: %s", _xsrf_token)
+        logger.debug("XSRF-TOKEN received: %s", bool(_xsrf_token))
 
         # Find the X-CSRF-TOKEN from the HTML.
-        soup = BeautifulSoup(response.text, 'html.parser')
-        csrf_meta = soup.find('meta', {'name': 'csrf-token'})
+        _x_csrf_token = IDataUtilities.parser.find_meta_content(response.text, 'csrf-token')
 
         # Check if the X-CSRF-TOKEN was found.
-        if not csrf_meta:
+        if not _x_csrf_token:
             logger.error("Failed to find X-CSRF-TOKEN in HTML.")
             logger.error("Status code: %s", response.status_code)
-            exit()
+            raise IDataTokenError("The homepage has no X-CSRF-TOKEN")
 
-        # Extract the X-CSRF-TOKEN.
-        _x_csrf_token = csrf_meta['content']
-        logger.debug("X-CSRF-TOKEN: %s", _x_csrf_token)
+        logger.debug("X-CSRF-TOKEN found.")
 
         # Set the cookies.
         self.session.cookies.set('c_policy', 'ok')
         self.session.cookies.set('visited', 'yes')
-        logger.debug("Cookies set: %s", self.session.cookies)
+        logger.debug("Cookies set: %s", sorted(self.session.cookies.keys()))
 
         return _xsrf_token, _x_csrf_token
 
@@ -83,12 +237,92 @@ class IDataRequester:
             "Sec-Fetch-Site": "same-origin"
         }
 
-    def post_request(self, url: str, data: dict) -> requests.Response:
+    def post_request(self, url: str, data: dict) -> "requests.Response":
         """Sends a POST request to the given address."""
-        response = self.session.post(url, headers=self.get_headers(), data=data, timeout=10)
+        if self.tokens_expired():
+            logger.debug("Tokens are expired, refreshing.")
+            self.refresh_tokens(force=False)
+
+        tokens_received_at = self._tokens_received_at
+        response = self._send_post(url, data, first_attempt=True)
+
+        # Refresh the tokens once if the website rejected them, unless
+        # another thread has already replaced the rejected tokens.
+        if response.status_code in self.TOKEN_EXPIRED_STATUS_CODES:
+            logger.info("Tokens are rejected with %s, refreshing.", response.status_code)
+            self.refresh_tokens(force=False, rejected=tokens_received_at)
+            response = self._send_post(url, data, first_attempt=False)
+
+        # Raise the errors, so the callers can back off.
+        if response.status_code in self.RATE_LIMIT_STATUS_CODES:
+            raise IDataRateLimitError(url, response.status_code)
+        if response.status_code >= 400:
+            raise IDataHTTPError(url, response.status_code)
+        return response
+
+    def _send_post(self, url: str, data: dict, first_attempt: bool) -> "requests.Response":
+        """Sends the POST request with the current tokens. Only the token
+        rejection of the first attempt is not a failure of the host.
+        """
+        self.api_posts += 1
+        response = self._send(
+            self.transport.post, url, token_rejection_allowed=first_attempt,
+            data=data, headers=self.get_headers(), timeout=10
+        )
         logger.debug("Response status code: %s", response.status_code)
         return response
 
+    def _send(self,
+              method,
+              url: str,
+              expected_status: int | None = None,
+              token_rejection_allowed: bool = False,
+              resets_failures: bool = True,
+              **kwargs) -> "requests.Response":
+        """Sends the request once the circuit breaker and the rate limiter
+        allow it, and records its outcome in the circuit breaker. A status
+        other than expected_status, if given, or an error status is a
+        failure. A token rejection is neither a failure nor a success if
+        it is allowed and the circuit is closed, the caller refreshes the
+        tokens and retries. A success only counts in a closed circuit if
+        resets_failures is set.
+        """
+        if not self.circuit_breaker.allow_request():
+            raise IDataCircuitOpenError(self.host, self.circuit_breaker.retry_in())
+        self.rate_limiter.acquire()
+
+        import requests  # pylint: disable=import-outside-toplevel
+        endpoint = url.rsplit("/", 1)[-1]
+        try:
+            with REQUEST_SECONDS.time(endpoint=endpoint):
+                response = method(url, **kwargs)
+        except requests.RequestException:
+            REQUESTS_TOTAL.inc(endpoint=endpoint, status="error")
+            self.circuit_breaker.record_failure()
+            raise
+        REQUESTS_TOTAL.inc(endpoint=endpoint, status=response.status_code)
+
+        status_code = response.status_code
+        if token_rejection_allowed and status_code in self.TOKEN_EXPIRED_STATUS_CODES and \
+                self.circuit_breaker.state == CircuitBreaker.CLOSED:
+            return response
+        if status_code >= 400 or (expected_status is not None and status_code != expected_status):
+            self.circuit_breaker.record_failure()
+        elif resets_failures or self.circuit_breaker.state != CircuitBreaker.CLOSED:
+            self.circuit_breaker.record_success()
+        return response
+
+    def limiter_state(self) -> dict[str, float | int | str]:
+        """Returns the state of the rate limiter and the circuit breaker."""
+        return {
+            "host": self.host,
+            "tokens_available": self.rate_limiter.available,
+            "requests_per_second": self.rate_limiter.rate,
+            "circuit_state": self.circuit_breaker.state,
+            "consecutive_failures": self.circuit_breaker.consecutive_failures,
+            "circuit_retry_in": self.circuit_breaker.retry_in(),
+        }
+
     def post_getcalenderstatus(self,
                                visa_office_id: int,
                                service_type_id: int,
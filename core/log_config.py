@@ -0,0 +1,117 @@
+"""
+This module configures the logging of the programs.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# The format of the text logs, parsed by the "idata_log" format of lnav.
+TEXT_FORMAT = "[%(asctime)s] -- [%(levelname)s] -- %(name)s (%(funcName)s): %(message)s"
+TEXT_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# The repetitive messages, only one of every sample_every of them is written.
+SAMPLED_MESSAGES = (
+    "%s: No free time slots on %s.",
+    "%s: No available dates.",
+)
+
+# The attributes every log record has, the others are written as JSON fields.
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "taskName"
+}
+
+
+class JSONLinesFormatter(logging.Formatter):
+    """This class formats the records as one JSON object per line, with
+    the values given in "extra" as additional fields. The tracebacks are
+    part of the message, as the queue handler formats them before queueing.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        seconds = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created))
+        entry = {
+            "ts": f"{seconds}.{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "function": record.funcName,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RepeatSampler(logging.Filter):
+    """This class lets only one of every sample_every records of the given
+    messages through, per message and first argument (e.g. the office).
+    The records let through carry the sample rate in their "sampled" field.
+    """
+
+    def __init__(self, messages: tuple[str, ...] = SAMPLED_MESSAGES, sample_every: int = 20):
+        super().__init__()
+        self.messages: frozenset[str] = frozenset(messages)
+        self.sample_every: int = sample_every
+        self._counts: dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.sample_every <= 1 or record.msg not in self.messages:
+            return True
+        first_argument = record.args[0] if isinstance(record.args, tuple) and record.args else None
+        key = (record.msg, first_argument)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        if count % self.sample_every:
+            return False
+        record.sampled = self.sample_every
+        return True
+
+
+def configure_logging(filename: str,
+                      level: int = logging.INFO,
+                      structured: bool = True,
+                      max_bytes: int = 10 * 1024 * 1024,
+                      backup_count: int = 5,
+                      sample_every: int = 20) -> QueueListener:
+    """Configure the root logger to write to a rotating file from a
+    background thread. The callers only put the records on a queue, the
+    formatting and the file I/O are done by the returned listener, which
+    is stopped at exit. The records are written as JSON lines if
+    structured is set, else in the text format.
+    """
+    file_handler = RotatingFileHandler(
+        filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )
+    if structured:
+        file_handler.setFormatter(JSONLinesFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(TEXT_FORMAT, TEXT_DATE_FORMAT))
+
+    # Sample before queueing, so the dropped records cost almost nothing.
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(RepeatSampler(sample_every=sample_every))
+
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(queue_handler)
+    root_logger.setLevel(level)
+
+    listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(_stop_listener, listener)
+    return listener
+
+
+def _stop_listener(listener: QueueListener) -> None:
+    """Write the queued records and stop the listener, if it is running."""
+    if listener._thread is not None:  # pylint: disable=protected-access
+        listener.stop()
@@ -0,0 +1,212 @@
+"""
+This module provides Prometheus-style metrics.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Create a logger instance.
+logger = logging.getLogger("IDataMetrics")
+
+# The default histogram buckets in seconds, from a fast parse to a slow sweep.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Returned by time() when the metrics are disabled, so it costs nothing.
+_NULL_TIMER = nullcontext()
+
+
+class _Metric:
+    """Base class of the metrics, keeps the values per label values."""
+    kind = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help_text: str,
+                 label_names: tuple[str, ...]):
+        self.registry: MetricsRegistry = registry
+        self.name: str = name
+        self.help_text: str = help_text
+        self.label_names: tuple[str, ...] = label_names
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, object]) -> tuple[str, ...]:
+        """Returns the label values in the order of the label names."""
+        return tuple(str(labels.get(label_name, "")) for label_name in self.label_names)
+
+    def _format_labels(self, key: tuple[str, ...], extra: str = "") -> str:
+        """Returns the label values in the exposition format."""
+        pairs = [f'{name}="{value}"' for name, value in zip(self.label_names, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter(_Metric):
+    """This class is a counter, which only goes up."""
+    kind = "counter"
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """Add the amount to the counter of the labels."""
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        """Returns the value of the counter of the labels."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def snapshot(self) -> dict[tuple[str, ...], float]:
+        """Returns the values per label values."""
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> list[str]:
+        """Returns the exposition lines of the counter."""
+        return [f"{self.name}{self._format_labels(key)} {value}"
+                for key, value in self.snapshot().items()]
+
+
+class Histogram(_Metric):
+    """This class is a histogram of the observed values, e.g. latencies."""
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(*args)
+        self.buckets: tuple[float, ...] = tuple(sorted(buckets))
+        # The bucket counts (not cumulative), the sum and the count per labels.
+        self._values: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        """Add the value to the histogram of the labels."""
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def time(self, **labels):
+        """Returns a context manager observing the time spent in it."""
+        if not self.registry.enabled:
+            return _NULL_TIMER
+        return self._timer(labels)
+
+    @contextmanager
+    def _timer(self, labels: dict[str, object]):
+        """Observe the time spent in the context."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> dict[tuple[str, ...], dict[str, object]]:
+        """Returns the count, sum and cumulative buckets per label values."""
+        with self._lock:
+            values = {key: (list(entry[0]), entry[1], entry[2])
+                      for key, entry in self._values.items()}
+        snapshot = {}
+        for key, (counts, total, count) in values.items():
+            cumulative, buckets = 0, {}
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                buckets[bound] = cumulative
+            snapshot[key] = {"count": count, "sum": total, "buckets": buckets}
+        return snapshot
+
+    def quantile(self, quantile: float, **labels) -> float | None:
+        """Returns the upper bound of the bucket holding the quantile."""
+        entry = self.snapshot().get(self._key(labels))
+        if entry is None or not entry["count"]:
+            return None
+        rank = quantile * entry["count"]
+        for bound, cumulative in entry["buckets"].items():
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+    def render(self) -> list[str]:
+        """Returns the exposition lines of the histogram."""
+        lines = []
+        for key, entry in self.snapshot().items():
+            for bound, cumulative in entry["buckets"].items():
+                labels = self._format_labels(key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = self._format_labels(key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {entry['count']}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {entry['sum']}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {entry['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """This class holds the metrics of the process. The metrics are
+    disabled by default, then recording a value is a single attribute
+    check, so the instrumented code pays almost nothing.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled: bool = enabled
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        """Start recording the metrics."""
+        self.enabled = True
+
+    def disable(self) -> None:
+        """Stop recording the metrics, the recorded values are kept."""
+        self.enabled = False
+
+    def _register(self, metric_class, name: str, help_text: str,
+                  label_names: tuple[str, ...], **kwargs) -> _Metric:
+        """Returns the metric of the name, creates it on the first use."""
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = metric_class(self, name, help_text, label_names, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name: str, help_text: str, label_names: tuple[str, ...] = ()) -> Counter:
+        """Returns the counter of the name."""
+        return self._register(Counter, name, help_text, label_names)
+
+    def histogram(self, name: str, help_text: str, label_names: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        """Returns the histogram of the name."""
+        return self._register(Histogram, name, help_text, label_names, buckets=buckets)
+
+    def snapshot(self) -> dict[str, dict]:
+        """Returns the values of all the metrics, keyed by the metric name
+        and then by the label values.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def render(self) -> str:
+        """Returns all the metrics in the Prometheus text format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# The registry shared by the core package.
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,74 @@
+"""
+This module serves the metrics on a local /metrics HTTP endpoint.
+"""
+
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.metrics import REGISTRY, MetricsRegistry
+
+# Create a logger instance.
+logger = logging.getLogger("IDataMetricsServer")
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    """Serves the metrics of the registry on /metrics."""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serve a GET request."""
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        logger.debug(format, *args)
+
+
+class MetricsServer:
+    """This class serves the metrics on a local HTTP /metrics endpoint
+    from a background thread. Starting it enables the registry.
+    """
+
+    def __init__(self,
+                 registry: MetricsRegistry = REGISTRY,
+                 host: str = "127.0.0.1",
+                 port: int = 9464):
+        self.registry: MetricsRegistry = registry
+        self._server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+        self._server.daemon_threads = True
+        self._server.registry = registry
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        """Returns the URL of the metrics endpoint."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self) -> None:
+        """Enable the registry and start serving in a background thread."""
+        self.registry.enable()
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="MetricsServer", daemon=True
+        )
+        self._thread.start()
+        logger.info("Serving the metrics on %s.", self.url)
+
+    def stop(self) -> None:
+        """Stop the server."""
+        self._server.shutdown()
+        self._server.server_close()
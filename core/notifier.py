@@ -3,17 +3,35 @@ This module provides functionality to notify the user.
 """
 
 import logging
-import requests
+
+from core.exceptions import IDataNotificationError
+from core.metrics import REGISTRY
 
 # Create a logger instance.
 logger = logging.getLogger("WhatsappNotifier")
 
+# The metrics of the sent messages.
+SEND_SECONDS = REGISTRY.histogram(
+    "idata_notification_send_seconds", "Latency of the Whatsapp API requests."
+)
+MESSAGES_TOTAL = REGISTRY.counter(
+    "idata_notifications_total", "Whatsapp messages sent.", ("status",)
+)
+
 class WhatsappNotifier:
     """This class provides a Whatsapp notifier."""
 
     def __init__(self):
         self._phones_api_keys: dict[str, str] = {}
         self._api_url: str = "https://api.callmebot.com/whatsapp.php"
+        # Keep the connection to the API alive between the messages.
+        import requests  # pylint: disable=import-outside-toplevel
+        self._session = requests.Session()
+
+    @property
+    def phone_numbers(self) -> list[str]:
+        """Returns the phone numbers which have an API key."""
+        return list(self._phones_api_keys)
 
     def add_phone_api_key(self, phone_number: str, api_key: str) -> None:
         """Add a phone number and its API key."""
@@ -25,18 +43,21 @@ class WhatsappNotifier:
         api_key = self._phones_api_keys.get(phone_number, None)
         if not api_key:
             logger.error("No API key found for %s", phone_number)
-            exit()
+            raise IDataNotificationError(f"No API key found for {phone_number}")
 
         # Send the request.
-        request_url = f"{self._api_url}?phone={phone_number}&text={message}&apikey={api_key}"
-        response = requests.get(request_url, timeout=10)
+        params = {"phone": phone_number, "text": message, "apikey": api_key}
+        with SEND_SECONDS.time():
+            response = self._session.get(self._api_url, params=params, timeout=10)
 
         # Check if the request was unsuccessful.
         if response.status_code != 200:
+            MESSAGES_TOTAL.inc(status="failed")
             logger.error("Failed to send WhatsApp message to %s", phone_number)
             logger.error("Status code: %s", response.status_code)
             return False
 
         # Log the success.
+        MESSAGES_TOTAL.inc(status="sent")
         logger.info("WhatsApp message (%s) sent to %s", message, phone_number)
         return True
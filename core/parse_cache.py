@@ -0,0 +1,92 @@
+"""
+This module provides a cache of the parse results of unchanged responses.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import TypeVar
+
+from core.metrics import REGISTRY
+
+# Create a logger instance.
+logger = logging.getLogger("IDataParseCache")
+
+# The lookups of the cache, per endpoint and result ("hit" or "miss").
+PARSE_CACHE_TOTAL = REGISTRY.counter(
+    "idata_parse_cache_total", "Lookups of the parse cache.", ("endpoint", "result")
+)
+
+T = TypeVar("T")
+
+
+def fingerprint(body: str) -> bytes:
+    """Returns the hash of a response body."""
+    return hashlib.blake2b(body.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+class ParseCache:
+    """This class is a bounded LRU cache of the parse results, keyed by
+    the endpoint and the request parameters. An entry also keeps the
+    fingerprint of the body it was parsed from, and it is only used while
+    the website returns the same body, so most of the quiet polls are not
+    parsed at all. The cached results are shared, they must not be changed.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize: int = maxsize
+        self.hits: int = 0
+        self.misses: int = 0
+        # (endpoint, parameters) -> (body fingerprint, result)
+        self._entries: OrderedDict[tuple[str, Hashable], tuple[bytes, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get_or_parse(self,
+                     endpoint: str,
+                     parameters: Hashable,
+                     body_fingerprint: bytes,
+                     parse: Callable[[], T]) -> T:
+        """Returns the cached result of the endpoint and the parameters if
+        the body is unchanged, else calls parse() and caches its result.
+        """
+        key = (endpoint, parameters)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == body_fingerprint:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                PARSE_CACHE_TOTAL.inc(endpoint=endpoint, result="hit")
+                return entry[1]
+            self.misses += 1
+        PARSE_CACHE_TOTAL.inc(endpoint=endpoint, result="miss")
+
+        # Parse outside of the lock, the other threads keep using the cache.
+        result = parse()
+        with self._lock:
+            self._entries[key] = (body_fingerprint, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return result
+
+    def clear(self) -> None:
+        """Forget all the cached results."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        """Returns the hits, the misses, the hit ratio and the size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+            }
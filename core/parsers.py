@@ -0,0 +1,189 @@
+"""
+This module provides the parser backends for the iDATA responses.
+"""
+
+import logging
+from html.parser import HTMLParser
+
+# Create a logger instance.
+logger = logging.getLogger("IDataParsers")
+
+# Elements which never have an end tag or any content.
+VOID_ELEMENTS = frozenset((
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr"
+))
+
+# Elements whose text is not part of get_text() in BeautifulSoup.
+SKIPPED_TEXT_ELEMENTS = frozenset(("script", "style", "template"))
+
+
+class _StopParsing(Exception):
+    """Raised to stop the parser as soon as the result is known."""
+
+
+class _ClassTextExtractor(HTMLParser):
+    """Collects the stripped text of the elements with the given class
+    in one pass, without building a tree.
+    """
+
+    def __init__(self, class_name: str):
+        super().__init__(convert_charrefs=True)
+        self.class_name: str = class_name
+        self.results: list[list[str]] = []
+        # Stack of (tag, result index or None) of the open elements.
+        self._open_elements: list[tuple[str, int | None]] = []
+        # Indexes of the results collecting text at the moment.
+        self._collecting: list[int] = []
+        self._skip_depth: int = 0
+
+    def handle_starttag(self, tag, attrs):
+        result_index = None
+        for name, value in attrs:
+            if name == "class" and value and self.class_name in value.split():
+                result_index = len(self.results)
+                self.results.append([])
+                break
+
+        if tag in VOID_ELEMENTS:
+            return
+
+        self._open_elements.append((tag, result_index))
+        if result_index is not None:
+            self._collecting.append(result_index)
+        if tag in SKIPPED_TEXT_ELEMENTS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        # Close everything up to the last element with the same tag.
+        for position in range(len(self._open_elements) - 1, -1, -1):
+            if self._open_elements[position][0] == tag:
+                break
+        else:
+            return
+
+        while len(self._open_elements) > position:
+            closed_tag, result_index = self._open_elements.pop()
+            if result_index is not None:
+                self._collecting.remove(result_index)
+            if closed_tag in SKIPPED_TEXT_ELEMENTS:
+                self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._collecting:
+            return
+        stripped = data.strip()
+        if not stripped:
+            return
+
+        if self._skip_depth:
+            # Script text only belongs to the script element itself.
+            _, result_index = self._open_elements[-1]
+            if result_index is not None:
+                self.results[result_index].append(stripped)
+            return
+
+        for result_index in self._collecting:
+            self.results[result_index].append(stripped)
+
+
+class _MetaContentExtractor(HTMLParser):
+    """Finds the content of the first meta tag with the given name."""
+
+    def __init__(self, meta_name: str):
+        super().__init__(convert_charrefs=True)
+        self.meta_name: str = meta_name
+        self.content: str | None = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "meta":
+            return
+        attributes = dict(attrs)
+        if attributes.get("name") == self.meta_name:
+            self.content = attributes.get("content")
+            raise _StopParsing()
+
+
+class FastResponseParser:
+    """This class extracts the needed values with a single pass of the
+    standard library's event based HTML parser.
+    """
+
+    @staticmethod
+    def find_texts_by_class(html_code: str, class_name: str) -> list[str]:
+        """Returns the stripped texts of the elements with the class."""
+        # Most of the responses do not contain the class at all.
+        if class_name not in html_code:
+            return []
+
+        extractor = _ClassTextExtractor(class_name)
+        extractor.feed(html_code)
+        extractor.close()
+        return ["".join(texts) for texts in extractor.results]
+
+    @staticmethod
+    def find_meta_content(html_code: str, meta_name: str) -> str | None:
+        """Returns the content of the meta tag with the name, if any."""
+        if meta_name not in html_code:
+            return None
+
+        extractor = _MetaContentExtractor(meta_name)
+        try:
+            extractor.feed(html_code)
+            extractor.close()
+        except _StopParsing:
+            pass
+        return extractor.content
+
+
+class SoupResponseParser:
+    """This class extracts the needed values by building a full
+    BeautifulSoup tree.
+    """
+
+    @staticmethod
+    def find_texts_by_class(html_code: str, class_name: str) -> list[str]:
+        """Returns the stripped texts of the elements with the class."""
+        from bs4 import BeautifulSoup  # pylint: disable=import-outside-toplevel
+        soup = BeautifulSoup(html_code, 'html.parser')
+        return [element.get_text(strip=True) for element in soup.find_all(class_=class_name)]
+
+    @staticmethod
+    def find_meta_content(html_code: str, meta_name: str) -> str | None:
+        """Returns the content of the meta tag with the name, if any."""
+        from bs4 import BeautifulSoup  # pylint: disable=import-outside-toplevel
+        soup = BeautifulSoup(html_code, 'html.parser')
+        meta = soup.find('meta', {'name': meta_name})
+        if not meta:
+            return None
+        return meta.get('content')
+
+
+class FallbackResponseParser:
+    """This class uses the fast parser, and the BeautifulSoup parser
+    if the fast one fails on a response.
+    """
+
+    @staticmethod
+    def find_texts_by_class(html_code: str, class_name: str) -> list[str]:
+        """Returns the stripped texts of the elements with the class."""
+        try:
+            return FastResponseParser.find_texts_by_class(html_code, class_name)
+        except Exception as error:  # pylint: disable=broad-except
+            logger.warning("Fast parser failed, using BeautifulSoup: %s", error)
+            return SoupResponseParser.find_texts_by_class(html_code, class_name)
+
+    @staticmethod
+    def find_meta_content(html_code: str, meta_name: str) -> str | None:
+        """Returns the content of the meta tag with the name, if any."""
+        try:
+            return FastResponseParser.find_meta_content(html_code, meta_name)
+        except Exception as error:  # pylint: disable=broad-except
+            logger.warning("Fast parser failed, using BeautifulSoup: %s", error)
+            return SoupResponseParser.find_meta_content(html_code, meta_name)
+
+
+PARSER_BACKENDS = {
+    "fast": FallbackResponseParser,
+    "soup": SoupResponseParser,
+}
@@ -0,0 +1,197 @@
+"""
+This module provides the policies deciding how long to wait between polls.
+"""
+
+import logging
+import random
+import time
+
+from core.history import AvailabilityHistory
+
+# Create a logger instance.
+logger = logging.getLogger("IDataPolling")
+
+
+class AdaptivePollingPolicy:
+    """This class adapts the polling interval to the recent results.
+
+    The interval shrinks to the burst interval for a while after a slot
+    is found, grows exponentially on consecutive errors (faster on rate
+    limits), and gets a random jitter on top.
+    """
+    # The failures counted for the backoff, far beyond the maximum interval
+    # but low enough for the power of the backoff factor to stay a float.
+    MAX_FAILURES = 100
+
+    def __init__(self,
+                 base_interval: float = 30.0,
+                 jitter: float = 0.0,
+                 burst_interval: float | None = None,
+                 burst_duration: float = 600.0,
+                 max_interval: float = 900.0,
+                 backoff_factor: float = 2.0):
+        self.base_interval: float = base_interval
+        self.jitter: float = jitter
+        self.burst_interval: float = base_interval if burst_interval is None else burst_interval
+        self.burst_duration: float = burst_duration
+        self.max_interval: float = max_interval
+        self.backoff_factor: float = backoff_factor
+
+        # The interval returned by the last next_interval() call.
+        self.last_interval: float = 0.0
+
+        self._failures: int = 0
+        self._last_found_at: float | None = None
+
+    def record_success(self, found: bool) -> None:
+        """Record a successful poll, and whether it found anything."""
+        self._failures = 0
+        if found:
+            self._last_found_at = time.monotonic()
+
+    def record_failure(self, rate_limited: bool = False) -> None:
+        """Record a failed poll, rate limits count as two failures."""
+        self._failures = min(self.MAX_FAILURES, self._failures + (2 if rate_limited else 1))
+
+    def in_burst(self) -> bool:
+        """Returns True if something was found recently."""
+        return self._last_found_at is not None and \
+            time.monotonic() - self._last_found_at < self.burst_duration
+
+    def next_interval(self) -> float:
+        """Returns the seconds to wait before the next poll."""
+        if self._failures:
+            logger.debug("Backing off after %d failures.", self._failures)
+            interval = min(
+                self.max_interval,
+                self.base_interval * self.backoff_factor ** self._failures
+            )
+        elif self.in_burst():
+            interval = self.burst_interval
+        else:
+            interval = self.base_interval
+
+        self.last_interval = max(0.0, interval + random.uniform(-self.jitter, self.jitter))
+        return self.last_interval
+
+
+class ReleaseModel:
+    """This class estimates when the slots of an office are released, as
+    the share of the past releases in every hour of the week. The slots
+    appearing in the same minute are counted as one release, and every
+    hour gets a small prior, so the hours without releases are polled too.
+    """
+    HOURS_PER_WEEK = 7 * 24
+
+    def __init__(self, prior: float = 0.5):
+        self.prior: float = prior
+        # office id -> release counts per hour of the week, Monday 00:00 first.
+        self._counts: dict[int, list[float]] = {}
+        # Incremented on every change, so the users can cache the weights.
+        self.version: int = 0
+
+    @classmethod
+    def from_history(cls,
+                     history: AvailabilityHistory,
+                     since: float | None = None,
+                     slot_type: str | None = None,
+                     prior: float = 0.5) -> "ReleaseModel":
+        """Create the model from the appearances in the history."""
+        model = cls(prior)
+        model.fit(history, since, slot_type)
+        return model
+
+    @staticmethod
+    def hour_of_week(timestamp: float) -> int:
+        """Returns the local hour of the week of a Unix time."""
+        local_time = time.localtime(timestamp)
+        return local_time.tm_wday * 24 + local_time.tm_hour
+
+    def add_release(self, office_id: int, timestamp: float) -> None:
+        """Count a release of the office at the Unix time."""
+        counts = self._counts.setdefault(office_id, [0.0] * self.HOURS_PER_WEEK)
+        counts[self.hour_of_week(timestamp)] += 1
+        self.version += 1
+
+    def fit(self,
+            history: AvailabilityHistory,
+            since: float | None = None,
+            slot_type: str | None = None) -> None:
+        """Count the releases in the history again."""
+        releases = set()
+        for record in history.query(start=since, slot_type=slot_type):
+            releases.add((record.office_id, int(record.observed_at // 60)))
+
+        # Count into a new table and swap it, the policies may be reading it.
+        counts: dict[int, list[float]] = {}
+        for office_id, minute in releases:
+            hours = counts.setdefault(office_id, [0.0] * self.HOURS_PER_WEEK)
+            hours[self.hour_of_week(minute * 60)] += 1
+        self._counts = counts
+        self.version += 1
+        logger.info("Release model fitted with %d releases of %d offices.",
+                    len(releases), len(self._counts))
+
+    def weights(self, office_id: int | None = None) -> list[float]:
+        """Returns the release probability of every hour of the week, of
+        the office or of all the offices if no office id is given.
+        """
+        if office_id is None:
+            counts = [sum(hours) for hours in zip(*self._counts.values())] or \
+                [0.0] * self.HOURS_PER_WEEK
+        else:
+            counts = self._counts.get(office_id, [0.0] * self.HOURS_PER_WEEK)
+        total = sum(counts) + self.prior * self.HOURS_PER_WEEK
+        return [(count + self.prior) / total for count in counts]
+
+
+class BudgetPollingPolicy(AdaptivePollingPolicy):
+    """This class spends a fixed number of polls a day where the releases
+    are likely. A poll of a job may send several requests, so the budget
+    is counted in polls, not in requests. The expected detection delay of
+    an hour is its release probability times half its interval, so with a
+    fixed number of polls it is the lowest when the polls per hour are
+    proportional to the square root of the probability. The planned
+    intervals are kept within the minimum and maximum intervals, and the
+    failure backoff and the burst after a found slot work as in
+    AdaptivePollingPolicy.
+    """
+
+    def __init__(self,
+                 model: ReleaseModel,
+                 daily_polls: int,
+                 office_id: int | None = None,
+                 min_interval: float = 10.0,
+                 **kwargs):
+        super().__init__(**kwargs)
+        self.model: ReleaseModel = model
+        self.daily_polls: int = daily_polls
+        self.office_id: int | None = office_id
+        self.min_interval: float = min_interval
+        self._intervals: list[float] = []
+        self._model_version: int = -1
+
+    def intervals(self) -> list[float]:
+        """Returns the polling interval of every hour of the week."""
+        if self._model_version != self.model.version:
+            self._intervals = self._plan()
+            self._model_version = self.model.version
+        return self._intervals
+
+    def _plan(self) -> list[float]:
+        """Returns the intervals spending the daily polls by the model."""
+        roots = [weight ** 0.5 for weight in self.model.weights(self.office_id)]
+        # The polls are per day, the hours of a week share seven days of them.
+        polls_per_root = self.daily_polls * 7 / sum(roots)
+        return [
+            min(self.max_interval, max(self.min_interval, 3600 / (polls_per_root * root)))
+            for root in roots
+        ]
+
+    def interval_at(self, timestamp: float) -> float:
+        """Returns the planned polling interval at the Unix time."""
+        return self.intervals()[ReleaseModel.hour_of_week(timestamp)]
+
+    def next_interval(self) -> float:
+        self.base_interval = self.interval_at(time.time())
+        return super().next_interval()
@@ -0,0 +1,94 @@
+"""
+This module provides a sweep over many query parameter combinations.
+"""
+
+import itertools
+import logging
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from core.appointment_finder import IDataAppointmentFinder, IDataQuery
+from core.utils import IDataUtilities
+
+# Create a logger instance.
+logger = logging.getLogger("IDataQueryMatrix")
+
+
+class IDataQueryMatrix:
+    """This class builds the cartesian product of the offices, consulates,
+    service types, calendar types and party sizes, and sweeps it over a
+    thread pool. All the workers share the finder's session, so the rate
+    limiter of its session manager is the request budget of the sweep.
+    """
+
+    def __init__(self,
+                 finder: IDataAppointmentFinder,
+                 office_names: Iterable[str],
+                 consular_ids: Iterable[int] | None = None,
+                 service_type_ids: Iterable[int] | None = None,
+                 calendar_types: Iterable[int] | None = None,
+                 total_persons: Iterable[int] | None = None,
+                 max_workers: int = 8):
+        self.finder: IDataAppointmentFinder = finder
+        self.max_workers: int = max_workers
+
+        # Use the finder's default value for the dimensions not given.
+        self.queries: list[IDataQuery] = [
+            finder.query_for(
+                office_name,
+                consular_id=consular_id,
+                service_type_id=service_type_id,
+                calendar_type=calendar_type,
+                total_person=total_person
+            )
+            for office_name, consular_id, service_type_id, calendar_type, total_person
+            in itertools.product(
+                office_names,
+                consular_ids or [finder.consular_id],
+                service_type_ids or [finder.service_type_id],
+                calendar_types or [finder.calendar_type],
+                total_persons or [finder.total_person]
+            )
+        ]
+
+    def _sweep(self, function, *args) -> Iterator[tuple[IDataQuery, object]]:
+        """Run the function for every query in the pool and yield the
+        (query, result) tuples as they complete. Failed queries are logged
+        and skipped, so they do not stop the others.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(function, query, *args): query for query in self.queries
+            }
+            for future in as_completed(futures):
+                query = futures[future]
+                try:
+                    yield query, future.result()
+                except Exception as error:  # pylint: disable=broad-except
+                    logger.error("%s: Query failed: %s", query, error)
+
+    def iter_available_dates(self, search_before: str) -> Iterator[tuple[IDataQuery, list[str]]]:
+        """Yield the open dates before the given date, for every query."""
+        def find(query: IDataQuery, search_before: str) -> list[str]:
+            available_dates = self.finder.get_open_dates_for(query)
+            return IDataUtilities.remove_dates_before(available_dates, search_before)
+        yield from self._sweep(find, search_before)
+
+    def iter_time_slots(self,
+                        until_date: str,
+                        time_slot_type: str
+                        ) -> Iterator[tuple[IDataQuery, dict[str, list[str]]]]:
+        """Yield the {date: hours} found until the given date, for every
+        query, checking only the dates getdate reports as open.
+        """
+        def find(query: IDataQuery, until_date: str, time_slot_type: str) -> dict[str, list[str]]:
+            open_dates = set(self.finder.get_open_dates_for(query))
+            found = {}
+            for date_to_check in IDataUtilities.get_dates_between("today", until_date):
+                if date_to_check not in open_dates:
+                    continue
+                available_hours = self.finder.check_date_for(query, date_to_check, time_slot_type)
+                if available_hours:
+                    found[date_to_check] = available_hours
+            return found
+        yield from self._sweep(find, until_date, time_slot_type)
@@ -0,0 +1,178 @@
+"""
+This module provides a rate limiter for the requests.
+"""
+
+import logging
+import threading
+import time
+
+# Create a logger instance.
+logger = logging.getLogger("IDataRateLimiter")
+
+
+class TokenBucket:
+    """This class is a thread-safe token bucket. It refills at the given
+    rate per second up to its capacity, and every request takes a token.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate: float = rate
+        self.capacity: float = rate if capacity is None else capacity
+        self._tokens: float = self.capacity
+        self._updated_at: float = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        """Add the tokens earned since the last update."""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    @property
+    def available(self) -> float:
+        """Returns the number of tokens available now."""
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take the tokens if they are available, without waiting."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1.0, timeout: float | None = None) -> bool:
+        """Wait until the tokens are available and take them. Returns
+        False if they are not available within the timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            logger.debug("Waiting %.2f seconds for a token.", wait)
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """This class stops the requests to a host after consecutive failures.
+    It opens after failure_threshold failures, lets one trial request
+    through (half-open) after the cool-down, and closes again when the
+    trial succeeds.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int = 5, cool_down: float = 60.0):
+        self.failure_threshold: int = failure_threshold
+        self.cool_down: float = cool_down
+        self.consecutive_failures: int = 0
+        self._state: str = self.CLOSED
+        self._opened_at: float = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Returns the state of the circuit."""
+        with self._lock:
+            return self._state
+
+    def retry_in(self) -> float:
+        """Returns the seconds until an open circuit lets a trial through."""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.cool_down - time.monotonic())
+
+    def allow_request(self) -> bool:
+        """Returns True if a request can be sent now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cool_down:
+                # Let only one trial request through.
+                logger.info("Circuit is half-open, sending a trial request.")
+                self._state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """Record a successful request, closes the circuit."""
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("Circuit is closed again.")
+            self._state = self.CLOSED
+            self.consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        """Record a failed request, opens the circuit if needed."""
+        with self._lock:
+            self.consecutive_failures += 1
+            if self._state == self.HALF_OPEN or \
+                    self.consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning("Circuit is open after %d failures.", self.consecutive_failures)
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class HostGuards:
+    """This class keeps one token bucket and one circuit breaker per host,
+    shared by all the requesters, threads and tasks of the process.
+    """
+    # The default budget, below the rate the website is known to tolerate.
+    DEFAULT_RATE: float = 5.0
+    DEFAULT_CAPACITY: float = 10.0
+
+    _limiters: dict[str, TokenBucket] = {}
+    _breakers: dict[str, CircuitBreaker] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls,
+                  host: str,
+                  rate: float | None = None,
+                  capacity: float | None = None,
+                  failure_threshold: int | None = None,
+                  cool_down: float | None = None) -> None:
+        """Set the budget or the breaker thresholds of a host."""
+        limiter = cls.limiter_for(host)
+        breaker = cls.breaker_for(host)
+        with cls._lock:
+            if rate is not None:
+                limiter.rate = rate
+            if capacity is not None:
+                limiter.capacity = capacity
+            if failure_threshold is not None:
+                breaker.failure_threshold = failure_threshold
+            if cool_down is not None:
+                breaker.cool_down = cool_down
+
+    @classmethod
+    def limiter_for(cls, host: str) -> TokenBucket:
+        """Returns the token bucket of the host."""
+        with cls._lock:
+            if host not in cls._limiters:
+                cls._limiters[host] = TokenBucket(cls.DEFAULT_RATE, cls.DEFAULT_CAPACITY)
+            return cls._limiters[host]
+
+    @classmethod
+    def breaker_for(cls, host: str) -> CircuitBreaker:
+        """Returns the circuit breaker of the host."""
+        with cls._lock:
+            if host not in cls._breakers:
+                cls._breakers[host] = CircuitBreaker()
+            return cls._breakers[host]
@@ -0,0 +1,149 @@
+"""
+This module provides a local stub server replaying recorded responses.
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+from core.transport import fixture_name
+
+# Create a logger instance.
+logger = logging.getLogger("ReplayServer")
+
+
+class _ReplayRequestHandler(BaseHTTPRequestHandler):
+    """Serves the fixture matching the request path and form data."""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serve a GET request."""
+        self.server.replay.serve(self, {})
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Serve a POST request."""
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length).decode("utf-8")
+        self.server.replay.serve(self, dict(parse_qsl(body)))
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        logger.debug(format, *args)
+
+
+class ReplayServer:
+    """This class serves the responses recorded by RecordingTransport from
+    a local HTTP server, with a configurable latency and error injection.
+
+    A request is answered with the most specific fixture, e.g.
+    "senddate-8-17-11-2023", then "senddate-8", then "senddate".
+    """
+
+    def __init__(self,
+                 directory: str,
+                 latency: float = 0.0,
+                 latency_jitter: float = 0.0,
+                 error_rate: float = 0.0,
+                 error_status: int = 503,
+                 host: str = "127.0.0.1",
+                 port: int = 0):
+        self.directory: str = directory
+        self.latency: float = latency
+        self.latency_jitter: float = latency_jitter
+        self.error_rate: float = error_rate
+        self.error_status: int = error_status
+
+        # Counters of the served requests per fixture name.
+        self.requests_served: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        self._server = ThreadingHTTPServer((host, port), _ReplayRequestHandler)
+        self._server.daemon_threads = True
+        self._server.replay = self
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def base_url(self) -> str:
+        """Returns the URL to give to the transport as base URL."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def total_requests(self) -> int:
+        """Returns the number of the served requests."""
+        with self._lock:
+            return sum(self.requests_served.values())
+
+    def start(self) -> None:
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="ReplayServer", daemon=True
+        )
+        self._thread.start()
+        logger.info("Replaying %s on %s.", self.directory, self.base_url)
+
+    def stop(self) -> None:
+        """Stop the server."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def find_fixture(self, name: str) -> str | None:
+        """Returns the path of the most specific fixture of the name."""
+        parts = name.split("-")
+        # The endpoint itself may contain dashes, e.g. "appointment-form".
+        while parts:
+            path = os.path.join(self.directory, "-".join(parts) + ".html")
+            if os.path.exists(path):
+                return path
+            parts.pop()
+        return None
+
+    def serve(self, handler: BaseHTTPRequestHandler, data: dict) -> None:
+        """Answer the request with the fixture or an injected error."""
+        name = fixture_name(handler.path, data)
+        with self._lock:
+            self.requests_served[name] = self.requests_served.get(name, 0) + 1
+
+        # Simulate the network and server latency.
+        delay = self.latency + random.uniform(0.0, self.latency_jitter)
+        if delay:
+            time.sleep(delay)
+
+        if self.error_rate and random.random() < self.error_rate:
+            self._respond(handler, self.error_status, "")
+            return
+
+        path = self.find_fixture(name)
+        if path is None:
+            self._respond(handler, 404, "")
+            return
+
+        status_code = 200
+        meta_path = path[:-len(".html")] + ".json"
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as meta_file:
+                status_code = json.load(meta_file).get("status_code", 200)
+        with open(path, "r", encoding="utf-8") as body_file:
+            self._respond(handler, status_code, body_file.read())
+
+    @staticmethod
+    def _respond(handler: BaseHTTPRequestHandler, status_code: int, body: str) -> None:
+        """Write the response with the XSRF-TOKEN cookie the website sets."""
+        encoded = body.encode("utf-8")
+        handler.send_response(status_code)
+        handler.send_header("Content-Type", "text/html; charset=UTF-8")
+        handler.send_header("Content-Length", str(len(encoded)))
+        handler.send_header("Set-Cookie", "XSRF-TOKEN=replay; Path=/")
+        handler.end_headers()
+        handler.wfile.write(encoded)
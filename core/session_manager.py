@@ -0,0 +1,93 @@
+"""
+This module provides a shared session for the iDATA requests.
+"""
+
+import logging
+import threading
+
+from core.idata_requester import IDataRequester
+from core.rate_limiter import TokenBucket
+from core.transport import HTTPTransport, RecordingTransport
+
+# Create a logger instance.
+logger = logging.getLogger("IDataSessionManager")
+
+
+class IDataSessionManager:
+    """This class keeps one long-lived IDataRequester and shares it
+    between all the callers, so the connection and tokens are reused.
+    The requests go to base_url instead of the website if it is given,
+    and the responses are recorded if record_directory is given. The
+    rate limiter is the request budget shared by all the callers, the
+    per-host budget is used if it is not given. The tokens are kept in
+    token_cache, if it is given, to be reused after a restart. The
+    circuit breaker thresholds of the host are set if they are given.
+    """
+
+    def __init__(self,
+                 token_max_age: float = 600.0,
+                 pool_maxsize: int = 10,
+                 base_url: str | None = None,
+                 record_directory: str | None = None,
+                 rate_limiter: TokenBucket | None = None,
+                 token_cache: str | None = None,
+                 failure_threshold: int | None = None,
+                 cool_down: float | None = None):
+        self.token_max_age: float = token_max_age
+        self.pool_maxsize: int = pool_maxsize
+        self.base_url: str | None = base_url
+        self.record_directory: str | None = record_directory
+        self.rate_limiter: TokenBucket | None = rate_limiter
+        self.token_cache: str | None = token_cache
+        self.failure_threshold: int | None = failure_threshold
+        self.cool_down: float | None = cool_down
+        self._requester: IDataRequester | None = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def requester(self) -> IDataRequester:
+        """Returns the shared requester, creates it on the first use."""
+        with self._lock:
+            if self._requester is None:
+                logger.debug("Creating the shared requester.")
+                self._requester = IDataRequester(
+                    token_max_age=self.token_max_age,
+                    transport=self.create_transport(),
+                    rate_limiter=self.rate_limiter,
+                    token_cache=self.token_cache,
+                    failure_threshold=self.failure_threshold,
+                    cool_down=self.cool_down
+                )
+            return self._requester
+
+    def create_transport(self) -> HTTPTransport:
+        """Returns a new transport for the requester."""
+        if self.record_directory:
+            return RecordingTransport(self.record_directory, self.base_url, self.pool_maxsize)
+        return HTTPTransport(self.base_url, self.pool_maxsize)
+
+    def stats(self) -> dict[str, int]:
+        """Returns the token fetch and API post counters."""
+        if self._requester is None:
+            return {"token_fetches": 0, "api_posts": 0}
+        return {
+            "token_fetches": self._requester.token_fetches,
+            "api_posts": self._requester.api_posts,
+        }
+
+    def limiter_state(self) -> dict[str, float | int | str]:
+        """Returns the rate limiter and circuit breaker state of the host."""
+        return self.requester.limiter_state()
+
+    def close(self) -> None:
+        """Close the shared requester's session."""
+        with self._lock:
+            if self._requester is not None:
+                self._requester.transport.close()
+                self._requester = None
@@ -0,0 +1,54 @@
+"""
+This module measures the start-up phases of the programs.
+"""
+
+import logging
+import os
+import time
+
+# Create a logger instance.
+logger = logging.getLogger("IDataStartup")
+
+
+def process_age() -> float:
+    """Returns the seconds since the process was started, including the
+    interpreter start-up, or 0 if it is not known (only Linux is supported).
+    """
+    try:
+        with open("/proc/self/stat", "r", encoding="utf-8") as stat_file:
+            # The fields after the command name, which may contain spaces.
+            fields = stat_file.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime", "r", encoding="utf-8") as uptime_file:
+            uptime = float(uptime_file.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return 0.0
+    started_after_boot = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    return max(0.0, uptime - started_after_boot)
+
+
+class StartupTimer:
+    """This class records the time of the start-up phases, from the start
+    of the process until every mark, e.g. the imports, the set-up and the
+    first poll.
+    """
+
+    def __init__(self):
+        self.started_at: float = time.perf_counter() - process_age()
+        self.phases: dict[str, float] = {}
+        self._last_mark: float = self.started_at
+
+    def mark(self, phase: str) -> float:
+        """Record the end of a phase, returns its duration in seconds."""
+        now = time.perf_counter()
+        self.phases[phase] = now - self._last_mark
+        self._last_mark = now
+        return self.phases[phase]
+
+    def total(self) -> float:
+        """Returns the seconds from the process start until the last mark."""
+        return self._last_mark - self.started_at
+
+    def report(self) -> None:
+        """Log the duration of every phase."""
+        phases = ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in self.phases.items())
+        logger.info("Started in %.3f seconds: %s.", self.total(), phases)
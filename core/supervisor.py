@@ -0,0 +1,177 @@
+"""
+This module provides a supervisor running every polling job in its own thread.
+"""
+
+import logging
+import threading
+from typing import Callable
+
+from core.exceptions import IDataCircuitOpenError, IDataError, IDataRateLimitError
+from core.metrics import REGISTRY
+from core.polling import AdaptivePollingPolicy
+
+# Create a logger instance.
+logger = logging.getLogger("IDataSupervisor")
+
+# The duration and the outcome of the job runs, and the job restarts.
+JOB_SECONDS = REGISTRY.histogram("idata_job_seconds", "Duration of the job runs.", ("job",))
+JOB_RUNS_TOTAL = REGISTRY.counter("idata_job_runs_total", "Job runs.", ("job", "outcome"))
+JOB_RESTARTS_TOTAL = REGISTRY.counter("idata_job_restarts_total", "Job restarts.", ("job",))
+
+
+class SupervisedJob:
+    """This class holds a job factory, its polling policy and its state.
+    The factory returns the job function, which returns True when it
+    found something. A restart creates the function again.
+    """
+
+    def __init__(self,
+                 name: str,
+                 factory: Callable[[], Callable[[], bool | None]],
+                 policy: AdaptivePollingPolicy):
+        self.name: str = name
+        self.factory: Callable[[], Callable[[], bool | None]] = factory
+        self.policy: AdaptivePollingPolicy = policy
+        self.state: str = "starting"
+        self.restarts: int = 0
+        self.consecutive_failures: int = 0
+        self.successes_since_start: int = 0
+        self.last_error: str | None = None
+        self.thread: threading.Thread | None = None
+
+
+class IDataSupervisor:
+    """This class runs every job in its own thread, so a failing or slow
+    job does not hold up the others. The errors of the website and the
+    network (IDataError and OSError) are retried by the job's polling
+    policy. Any other error, or more than max_failures failures in a
+    row, restarts only that job, from its factory, after an exponential
+    backoff. The jobs keep sharing the session and the caches the
+    factories close over, so a restart does not make them cold.
+    """
+
+    def __init__(self,
+                 max_failures: int = 10,
+                 restart_backoff: float = 5.0,
+                 max_restart_backoff: float = 600.0):
+        self.max_failures: int = max_failures
+        self.restart_backoff: float = restart_backoff
+        self.max_restart_backoff: float = max_restart_backoff
+        self.jobs: dict[str, SupervisedJob] = {}
+        self._stop_event = threading.Event()
+
+    def add_job(self,
+                name: str,
+                factory: Callable[[], Callable[[], bool | None]],
+                interval: float = 30.0,
+                jitter: float = 0.0,
+                policy: AdaptivePollingPolicy | None = None) -> SupervisedJob:
+        """Add a job, it is started by start() or run_forever()."""
+        if name in self.jobs:
+            raise ValueError(f"Duplicate job name: {name}")
+        if policy is None:
+            policy = AdaptivePollingPolicy(base_interval=interval, jitter=jitter)
+        job = SupervisedJob(name, factory, policy)
+        self.jobs[name] = job
+        return job
+
+    def start(self) -> None:
+        """Start the thread of every job."""
+        self._stop_event.clear()
+        for job in self.jobs.values():
+            job.thread = threading.Thread(
+                target=self._supervise, args=(job,), name=f"Job-{job.name}", daemon=True
+            )
+            job.thread.start()
+        logger.info("Supervisor started with %d jobs.", len(self.jobs))
+
+    def run_forever(self) -> None:
+        """Run the jobs until stop() is called."""
+        self.start()
+        self._stop_event.wait()
+        self.join()
+
+    def stop(self) -> None:
+        """Stop the jobs after their current run."""
+        self._stop_event.set()
+
+    def join(self, timeout: float | None = None) -> None:
+        """Wait for the job threads to finish."""
+        for job in self.jobs.values():
+            if job.thread is not None:
+                job.thread.join(timeout)
+        logger.info("Supervisor stopped.")
+
+    def status(self) -> dict[str, dict[str, object]]:
+        """Returns the state, the restarts and the last error of the jobs."""
+        return {
+            name: {
+                "state": job.state,
+                "restarts": job.restarts,
+                "consecutive_failures": job.consecutive_failures,
+                "last_error": job.last_error,
+                "next_interval": job.policy.last_interval,
+            }
+            for name, job in self.jobs.items()
+        }
+
+    def _supervise(self, job: SupervisedJob) -> None:
+        """Create and run the job, restart it with a backoff if it fails."""
+        restarts_in_a_row = 0
+        while not self._stop_event.is_set():
+            try:
+                function = job.factory()
+                job.state = "running"
+                job.successes_since_start = 0
+                self._run(job, function)
+            except Exception as error:  # pylint: disable=broad-except
+                # The backoff starts over if the job has worked since its start.
+                if job.successes_since_start:
+                    restarts_in_a_row = 0
+                job.state = "restarting"
+                job.last_error = repr(error)
+                job.restarts += 1
+                restarts_in_a_row += 1
+                JOB_RESTARTS_TOTAL.inc(job=job.name)
+                delay = min(self.max_restart_backoff,
+                            self.restart_backoff * 2 ** (restarts_in_a_row - 1))
+                logger.exception("%s: Job crashed, restarting in %.1f seconds.", job.name, delay)
+                self._stop_event.wait(delay)
+        job.state = "stopped"
+
+    def _run(self, job: SupervisedJob, function: Callable[[], bool | None]) -> None:
+        """Run the job function until the supervisor stops. Raises the
+        errors which need a restart of the job.
+        """
+        while not self._stop_event.is_set():
+            try:
+                with JOB_SECONDS.time(job=job.name):
+                    found = function()
+            except (IDataRateLimitError, IDataCircuitOpenError) as error:
+                logger.warning("%s: Rate limited: %s", job.name, error)
+                JOB_RUNS_TOTAL.inc(job=job.name, outcome="rate_limited")
+                job.policy.record_failure(rate_limited=True)
+                self._record_failure(job, error)
+            except (IDataError, OSError) as error:
+                logger.error("%s: Job failed: %s", job.name, error)
+                JOB_RUNS_TOTAL.inc(job=job.name, outcome="failed")
+                job.policy.record_failure()
+                self._record_failure(job, error)
+            else:
+                JOB_RUNS_TOTAL.inc(job=job.name, outcome="found" if found else "empty")
+                job.policy.record_success(bool(found))
+                job.consecutive_failures = 0
+                job.successes_since_start += 1
+
+            # Wait for the next run, or until the supervisor stops.
+            delay = job.policy.next_interval()
+            logger.debug("%s: Next run in %.1f seconds.", job.name, delay)
+            self._stop_event.wait(delay)
+
+    def _record_failure(self, job: SupervisedJob, error: Exception) -> None:
+        """Count the failure, raise it if the job fails for too long."""
+        job.last_error = repr(error)
+        job.consecutive_failures += 1
+        if job.consecutive_failures > self.max_failures:
+            job.consecutive_failures = 0
+            raise error
@@ -0,0 +1,94 @@
+"""
+This module provides the transports the requester sends its requests with.
+"""
+
+import json
+import logging
+import os
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+# The requests package is imported on the first use, for a fast start-up.
+if TYPE_CHECKING:
+    import requests
+
+# Create a logger instance.
+logger = logging.getLogger("IDataTransport")
+
+# The form fields which tell the recorded responses of an endpoint apart.
+FIXTURE_KEY_FIELDS = ("exitid", "set_new_exit_office_id", "getvisaofficeid", "fulldate")
+
+
+def fixture_name(url: str, data: dict | None = None) -> str:
+    """Returns the fixture file name (without extension) of a request,
+    e.g. "getdate-8" or "senddate-8-17-11-2023".
+    """
+    endpoint = urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1]
+    values = [str(data[field]) for field in FIXTURE_KEY_FIELDS if data and field in data]
+    return "-".join([endpoint] + values)
+
+
+class HTTPTransport:
+    """This class sends the requests over a pooled requests session. If a
+    base URL is given, the requests go to that host instead, e.g. to a
+    local replay server.
+    """
+
+    def __init__(self, base_url: str | None = None, pool_maxsize: int = 10):
+        self.base_url: str | None = base_url.rstrip("/") if base_url else None
+
+        # Keep-alive connections are pooled per host by the adapters.
+        import requests  # pylint: disable=import-outside-toplevel
+        from requests.adapters import HTTPAdapter  # pylint: disable=import-outside-toplevel
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=pool_maxsize))
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=pool_maxsize))
+
+    def resolve(self, url: str) -> str:
+        """Returns the URL to send the request to."""
+        if not self.base_url:
+            return url
+        parts = urlsplit(url)
+        query = f"?{parts.query}" if parts.query else ""
+        return f"{self.base_url}{parts.path}{query}"
+
+    def get(self, url: str, **kwargs) -> "requests.Response":
+        """Sends a GET request."""
+        return self.session.get(self.resolve(url), **kwargs)
+
+    def post(self, url: str, data: dict | None = None, **kwargs) -> "requests.Response":
+        """Sends a POST request with the form data."""
+        return self.session.post(self.resolve(url), data=data, **kwargs)
+
+    def close(self) -> None:
+        """Close the pooled connections."""
+        self.session.close()
+
+
+class RecordingTransport(HTTPTransport):
+    """This class sends the requests like HTTPTransport and also writes
+    every response to the fixtures directory, to be replayed later.
+    """
+
+    def __init__(self, directory: str, base_url: str | None = None, pool_maxsize: int = 10):
+        super().__init__(base_url, pool_maxsize)
+        self.directory: str = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, url: str, **kwargs) -> "requests.Response":
+        response = super().get(url, **kwargs)
+        self.save(fixture_name(url), response)
+        return response
+
+    def post(self, url: str, data: dict | None = None, **kwargs) -> "requests.Response":
+        response = super().post(url, data=data, **kwargs)
+        self.save(fixture_name(url, data), response)
+        return response
+
+    def save(self, name: str, response: "requests.Response") -> None:
+        """Write the body and the status code of the response."""
+        with open(os.path.join(self.directory, f"{name}.html"), "w", encoding="utf-8") as body_file:
+            body_file.write(response.text)
+        with open(os.path.join(self.directory, f"{name}.json"), "w", encoding="utf-8") as meta_file:
+            json.dump({"status_code": response.status_code}, meta_file)
+        logger.debug("Recorded %s (%s).", name, response.status_code)
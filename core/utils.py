@@ -1,83 +1,106 @@
 """
 This module collects all the utility functions.
 """
+import json
 import logging
-from datetime import datetime, timedelta, date
-from bs4 import BeautifulSoup
+
+from core.dates import date_range, to_ordinal, today_ordinal
+from core.metrics import REGISTRY
+from core.parsers import PARSER_BACKENDS
 
 # Create a logger instance.
 logger = logging.getLogger("IDataUtilities")
 
+# The time spent parsing the responses, per response kind.
+PARSE_SECONDS = REGISTRY.histogram(
+    "idata_parse_seconds", "Time spent parsing the responses.", ("kind",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1)
+)
+
+# The calendar status values which tell that the calendar is open or closed.
+OPEN_STATUS_VALUES = frozenset(("1", "true", "open", "active", "ok", "success"))
+CLOSED_STATUS_VALUES = frozenset(("0", "false", "closed", "close", "passive", "inactive"))
+
+# The fields of a JSON calendar status which hold the status.
+STATUS_FIELDS = ("status", "calendarStatus", "calendar_status", "isOpen", "is_open", "result")
+
+
 class IDataUtilities:
     """This class encapsulates all the utility functions."""
+    # The parser backend used to extract values from the responses.
+    parser = PARSER_BACKENDS["fast"]
+
+    @staticmethod
+    def set_parser_backend(backend_name: str) -> None:
+        """Set the parser backend, either "fast" or "soup"."""
+        if backend_name not in PARSER_BACKENDS:
+            raise ValueError(f"Invalid parser backend: {backend_name}")
+        IDataUtilities.parser = PARSER_BACKENDS[backend_name]
 
     @staticmethod
     def parse_available_dates(html_code: str) -> list[str]:
         """Parses the HTML response and returns a list of available dates."""
-        # Parse the HTML code
-        soup = BeautifulSoup(html_code, 'html.parser')
-
-        # Find all elements with the "form-control" class
-        form_control_elements = soup.find_all(class_='form-control')
-
-        # Extract the text from these elements and store them in a list
-        result = [element.get_text(strip=True) for element in form_control_elements]
-        logger.debug("Available dates parsed: %s", result)
+        # Extract the texts of the elements with the "form-control" class.
+        with PARSE_SECONDS.time(kind="dates"):
+            result = IDataUtilities.parser.find_texts_by_class(html_code, 'form-control')
+        logger.debug("%d available dates parsed.", len(result))
         return result
 
     @staticmethod
     def remove_dates_before(dates: list[str], allow_before: str) -> list[str]:
         """Remove dates before the given date."""
-        allow_before_date = datetime.strptime(allow_before, "%d-%m-%Y").date()
-        return [
-            date
-            for date in dates
-            if datetime.strptime(date, "%d-%m-%Y").date() < allow_before_date
-        ]
+        allow_before_ordinal = to_ordinal(allow_before)
+        return [date for date in dates if to_ordinal(date) < allow_before_ordinal]
 
     @staticmethod
     def parse_available_hours(html_code: str, time_slot_type: str) -> list[str]:
         """Parses the HTML response and returns a list of available hours."""
-        # Parse the HTML code
-        soup = BeautifulSoup(html_code, 'html.parser')
-
         if time_slot_type == "free":
             # Find all button elements with getdatebtn and noPrime classes.
-            button_elements = soup.find_all(class_='noPrime')
+            class_name = 'noPrime'
         elif time_slot_type == "prime":
             # Find all button elements with getdatebtn and yesPrime classes.
-            button_elements = soup.find_all(class_='yesPrime')
+            class_name = 'yesPrime'
         elif time_slot_type == "vip":
             # Find all button elements with getdatebtn and yesVip classes.
-            button_elements = soup.find_all(class_="yesVip")
+            class_name = 'yesVip'
         else:
             # Find all button elements with getdatebtn.
-            button_elements = soup.find_all(class_='getdatebtnhour')
+            class_name = 'getdatebtnhour'
 
-        # Extract the text from these elements and store them in a list
-        result = [element.get_text(strip=True) for element in button_elements]
-        logger.debug("Available hours parsed: %s", result)
+        # Extract the texts of these elements.
+        with PARSE_SECONDS.time(kind="hours"):
+            result = IDataUtilities.parser.find_texts_by_class(html_code, class_name)
+        logger.debug("%d available hours parsed.", len(result))
         return result
 
+    @staticmethod
+    def parse_calendar_status(response: str) -> bool | None:
+        """Parses the calendar status response, a JSON object or a bare
+        value. Returns True if the calendar is open, False if it is
+        closed, and None if the response cannot be read.
+        """
+        try:
+            value = json.loads(response)
+        except ValueError:
+            value = response
+        if isinstance(value, dict):
+            value = next((value[field] for field in STATUS_FIELDS if field in value), None)
+
+        status = str(value).strip().strip('"').lower() if value is not None else ""
+        if status in OPEN_STATUS_VALUES:
+            return True
+        if status in CLOSED_STATUS_VALUES:
+            return False
+        logger.debug("Unknown calendar status: %.80s", response)
+        return None
+
     @staticmethod
     def get_dates_between(from_date: str, until_date: str) -> list[str]:
         """Returns a list of dates in string "dd-mm-yyyy" format 
         from the date today and until the date 18-11-2023.
         """
-        if from_date == "today":
-            start_date = date.today()
-        else:
-            # Split the string to day, month and year.
-            day, month, year = from_date.split("-")
-            start_date = date(int(year), int(month), int(day))
-
-        # Split the until_date given into date object.
-        day, month, year = until_date.split("-")
-        end_date = date(int(year), int(month), int(day))
-
-        # Find the time difference between start and end time.
-        time_difference = end_date - start_date
+        start_ordinal = today_ordinal() if from_date == "today" else to_ordinal(from_date)
 
-        # Construct the dates.
-        dates = [start_date + timedelta(days=i) for i in range(time_difference.days + 1)]
-        return [date.strftime("%d-%m-%Y") for date in dates]
+        # The ranges are cached, as the same bounds are asked every cycle.
+        return list(date_range(start_ordinal, to_ordinal(until_date)))
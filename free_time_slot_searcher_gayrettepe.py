@@ -5,17 +5,21 @@ A program to check available dates for visa appointments.
 import logging
 from time import sleep
 from core.appointment_finder import IDataAppointmentFinder
+from core.change_detector import SlotChangeDetector
+from core.dispatcher import NotificationDispatcher
+from core.exceptions import IDataCircuitOpenError, IDataRateLimitError
+from core.log_config import configure_logging
 from core.notifier import WhatsappNotifier
-from core.utils import IDataUtilities
+from core.polling import AdaptivePollingPolicy
+from core.session_manager import IDataSessionManager
+from core.startup import StartupTimer
+
+# Measure the start-up phases, the imports are done.
+startup = StartupTimer()
+startup.mark("imports")
 
 # Configure the logger.
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="[%(asctime)s] -- [%(levelname)s] -- %(name)s (%(funcName)s): %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-    filename="idata_free_time_searcher_service.log",
-    filemode="a"
-)
+configure_logging("idata_free_time_searcher_service.log")
 
 # Constants
 TELEPHONE_NO_1 = "+90xxxxxx"
@@ -31,29 +35,59 @@ if __name__ == "__main__":
     whatsapp.add_phone_api_key(TELEPHONE_NO_1, "API_KEY")
     whatsapp.add_phone_api_key(TELEPHONE_NO_2, "API_KEY")
 
+    # Send the messages in the background, without blocking the polling.
+    dispatcher = NotificationDispatcher(whatsapp)
+
     try:
-        # Create an appointment finder instance.
-        appointments = IDataAppointmentFinder()
+        # Create an appointment finder instance, reusing the cached tokens.
+        appointments = IDataAppointmentFinder(IDataSessionManager(
+            token_cache="idata_free_time_slot_searcher_gayrettepe_tokens.json"
+        ))
         # Add offices to check.
         appointments.add_office("Gayrettepe", 1)
         logger.info("The program has been initilized.")
 
+        # Remember the notified slots, so they are sent only once.
+        detector = SlotChangeDetector(path="idata_free_time_slot_searcher_gayrettepe_state.json")
+
+        # Poll every 30 seconds, faster after a finding and slower on errors.
+        polling = AdaptivePollingPolicy(base_interval=30, jitter=3, burst_interval=10)
+        startup.mark("setup")
+
         while True:
-            # Get the dates between start and end.
-            dates_to_check = IDataUtilities.get_dates_between("today", "17-11-2023")
+            try:
+                # Check the open dates between today and the end date.
+                found = appointments.find_free_time_slots("Gayrettepe", "17-11-2023", "free")
+
+                # Notify only the slots which appeared since the last cycle.
+                for change in detector.update("Gayrettepe", "free", found):
+                    if not change.appeared:
+                        continue
+                    logger.info("[%s] Free time slots on %s: %s",
+                                "Gayrettepe", change.date, change.appeared)
+                    message = (f"There are some free slots in Gayrettepe on {change.date}, "
+                               f"be quick: {list(change.appeared)}")
+                    dispatcher.notify(message)
+                polling.record_success(bool(found))
+            except (IDataRateLimitError, IDataCircuitOpenError) as e:
+                logger.warning("Rate limited: %s", e)
+                polling.record_failure(rate_limited=True)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error("Polling cycle failed: %s", e)
+                polling.record_failure()
 
-            for date_check in dates_to_check:
-                free_time_slots = appointments.check_for_specific_date("Gayrettepe", date_check, "free")
+            # Report the start-up once the first cycle is done.
+            if "first cycle" not in startup.phases:
+                startup.mark("first cycle")
+                startup.report()
 
-                if free_time_slots:
-                    logger.info("[%s] Free time slots: %s", "Gayrettepe", free_time_slots)
-                    message = f"There are some free slots in Gayrettepe, be quick: {free_time_slots}"
-                    whatsapp.send_message(TELEPHONE_NO_1, message)
-                    whatsapp.send_message(TELEPHONE_NO_2, message)
+            # Log the session counters.
+            logger.debug("Session stats: %s", appointments.session_manager.stats())
+            logger.debug("Limiter state: %s", appointments.session_manager.limiter_state())
 
-            # Sleep for 30 seconds.
-            logger.info("Sleeping for 30 seconds.")
-            sleep(30)
+            interval = polling.next_interval()
+            logger.info("Sleeping for %.1f seconds.", interval)
+            sleep(interval)
     except Exception as e:
         logger.error("An error occured: %s", e)
         whatsapp.send_message(TELEPHONE_NO_1, f"An error occured on Gayrettepe script: {e}")
@@ -0,0 +1,257 @@
+"""
+A program to check all the offices for visa appointments in one process.
+"""
+
+import argparse
+import atexit
+import functools
+import json
+import logging
+from core.appointment_finder import IDataAppointmentFinder
+from core.calendar_gate import CalendarStatusGate
+from core.change_detector import SlotChangeDetector
+from core.coordination import SQLiteLeaseBackend, WorkCoordinator
+from core.dispatcher import NotificationDispatcher
+from core.history import AvailabilityHistory
+from core.log_config import configure_logging
+from core.metrics_server import MetricsServer
+from core.notifier import WhatsappNotifier
+from core.polling import AdaptivePollingPolicy, BudgetPollingPolicy, ReleaseModel
+from core.query_matrix import IDataQueryMatrix
+from core.rate_limiter import TokenBucket
+from core.session_manager import IDataSessionManager
+from core.startup import StartupTimer
+from core.supervisor import IDataSupervisor
+
+# Create a logger instance.
+logger = logging.getLogger("iDataMultiOfficeScheduler")
+
+
+def available_dates_job(appointments: IDataAppointmentFinder,
+                        detector: SlotChangeDetector,
+                        dispatcher: NotificationDispatcher,
+                        job_config: dict):
+    """Returns a job which searches the available dates of the offices."""
+    def run() -> bool:
+        found_any = False
+        # Search only the offices this worker owns in this cycle.
+        for office in appointments.claim_offices(job_config["offices"]):
+            free_dates = appointments.find_available_dates(
+                office, search_before=job_config["search_before"]
+            )
+            found_any = found_any or bool(free_dates)
+
+            # Notify only the dates which appeared since the last run.
+            changes = detector.update(office, "date", {date: [date] for date in free_dates})
+            new_dates = [change.date for change in changes if change.appeared]
+            if new_dates:
+                message = f"{office} There is a free slot, be fast! {new_dates}"
+                dispatcher.notify(message)
+        return found_any
+    return run
+
+
+def free_time_slots_job(appointments: IDataAppointmentFinder,
+                        detector: SlotChangeDetector,
+                        dispatcher: NotificationDispatcher,
+                        job_config: dict):
+    """Returns a job which searches the free time slots of an office."""
+    office = job_config["office"]
+    slot_type = job_config.get("slot_type", "free")
+    concurrency = job_config.get("concurrency", 5)
+
+    def run() -> bool:
+        found = appointments.find_free_time_slots(
+            office, job_config["until"], slot_type, concurrency
+        )
+        # Notify only the slots which appeared since the last run.
+        for change in detector.update(office, slot_type, found):
+            if change.appeared:
+                message = (f"Free time slots in {office} on {change.date}, "
+                           f"be quick! {list(change.appeared)}")
+                dispatcher.notify(message)
+        return bool(found)
+    return run
+
+
+def query_matrix_job(appointments: IDataAppointmentFinder,
+                     detector: SlotChangeDetector,
+                     dispatcher: NotificationDispatcher,
+                     job_config: dict):
+    """Returns a job which searches the available dates of every
+    combination of the offices, service types and party sizes.
+    """
+    matrix = IDataQueryMatrix(
+        appointments,
+        job_config["offices"],
+        consular_ids=job_config.get("consular_ids"),
+        service_type_ids=job_config.get("service_type_ids"),
+        calendar_types=job_config.get("calendar_types"),
+        total_persons=job_config.get("total_persons"),
+        max_workers=job_config.get("max_workers", 8)
+    )
+
+    def run() -> bool:
+        found_any = False
+        for query, free_dates in matrix.iter_available_dates(job_config["search_before"]):
+            found_any = found_any or bool(free_dates)
+
+            # Notify only the dates which appeared since the last run.
+            label = (f"{query.office_name} (service {query.service_type_id}, "
+                     f"{query.total_person} person)")
+            changes = detector.update(label, "date", {date: [date] for date in free_dates})
+            new_dates = [change.date for change in changes if change.appeared]
+            if new_dates:
+                message = f"{label} There is a free slot, be fast! {new_dates}"
+                dispatcher.notify(message)
+        return found_any
+    return run
+
+
+JOB_FACTORIES = {
+    "available_dates": available_dates_job,
+    "free_time_slots": free_time_slots_job,
+    "query_matrix": query_matrix_job,
+}
+
+
+def build_scheduler(config: dict) -> IDataSupervisor:
+    """Create the supervisor and its jobs from the configuration."""
+    # Add telephone numbers to send Whatsapp messages.
+    whatsapp = WhatsappNotifier()
+    for phone_number, api_key in config["phones"].items():
+        whatsapp.add_phone_api_key(phone_number, api_key)
+
+    # Send the messages in the background, without blocking the jobs.
+    dispatcher = NotificationDispatcher(whatsapp, window=config.get("notification_window", 2))
+
+    # All the jobs share one request budget, if one is configured.
+    rate_limiter = None
+    if "requests_per_second" in config:
+        rate_limiter = TokenBucket(config["requests_per_second"], config.get("request_burst"))
+
+    # Keep the history of the open slots, if a history file is configured.
+    history = None
+    if "history_file" in config:
+        history = AvailabilityHistory(config["history_file"])
+
+    # Check the calendar status before the dates, if a gate TTL is configured.
+    calendar_gate = None
+    if "calendar_gate_ttl" in config:
+        calendar_gate = CalendarStatusGate(config["calendar_gate_ttl"])
+
+    # Share the offices and dates with the other workers, if configured.
+    coordinator = None
+    if "coordination" in config:
+        coordinator = WorkCoordinator(
+            SQLiteLeaseBackend(config["coordination"]["database"]),
+            worker_id=config["coordination"].get("worker_id"),
+            lease_ttl=config["coordination"].get("lease_ttl", 120)
+        )
+        coordinator.start()
+        # Hand the units over to the other workers at once on a clean exit.
+        atexit.register(coordinator.stop)
+
+    # One appointment finder holds all the offices and the shared session.
+    appointments = IDataAppointmentFinder(IDataSessionManager(
+        pool_maxsize=config.get("pool_maxsize", 10),
+        base_url=config.get("base_url"),
+        record_directory=config.get("record_directory"),
+        rate_limiter=rate_limiter,
+        token_cache=config.get("token_cache"),
+        failure_threshold=config.get("circuit_failure_threshold"),
+        cool_down=config.get("circuit_cool_down")
+    ), history, calendar_gate=calendar_gate, coordinator=coordinator)
+    for office_name, office_id in config["offices"].items():
+        appointments.add_office(office_name, office_id)
+
+    # Remember the notified slots, so they are sent only once.
+    detector = SlotChangeDetector(
+        ttl=config.get("state_ttl", 3600),
+        path=config.get("state_file")
+    )
+
+    # The release times seen in the history guide the jobs with daily polls.
+    release_model = ReleaseModel()
+    if history is not None:
+        release_model.fit(history)
+
+    scheduler = IDataSupervisor(
+        max_failures=config.get("max_failures", 10),
+        restart_backoff=config.get("restart_backoff", 5),
+        max_restart_backoff=config.get("max_restart_backoff", 600)
+    )
+    for index, job_config in enumerate(config["jobs"]):
+        job_type = job_config["type"]
+        if job_type not in JOB_FACTORIES:
+            raise ValueError(f"Invalid job type: {job_type}")
+        interval = job_config.get("interval", 30)
+        min_interval = job_config.get("min_interval", 10)
+        policy_config = {
+            "base_interval": interval,
+            "jitter": job_config.get("jitter", 0),
+            # Poll three times as often after a finding, as the scripts do.
+            "burst_interval": job_config.get("burst_interval", max(min_interval, interval / 3)),
+            "burst_duration": job_config.get("burst_duration", 600),
+            "max_interval": job_config.get("max_interval", 900),
+        }
+        if "daily_polls" in job_config:
+            # Spend the polls of a day where the releases are likely.
+            policy = BudgetPollingPolicy(
+                release_model,
+                job_config["daily_polls"],
+                office_id=config["offices"].get(job_config.get("office")),
+                min_interval=min_interval,
+                **policy_config
+            )
+        else:
+            policy = AdaptivePollingPolicy(**policy_config)
+        scheduler.add_job(
+            job_config.get("name", f"{job_type}-{index}"),
+            functools.partial(
+                JOB_FACTORIES[job_type], appointments, detector, dispatcher, job_config
+            ),
+            policy=policy
+        )
+
+    # Drop the old history and refit the release model once a day.
+    if history is not None:
+        retention = config.get("history_retention_days", 90) * 86400
+
+        def compact_history() -> None:
+            history.compact(retention)
+            release_model.fit(history)
+        scheduler.add_job("history-compaction", lambda: compact_history, interval=86400)
+    return scheduler
+
+
+if __name__ == "__main__":
+    # Measure the start-up phases, the imports are done.
+    startup = StartupTimer()
+    startup.mark("imports")
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("config", help="Path to the JSON configuration file.")
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as config_file:
+        scheduler_config = json.load(config_file)
+
+    # Configure the logger.
+    configure_logging(
+        scheduler_config.get("log_file", "idata_scheduler_service.log"),
+        level=logging.getLevelName(scheduler_config.get("log_level", "INFO")),
+        structured=scheduler_config.get("log_format", "json") == "json",
+        max_bytes=scheduler_config.get("log_max_bytes", 10 * 1024 * 1024),
+        backup_count=scheduler_config.get("log_backup_count", 5),
+        sample_every=scheduler_config.get("log_sample_every", 20)
+    )
+
+    # Serve the metrics on a local port, if one is configured.
+    if "metrics_port" in scheduler_config:
+        MetricsServer(port=scheduler_config["metrics_port"]).start()
+
+    scheduler = build_scheduler(scheduler_config)
+    startup.mark("setup")
+    startup.report()
+    scheduler.run_forever()
@@ -0,0 +1,165 @@
+"""
+Tests of the slot records and the list wrappers of the appointment finder.
+"""
+
+import json
+import logging
+from types import SimpleNamespace
+
+from core.appointment_finder import IDataAppointmentFinder
+from core.calendar_gate import CalendarStatusGate
+from core.coordination import SQLiteLeaseBackend, WorkCoordinator
+from core.dates import from_ordinal, today_ordinal
+from core.history import NO_TIME, AvailabilityHistory, to_minute
+
+
+def getdate(*dates: str) -> str:
+    labels = "".join(f'<label class="form-control">{date}</label>' for date in dates)
+    return f'<div class="row">{labels}</div>'
+
+
+def senddate(*hours: str) -> str:
+    buttons = "".join(
+        f'<button class="btn getdatebtnhour noPrime" type="button">{hour}</button>'
+        for hour in hours
+    )
+    return f'<div class="hours">{buttons}</div>'
+
+
+class FakeRequester:
+    """A requester answering the status, getdate and senddate requests
+    with fixed bodies, and counting them.
+    """
+
+    def __init__(self, senddate_body: str, open_dates: tuple[str, ...]):
+        self.senddate_body = senddate_body
+        self.open_dates = open_dates
+        self.posts = 0
+
+    def post_getcalenderstatus(self, *args) -> str:
+        self.posts += 1
+        return json.dumps({"status": True})
+
+    def post_getdate(self, *args) -> str:
+        self.posts += 1
+        return getdate(*self.open_dates)
+
+    def post_senddate(self, *args) -> str:
+        self.posts += 1
+        return self.senddate_body
+
+
+def finder_for(*hours: str,
+               open_dates: tuple[str, ...] = ("17-11-2023",),
+               **kwargs) -> IDataAppointmentFinder:
+    session = SimpleNamespace(requester=FakeRequester(senddate(*hours), open_dates))
+    finder = IDataAppointmentFinder(session_manager=session, **kwargs)
+    finder.add_office("Altunizade", 8)
+    return finder
+
+
+def days_from_today(*days: int) -> tuple[str, ...]:
+    return tuple(from_ordinal(today_ordinal() + day) for day in days)
+
+
+def requests_saved(caplog) -> int:
+    message = next(
+        record.getMessage() for record in caplog.records if "requests saved" in record.getMessage()
+    )
+    return int(message.split(", ")[-1].split()[0])
+
+
+def test_to_minute_reads_the_leading_time():
+    assert to_minute("09:00") == 540
+    assert to_minute("9.30") == 570
+    assert to_minute("09:00 - 09:15") == 540
+    assert to_minute("Saat") == NO_TIME
+    assert to_minute("25:00") == NO_TIME
+
+
+def test_the_wrappers_return_the_parsed_texts():
+    finder = finder_for("09:00 - 09:15", "9.30", "Saat")
+    assert finder.get_open_dates("Altunizade") == ["17-11-2023"]
+    assert finder.find_available_dates("Altunizade", "01-01-2024") == ["17-11-2023"]
+    assert finder.check_date_for(finder.query_for("Altunizade"), "17-11-2023", "free") == \
+        ["09:00 - 09:15", "9.30", "Saat"]
+    assert finder.check_for_specific_date("Altunizade", "17-11-2023", "free") == \
+        ["09:00 - 09:15", "9.30", "Saat"]
+
+
+def test_the_records_keep_the_text_of_an_unreadable_time():
+    finder = finder_for("9.30", "Saat")
+    records = list(finder.iter_slots("Altunizade", ["17-11-2023"], "free"))
+    assert [(record.time, record.text) for record in records] == \
+        [("09:30", "9.30"), (None, "Saat")]
+    assert records[0].date == "17-11-2023"
+    assert records[0].slot_type_name == "free"
+
+
+def test_the_saved_requests_count_the_requests_sent(caplog):
+    caplog.set_level(logging.INFO)
+    finder = finder_for("09:00", open_dates=days_from_today(2, 5),
+                        calendar_gate=CalendarStatusGate())
+    until_date = days_from_today(9)[0]
+    found = finder.find_free_time_slots("Altunizade", until_date, "free")
+    assert sorted(found) == sorted(days_from_today(2, 5))
+    # Ten senddate requests without the pruning, a status, a getdate and two senddate ones.
+    assert finder.session_manager.requester.posts == 4
+    assert requests_saved(caplog) == 6
+
+
+def test_the_saved_requests_are_never_negative(caplog):
+    caplog.set_level(logging.INFO)
+    finder = finder_for("09:00", open_dates=days_from_today(0),
+                        calendar_gate=CalendarStatusGate())
+    finder.find_free_time_slots("Altunizade", days_from_today(0)[0], "free")
+    assert finder.session_manager.requester.posts == 3
+    assert requests_saved(caplog) == 0
+
+
+def test_the_dates_of_other_workers_are_not_saved(caplog, tmp_path):
+    caplog.set_level(logging.INFO)
+    database = str(tmp_path / "leases.db")
+    other = WorkCoordinator(SQLiteLeaseBackend(database), "worker-a")
+    other.claim([])
+    coordinator = WorkCoordinator(SQLiteLeaseBackend(database), "worker-b")
+    calendar = days_from_today(*range(20))
+    finder = finder_for("09:00", open_dates=calendar, coordinator=coordinator)
+
+    finder.find_free_time_slots("Altunizade", calendar[-1], "free")
+    own_dates = finder.count_own_dates("Altunizade", calendar)
+    assert 0 < own_dates < len(calendar)
+    assert finder.session_manager.requester.posts == 1 + own_dates
+    assert requests_saved(caplog) == 0
+
+
+def open_slots(history: AvailabilityHistory) -> list[tuple[str, str]]:
+    return sorted((record.date, record.time or "") for record in history.open_slots())
+
+
+def test_the_slots_of_a_date_leaving_getdate_are_closed(tmp_path):
+    with AvailabilityHistory(str(tmp_path / "history.bin")) as history:
+        finder = finder_for("09:00", open_dates=days_from_today(2, 5), history=history)
+        until_date = days_from_today(9)[0]
+        finder.find_free_time_slots("Altunizade", until_date, "free")
+        assert open_slots(history) == sorted(
+            [(date, "") for date in days_from_today(2, 5)]
+            + [(date, "09:00") for date in days_from_today(2, 5)]
+        )
+
+        finder.session_manager.requester.open_dates = days_from_today(5)
+        finder.find_free_time_slots("Altunizade", until_date, "free")
+        still_open = days_from_today(5)[0]
+        assert open_slots(history) == [(still_open, ""), (still_open, "09:00")]
+        vanished = [record for record in history.query() if record.vanished_at]
+        assert {record.date for record in vanished} == set(days_from_today(2))
+        assert len(vanished) == 2
+
+
+def test_the_dates_of_other_queries_are_not_recorded(tmp_path):
+    with AvailabilityHistory(str(tmp_path / "history.bin")) as history:
+        finder = finder_for(open_dates=days_from_today(2), history=history)
+        finder.get_open_dates_for(finder.query_for("Altunizade", total_person=3))
+        assert not history.open_slots()
+        finder.get_open_dates("Altunizade")
+        assert [record.date for record in history.open_slots()] == list(days_from_today(2))
@@ -0,0 +1,83 @@
+"""
+Tests of the calendar status gate.
+"""
+
+import json
+
+import pytest
+
+from core import calendar_gate
+from core.calendar_gate import CalendarStatusGate
+from core.exceptions import IDataHTTPError, IDataRateLimitError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(calendar_gate.time, "monotonic", clock.monotonic)
+    return clock
+
+
+class StatusEndpoint:
+    """Answers the status requests with a status or raises an error."""
+
+    def __init__(self, status=None, error: Exception | None = None):
+        self.status = status
+        self.error = error
+        self.requests = 0
+
+    def __call__(self) -> str:
+        self.requests += 1
+        if self.error is not None:
+            raise self.error
+        return json.dumps({"status": self.status})
+
+
+def test_a_closed_calendar_is_remembered_for_the_ttl(clock):
+    gate = CalendarStatusGate(ttl=20)
+    endpoint = StatusEndpoint(status=False)
+    assert not gate.is_open("Altunizade", endpoint)
+    clock.now += 19
+    assert not gate.is_open("Altunizade", endpoint)
+    assert endpoint.requests == 1
+    clock.now += 1
+    endpoint.status = True
+    assert gate.is_open("Altunizade", endpoint)
+    assert endpoint.requests == 2
+    assert gate.stats() == {"status_requests": 2, "skipped": 2}
+
+
+def test_a_failed_status_request_counts_as_open_for_the_ttl(clock):
+    gate = CalendarStatusGate(ttl=20)
+    endpoint = StatusEndpoint(error=IDataHTTPError("/getcalenderstatus", 500))
+    assert gate.is_open("Altunizade", endpoint)
+    clock.now += 10
+    assert gate.is_open("Altunizade", endpoint)
+    assert endpoint.requests == 1
+    clock.now += 10
+    assert gate.is_open("Altunizade", endpoint)
+    assert endpoint.requests == 2
+
+
+def test_a_rate_limit_is_raised(clock):
+    gate = CalendarStatusGate(ttl=20)
+    endpoint = StatusEndpoint(error=IDataRateLimitError("/getcalenderstatus", 429))
+    with pytest.raises(IDataRateLimitError):
+        gate.is_open("Altunizade", endpoint)
+    with pytest.raises(IDataRateLimitError):
+        gate.is_open("Altunizade", endpoint)
+    assert endpoint.requests == 2
+
+
+def test_an_unreadable_status_counts_as_open(clock):
+    gate = CalendarStatusGate(ttl=20)
+    assert gate.is_open("Altunizade", lambda: "<html>maintenance</html>")
+    assert gate.stats() == {"status_requests": 1, "skipped": 0}
@@ -0,0 +1,112 @@
+"""
+Tests of the slot change detection and its state file.
+"""
+
+import json
+
+import pytest
+
+from core import change_detector
+from core.change_detector import SlotChange, SlotChangeDetector
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(change_detector.time, "time", clock.time)
+    return clock
+
+
+def test_only_the_differences_are_reported(clock):
+    detector = SlotChangeDetector()
+    assert detector.update("Altunizade", "free", {"17-11-2023": ["09:00", "09:15"]}) == [
+        SlotChange("Altunizade", "17-11-2023", "free", ("09:00", "09:15"), ())
+    ]
+    assert not detector.update("Altunizade", "free", {"17-11-2023": ["09:15", "09:00"]})
+    assert detector.update("Altunizade", "free", {"17-11-2023": ["09:15", "09:30"]}) == [
+        SlotChange("Altunizade", "17-11-2023", "free", ("09:30",), ("09:00",))
+    ]
+    assert detector.update("Altunizade", "free", {"17-11-2023": []}) == [
+        SlotChange("Altunizade", "17-11-2023", "free", (), ("09:15", "09:30"))
+    ]
+
+
+def test_the_dates_missing_from_the_scope_vanish(clock):
+    detector = SlotChangeDetector()
+    detector.update("Altunizade", "free", {"17-11-2023": ["09:00"], "18-11-2023": ["10:00"]})
+    detector.update("Gayrettepe", "free", {"17-11-2023": ["11:00"]})
+
+    # A date outside of the scope was not checked, it is kept.
+    assert not detector.update("Altunizade", "free", {}, scope=["19-11-2023"])
+    assert detector.update("Altunizade", "free", {}, scope=["17-11-2023"]) == [
+        SlotChange("Altunizade", "17-11-2023", "free", (), ("09:00",))
+    ]
+    # Without a scope, all the known dates of the office and slot type count.
+    assert detector.update("Altunizade", "free", {}) == [
+        SlotChange("Altunizade", "18-11-2023", "free", (), ("10:00",))
+    ]
+    assert not detector.update("Gayrettepe", "prime", {})
+
+
+def test_the_entries_are_forgotten_after_the_ttl(clock):
+    detector = SlotChangeDetector(ttl=60)
+    detector.update("Altunizade", "free", {"17-11-2023": ["09:00"]})
+    clock.now += 61
+    assert detector.update("Altunizade", "free", {"17-11-2023": ["09:00"]}) == [
+        SlotChange("Altunizade", "17-11-2023", "free", ("09:00",), ())
+    ]
+
+
+def test_the_state_survives_a_restart(clock, tmp_path):
+    path = str(tmp_path / "state.json")
+    SlotChangeDetector(path=path).update("Altunizade", "free", {"17-11-2023": ["09:00"]})
+
+    detector = SlotChangeDetector(path=path)
+    assert not detector.update("Altunizade", "free", {"17-11-2023": ["09:00"]})
+    assert detector.update("Altunizade", "free", {}) == [
+        SlotChange("Altunizade", "17-11-2023", "free", (), ("09:00",))
+    ]
+
+
+def test_the_expired_entries_are_not_loaded(clock, tmp_path):
+    path = str(tmp_path / "state.json")
+    SlotChangeDetector(ttl=60, path=path).update("Altunizade", "free", {"17-11-2023": ["09:00"]})
+    clock.now += 61
+    detector = SlotChangeDetector(ttl=60, path=path)
+    assert detector.update("Altunizade", "free", {"17-11-2023": ["09:00"]})
+
+
+@pytest.mark.parametrize("content", [
+    '[["Altunizade", "17-11-2023", "free", ["09:00"]]]',
+    '[["Altunizade", "17-11-2023", "free", "09:00", 1700000000.0]]',
+    '[["Altunizade", "17-11-2023", "free", ["09:00"], "yesterday"]]',
+    '[[["Altunizade"], "17-11-2023", "free", ["09:00"], 1700000000.0]]',
+    '[5]',
+    '{"Altunizade": 5}',
+    '[["Altunizade", "17-11-2023", "free", ["09:00"], 1700000000.0]',
+])
+def test_an_invalid_state_file_is_ignored(clock, tmp_path, content):
+    path = tmp_path / "state.json"
+    path.write_text(content, encoding="utf-8")
+    detector = SlotChangeDetector(path=str(path))
+    assert detector.update("Altunizade", "free", {"17-11-2023": ["09:00"]}) == [
+        SlotChange("Altunizade", "17-11-2023", "free", ("09:00",), ())
+    ]
+    assert json.loads(path.read_text(encoding="utf-8")) == \
+        [["Altunizade", "17-11-2023", "free", ["09:00"], clock.now]]
+
+
+def test_the_changes_are_reported_if_the_state_cannot_be_saved(clock, tmp_path):
+    detector = SlotChangeDetector(path=str(tmp_path / "missing" / "state.json"))
+    assert detector.update("Altunizade", "free", {"17-11-2023": ["09:00"]}) == [
+        SlotChange("Altunizade", "17-11-2023", "free", ("09:00",), ())
+    ]
+    assert not detector.update("Altunizade", "free", {"17-11-2023": ["09:00"]})
@@ -0,0 +1,107 @@
+"""
+Tests of the work coordination on a SQLite lease store.
+"""
+
+import pytest
+
+from core import coordination
+from core.coordination import LeaseBackend, SQLiteLeaseBackend, WorkCoordinator
+
+UNITS = [f"Altunizade/{day:02d}-11-2023" for day in range(1, 31)]
+TTL = 60.0
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(coordination.time, "time", clock.time)
+    return clock
+
+
+@pytest.fixture(name="database")
+def fixture_database(tmp_path) -> str:
+    return str(tmp_path / "leases.db")
+
+
+def coordinator(database: str, worker_id: str) -> WorkCoordinator:
+    # Every worker has its own connection, as the processes of a host do.
+    return WorkCoordinator(SQLiteLeaseBackend(database), worker_id, lease_ttl=TTL)
+
+
+def test_the_lease_backend_is_abstract():
+    with pytest.raises(TypeError):
+        LeaseBackend()  # pylint: disable=abstract-class-instantiated
+
+
+def test_no_unit_is_claimed_twice(database, clock):
+    workers = [coordinator(database, f"worker-{index}") for index in range(3)]
+    for worker in workers:
+        worker.claim(UNITS)
+
+    for _ in range(3):
+        claims = [set(worker.claim(UNITS)) for worker in workers]
+        assert sum(len(claim) for claim in claims) == len(UNITS)
+        assert set().union(*claims) == set(UNITS)
+        assert all(claim for claim in claims)
+        clock.now += TTL / 3
+
+
+def test_a_live_worker_keeps_its_units(database, clock):
+    first, second = coordinator(database, "worker-a"), coordinator(database, "worker-b")
+    first.claim(UNITS)
+    first_units = set(first.claim(UNITS))
+    second_units = set(second.claim(UNITS))
+    assert first_units.isdisjoint(second_units)
+
+    # The second worker takes no units of the first one within the TTL.
+    clock.now += TTL - 1
+    first.claim([])
+    assert set(second.claim(UNITS)) == second_units
+
+
+def test_the_units_of_a_dead_worker_are_taken_over_after_the_ttl(database, clock):
+    dead, survivor = coordinator(database, "worker-a"), coordinator(database, "worker-b")
+    dead.claim(UNITS)
+    survivor.claim(UNITS)
+    assert dead.claim(UNITS)
+
+    # The dead worker neither renews its heartbeat nor releases its leases.
+    clock.now += TTL / 2
+    assert len(survivor.claim(UNITS)) < len(UNITS)
+    clock.now += TTL / 2
+    assert survivor.claim(UNITS) == UNITS
+    assert survivor.live_workers == ["worker-b"]
+
+
+def test_a_leaving_worker_hands_its_units_over_at_once(database, clock):
+    leaving, staying = coordinator(database, "worker-a"), coordinator(database, "worker-b")
+    leaving.claim(UNITS)
+    staying.claim(UNITS)
+    assert leaving.claim(UNITS)
+
+    leaving.stop()
+    assert staying.claim(UNITS) == UNITS
+
+
+def test_a_joining_worker_moves_only_its_share(database, clock):
+    first, second = coordinator(database, "worker-a"), coordinator(database, "worker-b")
+    first.claim(UNITS)
+    second.claim(UNITS)
+    before = {worker.worker_id: set(worker.claim(UNITS)) for worker in (first, second)}
+
+    third = coordinator(database, "worker-c")
+    third.claim(UNITS)
+    after = {worker.worker_id: set(worker.claim(UNITS)) for worker in (first, second)}
+    after["worker-c"] = set(third.claim(UNITS))
+
+    assert after["worker-a"] <= before["worker-a"]
+    assert after["worker-b"] <= before["worker-b"]
+    assert sum(len(units) for units in after.values()) == len(UNITS)
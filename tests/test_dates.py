@@ -0,0 +1,78 @@
+"""
+Tests of the ordinal date handling against the string based versions.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from benchmarks.bench_dates import legacy_get_dates_between, legacy_remove_dates_before
+from core.dates import DateSet, date_range, from_ordinal, to_ordinal
+from core.utils import IDataUtilities
+
+DATES = legacy_get_dates_between("20-12-2023", "10-03-2024")
+# An unsorted subset with a duplicate, as the responses may have.
+SOME_DATES = [DATES[40], DATES[3], DATES[17], DATES[3], DATES[79], DATES[11]]
+
+
+def parse(date_string: str) -> datetime:
+    return datetime.strptime(date_string, "%d-%m-%Y")
+
+
+def test_the_ordinals_round_trip():
+    for date_string in DATES:
+        assert from_ordinal(to_ordinal(date_string)) == date_string
+    assert to_ordinal("29-02-2024") - to_ordinal("28-02-2024") == 1
+    assert date_range(to_ordinal(DATES[0]), to_ordinal(DATES[-1])) == tuple(DATES)
+
+
+def test_the_utilities_match_the_string_versions():
+    assert IDataUtilities.get_dates_between(DATES[0], DATES[-1]) == DATES
+    for cutoff in ("01-01-2024", DATES[0], "01-01-2030", "01-01-2000"):
+        assert IDataUtilities.remove_dates_before(SOME_DATES, cutoff) == \
+            legacy_remove_dates_before(SOME_DATES, cutoff)
+
+
+def test_a_date_set_is_sorted_and_unique():
+    date_set = DateSet.from_strings(SOME_DATES)
+    assert date_set.to_strings() == sorted(set(SOME_DATES), key=parse)
+    assert len(date_set) == 5
+    assert to_ordinal(DATES[17]) in date_set
+    assert to_ordinal(DATES[18]) not in date_set
+    assert DateSet.from_range(to_ordinal(DATES[0]), to_ordinal(DATES[-1])) == \
+        DateSet.from_strings(DATES)
+
+
+@pytest.mark.parametrize("weekdays", [(), (0,), (5, 6), (0, 2, 4), tuple(range(7))])
+def test_on_weekdays_matches_datetime(weekdays):
+    assert DateSet.from_strings(DATES).on_weekdays(weekdays).to_strings() == \
+        [date_string for date_string in DATES if parse(date_string).weekday() in weekdays]
+
+
+@pytest.mark.parametrize("start, end", [
+    ("01-01-2024", "31-01-2024"),
+    ("01-01-2000", "01-01-2030"),
+    ("15-01-2024", "14-01-2024"),
+    ("20-12-2023", "20-12-2023"),
+])
+def test_the_ranges_match_the_string_comparisons(start, end):
+    date_set = DateSet.from_strings(DATES)
+    assert date_set.within(to_ordinal(start), to_ordinal(end)).to_strings() == \
+        [d for d in DATES if parse(start) <= parse(d) <= parse(end)]
+    assert date_set.before(to_ordinal(start)).to_strings() == \
+        [d for d in DATES if parse(d) < parse(start)]
+    assert date_set.after(to_ordinal(end)).to_strings() == \
+        [d for d in DATES if parse(d) > parse(end)]
+
+
+def test_the_set_operations_match_the_string_sets():
+    first = DateSet.from_strings(DATES[:50])
+    second = DateSet.from_strings(SOME_DATES)
+
+    def strings(date_strings) -> list[str]:
+        return sorted(date_strings, key=parse)
+
+    assert first.excluding(second).to_strings() == strings(set(DATES[:50]) - set(SOME_DATES))
+    assert first.intersection(second).to_strings() == strings(set(DATES[:50]) & set(SOME_DATES))
+    assert first.union(second).to_strings() == strings(set(DATES[:50]) | set(SOME_DATES))
+    assert first.excluding(to_ordinal(date) for date in DATES) == DateSet()
@@ -0,0 +1,103 @@
+"""
+Tests of the background notification dispatcher.
+"""
+
+import threading
+import time
+
+from core.dispatcher import NotificationDispatcher
+from core.exceptions import IDataNotificationError
+
+
+class FakeNotifier:
+    """A notifier recording the messages, the failures of every phone
+    number are scripted as the results of its next sends.
+    """
+
+    def __init__(self, *phone_numbers: str, results: dict[str, list] | None = None):
+        self.phone_numbers = list(phone_numbers)
+        self.results = results or {}
+        self.sent: list[tuple[str, str, float]] = []
+        self.attempts: dict[str, int] = {phone_number: 0 for phone_number in phone_numbers}
+        self._lock = threading.Lock()
+
+    def send_message(self, phone_number: str, message: str) -> bool:
+        with self._lock:
+            self.attempts[phone_number] += 1
+            results = self.results.get(phone_number, [])
+            result = results.pop(0) if results else True
+        if isinstance(result, Exception):
+            raise result
+        if result:
+            with self._lock:
+                self.sent.append((phone_number, message, time.monotonic()))
+        return result
+
+    def messages_to(self, phone_number: str) -> list[str]:
+        return [message for number, message, _ in self.sent if number == phone_number]
+
+
+def test_the_messages_of_a_window_are_coalesced():
+    notifier = FakeNotifier("+1", "+2")
+    with NotificationDispatcher(notifier, window=0.2) as dispatcher:
+        dispatcher.notify("Altunizade 17-11-2023")
+        dispatcher.notify("Gayrettepe 18-11-2023")
+    assert notifier.messages_to("+1") == ["Altunizade 17-11-2023\nGayrettepe 18-11-2023"]
+    assert notifier.messages_to("+2") == ["Altunizade 17-11-2023\nGayrettepe 18-11-2023"]
+
+
+def test_a_failed_send_is_retried():
+    notifier = FakeNotifier("+1", results={"+1": [False, RuntimeError("timeout"), True]})
+    with NotificationDispatcher(notifier, window=0, backoff=0.01) as dispatcher:
+        dispatcher.notify("Altunizade 17-11-2023")
+        deadline = time.monotonic() + 5
+        while not notifier.sent and time.monotonic() < deadline:
+            time.sleep(0.01)
+    assert notifier.attempts["+1"] == 3
+    assert notifier.messages_to("+1") == ["Altunizade 17-11-2023"]
+
+
+def test_the_retries_stop_after_max_retries():
+    notifier = FakeNotifier("+1", results={"+1": [False] * 10})
+    dispatcher = NotificationDispatcher(notifier, window=0, max_retries=2, backoff=0.01)
+    dispatcher.notify("Altunizade 17-11-2023")
+    time.sleep(0.2)
+    dispatcher.stop()
+    assert notifier.attempts["+1"] == 3
+    assert not notifier.sent
+
+
+def test_a_recipient_without_an_api_key_is_not_retried():
+    notifier = FakeNotifier("+1", results={"+1": [IDataNotificationError("No API key")]})
+    with NotificationDispatcher(notifier, window=0, backoff=0.01) as dispatcher:
+        dispatcher.notify("Altunizade 17-11-2023")
+    assert notifier.attempts["+1"] == 1
+
+
+def test_a_failing_recipient_does_not_delay_the_others():
+    notifier = FakeNotifier("+1", "+2", "+3", results={"+1": [False] * 10})
+    dispatcher = NotificationDispatcher(notifier, window=0, max_retries=3, backoff=10)
+    notified_at = time.monotonic()
+    dispatcher.notify("Altunizade 17-11-2023")
+    dispatcher.notify("Gayrettepe 18-11-2023")
+    deadline = notified_at + 5
+    while len(notifier.sent) < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert notifier.messages_to("+2") == ["Altunizade 17-11-2023", "Gayrettepe 18-11-2023"]
+    assert notifier.messages_to("+3") == ["Altunizade 17-11-2023", "Gayrettepe 18-11-2023"]
+    assert max(sent_at for _, _, sent_at in notifier.sent) - notified_at < 1
+
+    # Stopping does not wait for the backoff of the failing recipient.
+    dispatcher.stop()
+    assert time.monotonic() - notified_at < 5
+    assert notifier.attempts["+1"] == 8
+
+
+def test_the_queued_messages_are_sent_on_stop():
+    notifier = FakeNotifier("+1")
+    dispatcher = NotificationDispatcher(notifier, window=60)
+    dispatcher.notify("Altunizade 17-11-2023")
+    started_at = time.monotonic()
+    dispatcher.stop()
+    assert time.monotonic() - started_at < 5
+    assert notifier.messages_to("+1") == ["Altunizade 17-11-2023"]
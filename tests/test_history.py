@@ -0,0 +1,140 @@
+"""
+Tests of the file format and the queries of the availability history.
+"""
+
+import os
+from datetime import date, datetime
+
+import pytest
+
+from core.history import HEADER, NO_TIME, RECORD, AvailabilityHistory
+
+# A day and a Unix time on the day before it.
+DAY = date(2030, 1, 2).toordinal()
+AT = datetime(2030, 1, 1, 12).timestamp()
+OFFICE = 8
+
+
+def date_key(day: int = DAY, office_id: int = OFFICE) -> tuple[int, int, int, int]:
+    return (office_id, day, NO_TIME, 0)
+
+
+def slot_key(minute: int, day: int = DAY) -> tuple[int, int, int, int]:
+    return (OFFICE, day, minute, 1)
+
+
+@pytest.fixture(name="path")
+def fixture_path(tmp_path) -> str:
+    return str(tmp_path / "history.bin")
+
+
+def test_appeared_slots_are_appended(path):
+    with AvailabilityHistory(path) as history:
+        history.observe(OFFICE, "date", [date_key()], at=AT)
+        history.observe(OFFICE, "free", [slot_key(540), slot_key(570)], day=DAY, at=AT + 1)
+        # An unchanged observation writes nothing.
+        history.observe(OFFICE, "free", [slot_key(540), slot_key(570)], day=DAY, at=AT + 2)
+        assert len(history) == 3
+    assert os.path.getsize(path) == len(HEADER) + 3 * RECORD.size
+
+    with AvailabilityHistory(path) as history:
+        assert [record[:4] for record in history.open_slots()] == \
+            [date_key(), slot_key(540), slot_key(570)]
+
+
+def test_vanished_slots_are_patched_in_place(path):
+    with AvailabilityHistory(path) as history:
+        history.observe(OFFICE, "free", [slot_key(540), slot_key(570)], day=DAY, at=AT)
+        history.observe(OFFICE, "free", [slot_key(570)], day=DAY, at=AT + 5)
+        assert len(history) == 2
+        assert [record[:4] for record in history.open_slots()] == [slot_key(570)]
+
+    with AvailabilityHistory(path) as history:
+        records = list(history.query())
+    assert [(record.minute, record.vanished_at) for record in records] == \
+        [(540, AT + 5), (570, 0.0)]
+
+
+def test_a_truncated_record_is_dropped(path):
+    with AvailabilityHistory(path) as history:
+        history.observe(OFFICE, "free", [slot_key(540), slot_key(570)], day=DAY, at=AT)
+    with open(path, "ab") as history_file:
+        history_file.write(RECORD.pack(*slot_key(600), AT + 1, 0.0)[:7])
+
+    with AvailabilityHistory(path) as history:
+        assert len(history) == 2
+        assert [record.minute for record in history.open_slots()] == [540, 570]
+    assert os.path.getsize(path) == len(HEADER) + 2 * RECORD.size
+
+
+def test_a_foreign_file_is_refused(path):
+    with open(path, "wb") as foreign_file:
+        foreign_file.write(b"not a history file")
+    with pytest.raises(ValueError):
+        AvailabilityHistory(path)
+
+
+def test_queries_find_the_time_range(path):
+    with AvailabilityHistory(path) as history:
+        for second in range(100):
+            history.observe(OFFICE, "free", [slot_key(second)], day=DAY, at=AT + second)
+
+        assert [record.minute for record in history.query(AT + 10, AT + 13)] == [10, 11, 12]
+        assert [record.minute for record in history.query(start=AT + 97)] == [97, 98, 99]
+        assert len(list(history.query(end=AT + 50))) == 50
+        assert not list(history.query(AT + 200))
+        assert not list(history.query(office_id=OFFICE + 1))
+        assert len(list(history.query(slot_type="free", first_day=DAY, last_day=DAY))) == 100
+
+
+def test_the_clock_going_back_keeps_the_file_sorted(path):
+    with AvailabilityHistory(path) as history:
+        history.observe(OFFICE, "free", [slot_key(540)], day=DAY, at=AT + 10)
+        history.observe(OFFICE, "free", [slot_key(540), slot_key(570)], day=DAY, at=AT)
+        assert [record.observed_at for record in history.query()] == [AT + 10, AT + 10]
+
+
+def test_compaction_drops_the_old_vanished_slots(path):
+    with AvailabilityHistory(path) as history:
+        history.observe(OFFICE, "free", [slot_key(540), slot_key(570)], day=DAY, at=AT)
+        history.observe(OFFICE, "free", [slot_key(570)], day=DAY, at=AT + 10)
+        history.observe(OFFICE, "free", [slot_key(570), slot_key(600)], day=DAY, at=AT + 20)
+        history.observe(OFFICE, "free", [slot_key(570)], day=DAY, at=AT + 1000)
+
+        assert history.compact(retention=100, now=AT + 1050) == 1
+        assert [record.minute for record in history.query()] == [570, 600]
+        assert [record.minute for record in history.open_slots()] == [570]
+
+        # The open slots are still closed in place after the compaction.
+        history.observe(OFFICE, "free", [], day=DAY, at=AT + 1100)
+        assert not history.open_slots()
+        assert len(history) == 2
+
+
+def test_the_slots_of_a_vanished_date_are_closed(path):
+    other_day = DAY + 1
+    with AvailabilityHistory(path) as history:
+        history.observe(OFFICE, "date", [date_key(), date_key(other_day)], at=AT)
+        history.observe(OFFICE, "free", [slot_key(540)], day=DAY, at=AT)
+        history.observe(OFFICE, "prime", [(OFFICE, DAY, 600, 2)], day=DAY, at=AT)
+        history.observe(OFFICE, "free", [slot_key(540, other_day)], day=other_day, at=AT)
+
+        history.observe(OFFICE, "date", [date_key(other_day)], at=AT + 5)
+        assert [record[:4] for record in history.open_slots()] == \
+            [date_key(other_day), slot_key(540, other_day)]
+
+
+def test_the_slots_of_the_past_days_are_closed(path):
+    with AvailabilityHistory(path) as history:
+        history.observe(OFFICE, "date", [date_key()], at=AT)
+        history.observe(OFFICE, "free", [slot_key(540)], day=DAY, at=AT)
+        history.observe(OFFICE + 1, "date", [date_key(DAY + 1, OFFICE + 1)], at=AT)
+
+        # The next observation of any office after the day closes its slots.
+        after_the_day = datetime(2030, 1, 3, 9).timestamp()
+        history.observe(OFFICE + 1, "date", [date_key(DAY + 1, OFFICE + 1)], at=after_the_day)
+        assert [record[:4] for record in history.open_slots()] == [date_key(DAY + 1, OFFICE + 1)]
+
+        # The past days are not recorded.
+        history.observe(OFFICE, "date", [date_key()], at=after_the_day)
+        assert len(history) == 3
@@ -0,0 +1,137 @@
+"""
+Tests of the token handling and the circuit breaker of the requester.
+"""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from core.exceptions import IDataCircuitOpenError, IDataHTTPError, IDataTokenError
+from core.idata_requester import IDataRequester
+from core.rate_limiter import CircuitBreaker, TokenBucket
+from core.transport import HTTPTransport
+
+HOMEPAGE = '<html><head><meta name="csrf-token" content="token"></head></html>'
+
+
+class ScriptedTransport(HTTPTransport):
+    """A transport answering the GET and POST requests with fixed statuses."""
+
+    def __init__(self, host: str, get_status: int = 200, post_statuses=(200,)):
+        super().__init__(base_url=f"http://{host}")
+        self.get_status = get_status
+        self.post_statuses = list(post_statuses)
+        self.gets = 0
+        self.posts = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        with self._lock:
+            self.gets += 1
+        return SimpleNamespace(status_code=self.get_status, text=HOMEPAGE)
+
+    def post(self, url, data=None, **kwargs):
+        with self._lock:
+            status = self.post_statuses[min(self.posts, len(self.post_statuses) - 1)]
+            self.posts += 1
+        return SimpleNamespace(status_code=status, text="")
+
+
+def requester_for(transport: ScriptedTransport, **kwargs) -> IDataRequester:
+    return IDataRequester(transport=transport, rate_limiter=TokenBucket(1e6), **kwargs)
+
+
+def post(requester: IDataRequester) -> None:
+    requester.post_getdate(2, 8, 1, 2, 1)
+
+
+def test_expired_tokens_are_refreshed_once():
+    transport = ScriptedTransport("refresh.test", post_statuses=(419, 200))
+    requester = requester_for(transport)
+    post(requester)
+    assert transport.gets == 2
+    assert transport.posts == 2
+    assert requester.circuit_breaker.state == CircuitBreaker.CLOSED
+
+
+def test_a_host_answering_403_opens_the_circuit():
+    transport = ScriptedTransport("banned.test", post_statuses=(403,))
+    requester = requester_for(transport, failure_threshold=5, cool_down=60)
+    for _ in range(5):
+        with pytest.raises(IDataHTTPError):
+            post(requester)
+    assert requester.circuit_breaker.state == CircuitBreaker.OPEN
+    requests_sent = transport.gets + transport.posts
+    for _ in range(15):
+        with pytest.raises(IDataCircuitOpenError):
+            post(requester)
+    assert transport.gets + transport.posts == requests_sent
+
+
+def test_a_failing_token_request_is_a_failure():
+    transport = ScriptedTransport("homepage.test", get_status=403)
+    requester = requester_for(transport, failure_threshold=2, cool_down=60)
+    for _ in range(2):
+        with pytest.raises(IDataTokenError):
+            post(requester)
+    assert requester.circuit_breaker.state == CircuitBreaker.OPEN
+    assert transport.posts == 0
+
+
+def test_a_rejection_in_a_half_open_circuit_opens_it_again():
+    transport = ScriptedTransport("half-open.test", post_statuses=(200,))
+    requester = requester_for(transport, failure_threshold=1, cool_down=0)
+    post(requester)
+    requester.circuit_breaker.record_failure()
+    transport.post_statuses = [403]
+    with pytest.raises(IDataHTTPError):
+        post(requester)
+    assert requester.circuit_breaker.state == CircuitBreaker.OPEN
+
+
+def test_concurrent_rejections_refresh_the_tokens_once():
+    transport = ScriptedTransport("concurrent.test")
+    requester = requester_for(transport, failure_threshold=100)
+    post(requester)
+    rejected_at = requester._tokens_received_at  # pylint: disable=protected-access
+
+    threads = [
+        threading.Thread(target=requester.refresh_tokens,
+                         kwargs={"force": False, "rejected": rejected_at})
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert transport.gets == 2
+
+
+def test_the_cached_tokens_are_reused(tmp_path):
+    token_cache = str(tmp_path / "tokens.json")
+    requester = requester_for(ScriptedTransport("cache.test"), token_cache=token_cache)
+    post(requester)
+
+    transport = ScriptedTransport("cache.test")
+    requester = requester_for(transport, token_cache=token_cache)
+    post(requester)
+    assert transport.gets == 0
+
+
+@pytest.mark.parametrize("content", [
+    "[]",
+    "null",
+    '{"host": "invalid-cache.test", "received_at": "yesterday"}',
+    '{"host": "invalid-cache.test", "x_csrf_token": "token"}',
+    '{"host": "invalid-cache.test", "x_csrf_token": "token", "cookies": [{"name": "a"}]}',
+    '{"host": "invalid-cache.test", "x_csrf_token": "token", "cookies": 5}',
+    "{",
+])
+def test_an_invalid_token_cache_is_a_miss(tmp_path, content):
+    token_cache = tmp_path / "tokens.json"
+    token_cache.write_text(content, encoding="utf-8")
+    transport = ScriptedTransport("invalid-cache.test")
+    requester = requester_for(transport, token_cache=str(token_cache))
+    post(requester)
+    assert transport.gets == 1
@@ -0,0 +1,107 @@
+"""
+Tests of the JSON lines logging and the sampling of repeated messages.
+"""
+
+import json
+import logging
+
+import pytest
+
+from core.log_config import JSONLinesFormatter, RepeatSampler, _stop_listener, configure_logging
+
+NO_SLOTS = "%s: No free time slots on %s."
+
+
+def make_record(msg: str, args: tuple = (), **extra) -> logging.LogRecord:
+    record = logging.LogRecord("IDataAppointmentFinder", logging.INFO, __file__, 1, msg, args, None,
+                               func="_fetch_open_hours")
+    record.__dict__.update(extra)
+    return record
+
+
+def test_a_record_is_one_json_line():
+    record = make_record("%s: %d open dates.", ("Gayrettepe", 2), office_id=8, dates={"17-11-2023"})
+    line = JSONLinesFormatter().format(record)
+    assert "\n" not in line
+    entry = json.loads(line)
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "IDataAppointmentFinder"
+    assert entry["function"] == "_fetch_open_hours"
+    assert entry["message"] == "Gayrettepe: 2 open dates."
+    assert entry["office_id"] == 8
+    assert entry["dates"] == "{'17-11-2023'}"
+    assert len(entry["ts"]) == len("2023-10-20T22:00:20.123")
+    assert set(entry) == {"ts", "level", "logger", "function", "message", "office_id", "dates"}
+
+
+def test_the_messages_keep_their_characters():
+    line = JSONLinesFormatter().format(make_record("Saat seçiniz"))
+    assert "Saat seçiniz" in line
+
+
+def test_one_of_every_repeated_message_is_let_through():
+    sampler = RepeatSampler(sample_every=3)
+    passed = [
+        sampler.filter(make_record(NO_SLOTS, ("Gayrettepe", f"{day}-11-2023")))
+        for day in range(10, 17)
+    ]
+    assert passed == [True, False, False, True, False, False, True]
+
+
+def test_the_sampled_records_carry_the_rate():
+    sampler = RepeatSampler(sample_every=3)
+    record = make_record(NO_SLOTS, ("Gayrettepe", "17-11-2023"))
+    assert sampler.filter(record)
+    assert record.sampled == 3
+
+
+def test_the_offices_are_sampled_apart():
+    sampler = RepeatSampler(sample_every=3)
+    assert sampler.filter(make_record(NO_SLOTS, ("Gayrettepe", "17-11-2023")))
+    assert sampler.filter(make_record(NO_SLOTS, ("Altunizade", "17-11-2023")))
+    assert not sampler.filter(make_record(NO_SLOTS, ("Gayrettepe", "17-11-2023")))
+
+
+def test_the_other_messages_are_not_sampled():
+    sampler = RepeatSampler(sample_every=3)
+    records = [make_record("[FOUND TIME SLOT] %s", ("Gayrettepe",)) for _ in range(5)]
+    assert all(sampler.filter(record) for record in records)
+    assert not hasattr(records[0], "sampled")
+    sampler = RepeatSampler(sample_every=1)
+    assert all(sampler.filter(make_record(NO_SLOTS, ("Gayrettepe", "17-11-2023")))
+               for _ in range(5))
+
+
+@pytest.fixture(name="root_logger")
+def fixture_root_logger():
+    root_logger = logging.getLogger()
+    handlers, level = list(root_logger.handlers), root_logger.level
+    yield root_logger
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    for handler in handlers:
+        root_logger.addHandler(handler)
+    root_logger.setLevel(level)
+
+
+def test_the_log_file_has_the_sampled_json_lines(tmp_path, root_logger):
+    path = tmp_path / "idata_test.log"
+    listener = configure_logging(str(path), sample_every=2)
+    logger = logging.getLogger("IDataAppointmentFinder")
+    for _ in range(4):
+        logger.info(NO_SLOTS, "Gayrettepe", "17-11-2023")
+    logger.debug("Not written at the INFO level.")
+    try:
+        raise ValueError("bad response")
+    except ValueError:
+        logger.exception("Parsing failed.")
+    _stop_listener(listener)
+
+    entries = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [entry["message"].splitlines()[0] for entry in entries] == [
+        "Gayrettepe: No free time slots on 17-11-2023.",
+        "Gayrettepe: No free time slots on 17-11-2023.",
+        "Parsing failed.",
+    ]
+    assert entries[0]["sampled"] == 2
+    assert "ValueError: bad response" in entries[2]["message"]
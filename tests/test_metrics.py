@@ -0,0 +1,98 @@
+"""
+Tests of the metrics registry, its snapshots and its text format.
+"""
+
+from core.metrics import MetricsRegistry
+
+
+def test_counters_are_kept_per_label_values():
+    registry = MetricsRegistry(enabled=True)
+    requests = registry.counter("idata_requests_total", "Requests.", ("endpoint", "status"))
+    requests.inc(endpoint="getdate", status=200)
+    requests.inc(2, endpoint="getdate", status=200)
+    requests.inc(endpoint="senddate", status=419)
+    assert requests.value(endpoint="getdate", status=200) == 3
+    assert requests.value(endpoint="getdate", status=500) == 0
+    assert registry.snapshot() == {
+        "idata_requests_total": {("getdate", "200"): 3.0, ("senddate", "419"): 1.0}
+    }
+
+
+def test_a_metric_is_registered_once():
+    registry = MetricsRegistry(enabled=True)
+    first = registry.counter("idata_token_fetches_total", "Token fetches.")
+    first.inc()
+    assert registry.counter("idata_token_fetches_total", "Token fetches.") is first
+
+
+def test_histograms_count_the_values_in_cumulative_buckets():
+    registry = MetricsRegistry(enabled=True)
+    latency = registry.histogram("idata_latency_seconds", "Latency.", ("office",),
+                                 buckets=(0.1, 1.0, 0.5))
+    for value in (0.05, 0.1, 0.3, 0.7, 2.0):
+        latency.observe(value, office="Altunizade")
+    assert latency.snapshot() == {
+        ("Altunizade",): {"count": 5, "sum": 3.15, "buckets": {0.1: 2, 0.5: 3, 1.0: 4}}
+    }
+    assert latency.quantile(0.5, office="Altunizade") == 0.5
+    assert latency.quantile(0.99, office="Altunizade") == float("inf")
+    assert latency.quantile(0.5, office="Gayrettepe") is None
+
+
+def test_the_timer_observes_the_time_spent():
+    registry = MetricsRegistry(enabled=True)
+    parse = registry.histogram("idata_parse_seconds", "Parse time.", ("kind",))
+    with parse.time(kind="dates"):
+        pass
+    entry = parse.snapshot()[("dates",)]
+    assert entry["count"] == 1
+    assert 0 <= entry["sum"] < 1
+
+
+def test_the_text_format():
+    registry = MetricsRegistry(enabled=True)
+    registry.counter("idata_requests_total", "Requests.", ("endpoint",)).inc(endpoint="getdate")
+    registry.counter("idata_token_fetches_total", "Token fetches.").inc()
+    registry.histogram("idata_sweep_seconds", "Sweeps.", buckets=(1.0, 5.0)).observe(2.0)
+    assert registry.render() == "\n".join([
+        "# HELP idata_requests_total Requests.",
+        "# TYPE idata_requests_total counter",
+        'idata_requests_total{endpoint="getdate"} 1.0',
+        "# HELP idata_token_fetches_total Token fetches.",
+        "# TYPE idata_token_fetches_total counter",
+        "idata_token_fetches_total 1.0",
+        "# HELP idata_sweep_seconds Sweeps.",
+        "# TYPE idata_sweep_seconds histogram",
+        'idata_sweep_seconds_bucket{le="1.0"} 0',
+        'idata_sweep_seconds_bucket{le="5.0"} 1',
+        'idata_sweep_seconds_bucket{le="+Inf"} 1',
+        "idata_sweep_seconds_sum 2.0",
+        "idata_sweep_seconds_count 1",
+    ]) + "\n"
+
+
+def test_a_disabled_registry_records_nothing():
+    registry = MetricsRegistry()
+    requests = registry.counter("idata_requests_total", "Requests.", ("endpoint",))
+    latency = registry.histogram("idata_latency_seconds", "Latency.")
+    requests.inc(endpoint="getdate")
+    latency.observe(0.2)
+    with latency.time():
+        pass
+    assert registry.snapshot() == {"idata_requests_total": {}, "idata_latency_seconds": {}}
+    assert registry.render() == "\n".join([
+        "# HELP idata_requests_total Requests.",
+        "# TYPE idata_requests_total counter",
+        "# HELP idata_latency_seconds Latency.",
+        "# TYPE idata_latency_seconds histogram",
+    ]) + "\n"
+
+
+def test_disabling_keeps_the_recorded_values():
+    registry = MetricsRegistry()
+    requests = registry.counter("idata_requests_total", "Requests.")
+    registry.enable()
+    requests.inc()
+    registry.disable()
+    requests.inc()
+    assert requests.value() == 1
@@ -0,0 +1,70 @@
+"""
+Tests of the parse cache of the unchanged responses.
+"""
+
+from core.parse_cache import ParseCache, fingerprint
+
+
+class CountingParser:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, body: str):
+        def parse():
+            self.calls += 1
+            return tuple(body.split())
+        return parse
+
+
+def test_an_identical_body_is_not_parsed_again():
+    cache, parser = ParseCache(), CountingParser()
+    body = "17-11-2023 18-11-2023"
+    first = cache.get_or_parse("getdate", "Altunizade", fingerprint(body), parser(body))
+    second = cache.get_or_parse("getdate", "Altunizade", fingerprint(body), parser(body))
+    assert first == second == ("17-11-2023", "18-11-2023")
+    assert parser.calls == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_ratio": 0.5, "size": 1}
+
+
+def test_a_changed_body_is_parsed_again():
+    cache, parser = ParseCache(), CountingParser()
+    cache.get_or_parse("getdate", "Altunizade", fingerprint("17-11-2023"), parser("17-11-2023"))
+    assert cache.get_or_parse(
+        "getdate", "Altunizade", fingerprint("18-11-2023"), parser("18-11-2023")
+    ) == ("18-11-2023",)
+    assert parser.calls == 2
+    assert len(cache) == 1
+
+
+def test_the_endpoints_and_parameters_are_cached_apart():
+    cache, parser = ParseCache(), CountingParser()
+    body = "09:00"
+    for endpoint, parameters in [("getdate", "Altunizade"), ("senddate", "Altunizade"),
+                                 ("getdate", "Gayrettepe")]:
+        cache.get_or_parse(endpoint, parameters, fingerprint(body), parser(body))
+    assert parser.calls == 3
+    assert len(cache) == 3
+
+
+def test_the_least_recently_used_entry_is_evicted():
+    cache, parser = ParseCache(maxsize=2), CountingParser()
+    for office in ("Altunizade", "Gayrettepe"):
+        cache.get_or_parse("getdate", office, fingerprint(office), parser(office))
+    # Altunizade is used again, so Gayrettepe is the least recently used.
+    cache.get_or_parse("getdate", "Altunizade", fingerprint("Altunizade"), parser("Altunizade"))
+    cache.get_or_parse("getdate", "Antalya", fingerprint("Antalya"), parser("Antalya"))
+    assert len(cache) == 2
+    assert parser.calls == 3
+
+    cache.get_or_parse("getdate", "Altunizade", fingerprint("Altunizade"), parser("Altunizade"))
+    assert parser.calls == 3
+    cache.get_or_parse("getdate", "Gayrettepe", fingerprint("Gayrettepe"), parser("Gayrettepe"))
+    assert parser.calls == 4
+
+
+def test_clear_forgets_the_results():
+    cache, parser = ParseCache(), CountingParser()
+    cache.get_or_parse("getdate", "Altunizade", fingerprint("body"), parser("body"))
+    cache.clear()
+    cache.get_or_parse("getdate", "Altunizade", fingerprint("body"), parser("body"))
+    assert parser.calls == 2
@@ -0,0 +1,86 @@
+"""
+Tests of the fast parser backend against the BeautifulSoup one.
+"""
+
+import pytest
+
+from benchmarks.synthetic import (
+    synthetic_appointment_form,
+    synthetic_getdate,
+    synthetic_senddate
+)
+from core.parsers import FallbackResponseParser, FastResponseParser, SoupResponseParser
+
+# The classes and the meta tag the utilities and the requester look for.
+CLASS_NAMES = ("form-control", "noPrime", "yesPrime", "yesVip", "getdatebtnhour")
+META_NAMES = ("csrf-token",)
+
+# Markup the fast parser has to handle like BeautifulSoup does.
+EDGE_CASES = {
+    "mixed": (
+        '<div class="form-control"><b> 01-</b>11-2023<input class="form-control" type="hidden">'
+        '<p class="noPrime">unclosed <span class="noPrime x">nested &amp; </span></div>'
+        '<script class="yesVip"> 10:00 </script><br class="yesPrime"/><!-- <b class="yesVip"> -->'
+        '<meta name="csrf-token"><meta name="csrf-token" content="second">'
+    ),
+    "unclosed-li": (
+        '<ul><li class="form-control">17-11-2023<li class="form-control">18-11-2023</ul>'
+    ),
+    "unclosed-td": (
+        '<table><tr><td class="noPrime">09:00<td class="noPrime yesVip">09:15</table>'
+    ),
+    "entities": (
+        '<p class="noPrime">Saat se&ccedil;iniz &amp; devam &#8211; &#x2013;&nbsp;10:00</p>'
+        '<span class="yesPrime">a &amp b &lt;11:00&gt;</span>'
+        '<meta name="csrf-token" content="a&amp;b&quot;c">'
+    ),
+    "class-in-script": (
+        '<script>var button = \'<button class="yesVip">10:00</button>\';'
+        'if (a < b && c > d) { $(".noPrime").show(); }</script>'
+        '<style>.yesPrime { color: red; }</style><b class="noPrime">09:00</b>'
+        '<script>document.write(\'<meta name="csrf-token" content="fake">\');</script>'
+    ),
+}
+
+RESPONSES = {
+    "getdate-0": synthetic_getdate([]),
+    "getdate-30": synthetic_getdate([f"{day:02d}-11-2023" for day in range(1, 31)]),
+    "senddate-0": synthetic_senddate(0),
+    "senddate-96": synthetic_senddate(96),
+    "form-100": synthetic_appointment_form(100),
+    **EDGE_CASES,
+}
+
+
+@pytest.mark.parametrize("class_name", CLASS_NAMES)
+@pytest.mark.parametrize("name", RESPONSES)
+def test_the_texts_match_beautifulsoup(name, class_name):
+    html_code = RESPONSES[name]
+    assert FastResponseParser.find_texts_by_class(html_code, class_name) == \
+        SoupResponseParser.find_texts_by_class(html_code, class_name)
+
+
+@pytest.mark.parametrize("meta_name", META_NAMES)
+@pytest.mark.parametrize("name", RESPONSES)
+def test_the_meta_content_matches_beautifulsoup(name, meta_name):
+    html_code = RESPONSES[name]
+    assert FastResponseParser.find_meta_content(html_code, meta_name) == \
+        SoupResponseParser.find_meta_content(html_code, meta_name)
+
+
+def test_the_texts_of_the_edge_cases():
+    assert FastResponseParser.find_texts_by_class(EDGE_CASES["unclosed-td"], "yesVip") == \
+        ["09:15"]
+    assert FastResponseParser.find_texts_by_class(EDGE_CASES["entities"], "noPrime") == \
+        ["Saat se\xe7iniz & devam \u2013 \u2013\xa010:00"]
+    assert FastResponseParser.find_texts_by_class(EDGE_CASES["class-in-script"], "yesVip") == []
+    assert FastResponseParser.find_meta_content(EDGE_CASES["class-in-script"], "csrf-token") \
+        is None
+
+
+def test_the_fallback_parser_uses_beautifulsoup_on_errors(monkeypatch):
+    def fail(html_code, class_name):
+        raise AssertionError("parser error")
+    monkeypatch.setattr(FastResponseParser, "find_texts_by_class", staticmethod(fail))
+    assert FallbackResponseParser.find_texts_by_class(EDGE_CASES["unclosed-td"], "yesVip") == \
+        ["09:15"]
@@ -0,0 +1,37 @@
+"""
+Tests of the polling policies.
+"""
+
+import time
+
+from core.polling import AdaptivePollingPolicy, BudgetPollingPolicy, ReleaseModel
+
+
+def polls_per_week(policy: BudgetPollingPolicy) -> float:
+    return sum(3600 / interval for interval in policy.intervals())
+
+
+def test_the_daily_polls_are_spent_in_a_week():
+    policy = BudgetPollingPolicy(ReleaseModel(), daily_polls=1440,
+                                 min_interval=1.0, max_interval=3600.0)
+    assert round(polls_per_week(policy)) == 1440 * 7
+
+
+def test_the_polls_follow_the_releases():
+    model = ReleaseModel()
+    # Releases on four Mondays at 09:30 local time, 6 January 2025 was a Monday.
+    for week in range(4):
+        model.add_release(8, time.mktime((2025, 1, 6 + 7 * week, 9, 30, 0, 0, 0, -1)))
+    policy = BudgetPollingPolicy(model, daily_polls=720, office_id=8,
+                                 min_interval=1.0, max_interval=3600.0)
+    assert policy.intervals()[9] == min(policy.intervals())
+    assert round(polls_per_week(policy)) == 720 * 7
+
+
+def test_the_backoff_stays_at_the_maximum_interval():
+    policy = AdaptivePollingPolicy(base_interval=30.0, max_interval=900.0)
+    for _ in range(5000):
+        policy.record_failure(rate_limited=True)
+    assert policy.next_interval() == 900.0
+    policy.record_success(found=False)
+    assert policy.next_interval() == 30.0
@@ -0,0 +1,96 @@
+"""
+Tests of the token bucket and the circuit breaker.
+"""
+
+import pytest
+
+from core import rate_limiter
+from core.rate_limiter import CircuitBreaker, HostGuards, TokenBucket
+
+
+class FakeClock:
+    """A monotonic clock which only moves when it is advanced."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    fake_clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", fake_clock)
+    return fake_clock
+
+
+def test_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(rate=2, capacity=4)
+    assert all(bucket.try_acquire() for _ in range(4))
+    assert not bucket.try_acquire()
+    clock.now += 1
+    assert bucket.available == pytest.approx(2)
+    clock.now += 10
+    assert bucket.available == pytest.approx(4)
+
+
+def test_breaker_opens_after_the_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=3, cool_down=60)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    assert breaker.retry_in() == pytest.approx(60)
+
+
+def test_breaker_success_resets_the_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.consecutive_failures == 1
+
+
+def test_breaker_lets_one_trial_through_after_the_cool_down(clock):
+    breaker = CircuitBreaker(failure_threshold=1, cool_down=60)
+    breaker.record_failure()
+    clock.now += 59
+    assert not breaker.allow_request()
+    clock.now += 1
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request()
+
+
+def test_breaker_closes_after_a_successful_trial(clock):
+    breaker = CircuitBreaker(failure_threshold=1, cool_down=60)
+    breaker.record_failure()
+    clock.now += 60
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+
+def test_breaker_opens_again_after_a_failed_trial(clock):
+    breaker = CircuitBreaker(failure_threshold=5, cool_down=60)
+    for _ in range(5):
+        breaker.record_failure()
+    clock.now += 60
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.retry_in() == pytest.approx(60)
+
+
+def test_host_guards_configure_the_breaker_of_a_host():
+    HostGuards.configure("configure.test", failure_threshold=2, cool_down=5)
+    breaker = HostGuards.breaker_for("configure.test")
+    assert breaker.failure_threshold == 2
+    assert breaker.cool_down == 5
+    assert HostGuards.breaker_for("other.test") is not breaker
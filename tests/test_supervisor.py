@@ -0,0 +1,112 @@
+"""
+Tests of the job supervisor, its restarts and their backoff.
+"""
+
+import threading
+import time
+
+from core.exceptions import IDataHTTPError
+from core.polling import AdaptivePollingPolicy
+from core.supervisor import IDataSupervisor
+
+
+class RecordingEvent(threading.Event):
+    """A stop event recording the waits of the job threads, and waiting
+    only a millisecond for them.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.waits: list[tuple[str, float]] = []
+        self._lock = threading.Lock()
+
+    def wait(self, timeout=None):
+        if timeout is None:
+            return super().wait()
+        with self._lock:
+            self.waits.append((threading.current_thread().name, timeout))
+        return super().wait(0.001)
+
+    def waits_of(self, job_name: str) -> list[float]:
+        with self._lock:
+            return [timeout for name, timeout in self.waits if name == f"Job-{job_name}"]
+
+
+def supervisor_with(**kwargs) -> tuple[IDataSupervisor, RecordingEvent]:
+    supervisor = IDataSupervisor(**kwargs)
+    event = RecordingEvent()
+    supervisor._stop_event = event  # pylint: disable=protected-access
+    return supervisor, event
+
+
+def run_until(supervisor: IDataSupervisor, condition, timeout: float = 5.0) -> None:
+    supervisor.start()
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.001)
+    supervisor.stop()
+    supervisor.join()
+    assert condition()
+
+
+def counting_job(runs: list, result=None, error: Exception | None = None):
+    """Returns a factory of a job function counting its runs."""
+    def factory():
+        def function():
+            runs.append(time.monotonic())
+            if error is not None:
+                raise error
+            return result
+        return function
+    return factory
+
+
+def test_a_crashing_job_restarts_with_a_doubling_backoff():
+    supervisor, event = supervisor_with(restart_backoff=1, max_restart_backoff=4)
+    healthy_runs, crashing_runs = [], []
+    supervisor.add_job("healthy", counting_job(healthy_runs),
+                       policy=AdaptivePollingPolicy(base_interval=0.5))
+    supervisor.add_job("crashing", counting_job(crashing_runs, error=RuntimeError("bug")))
+
+    run_until(supervisor, lambda: len(crashing_runs) >= 6 and len(healthy_runs) >= 6)
+    assert event.waits_of("crashing")[:5] == [1, 2, 4, 4, 4]
+    status = supervisor.status()
+    assert status["crashing"]["restarts"] >= 5
+    assert status["crashing"]["last_error"] == "RuntimeError('bug')"
+    assert status["healthy"]["restarts"] == 0
+    assert status["healthy"]["state"] == "stopped"
+    assert set(event.waits_of("healthy")) == {0.5}
+
+
+def test_a_failing_job_restarts_after_max_failures():
+    supervisor, event = supervisor_with(max_failures=2, restart_backoff=3)
+    runs = []
+    supervisor.add_job("failing", counting_job(runs, error=IDataHTTPError("/getdate", 500)),
+                       policy=AdaptivePollingPolicy(base_interval=1, max_interval=900))
+
+    run_until(supervisor, lambda: len(runs) >= 6)
+    # Two failures back off by the policy, the third one restarts the job.
+    assert event.waits_of("failing")[:6] == [2, 4, 3, 16, 32, 6]
+    assert supervisor.jobs["failing"].restarts >= 2
+    assert "IDataHTTPError" in supervisor.status()["failing"]["last_error"]
+
+
+def test_the_restart_backoff_starts_over_after_a_success():
+    supervisor, event = supervisor_with(restart_backoff=1, max_restart_backoff=60)
+    starts = []
+
+    def factory():
+        starts.append(None)
+        runs = []
+
+        def function():
+            # The even starts run once before crashing, the odd ones crash at once.
+            runs.append(None)
+            if len(starts) % 2 or len(runs) > 1:
+                raise RuntimeError("bug")
+            return False
+        return function
+
+    supervisor.add_job("flaky", factory, policy=AdaptivePollingPolicy(base_interval=0.5))
+    run_until(supervisor, lambda: len(starts) >= 5)
+    assert event.waits_of("flaky")[:6] == [1, 0.5, 1, 2, 0.5, 1]